@@ -0,0 +1,217 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+# Default (initial, minimum, maximum) concurrency per provider
+PROVIDER_LIMITS = {
+    "ollama": (2, 1, 8),
+    "openrouter": (4, 1, 16),
+    "groq": (2, 1, 8),
+    "maia": (4, 1, 16),
+    "unihpc": (4, 1, 32),
+}
+
+BACKPRESSURE_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_backpressure(exc):
+    """True if an exception means the provider is overloaded (429/5xx, timeout, Retry-After)."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    if getattr(exc, "retry_after", None) is not None:
+        return True
+    status = getattr(exc, "status", None) or getattr(exc, "status_code", None)
+    return status in BACKPRESSURE_STATUS
+
+
+def backoff_delay(exc, attempt, base=1.5, max_delay=60.0):
+    """
+    Wait time before the next attempt of a failed request.
+    Honors Retry-After, backs off exponentially (with jitter) on overload
+    and keeps the linear delay for other errors.
+    """
+    retry_after = getattr(exc, "retry_after", None) if exc is not None else None
+    if retry_after is not None:
+        return min(retry_after, max_delay)
+    if exc is not None and is_backpressure(exc):
+        return min(max_delay, base * 2 ** attempt) * random.uniform(0.75, 1.25)
+    return base * attempt
+
+
+class _Slot:
+    """One request holding a concurrency slot; reports its outcome on exit."""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.start = None
+
+    async def __aenter__(self):
+        await self.limiter.acquire()
+        self.start = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.limiter.release(time.monotonic() - self.start, exc)
+        return False
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one provider.
+
+    The limit grows by one after each round of `limit` successful requests as
+    long as the p95 latency of recent requests stays within
+    `latency_tolerance` of the best p95 seen so far, shrinks by one when
+    latency climbs, and is halved on 429/5xx answers or timeouts. A
+    Retry-After header pauses all new requests to the provider until it
+    expires.
+    """
+
+    def __init__(self, name, initial=4, min_limit=1, max_limit=32, window=50, latency_tolerance=1.5):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = min(max(initial, min_limit), self.max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.latencies = deque(maxlen=window)
+        self.in_flight = 0
+        self.successes_in_round = 0
+        self.baseline_p95 = None
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self.peak_limit = self.limit
+        self._cond = None
+        self._loop = None
+
+    def _condition(self):
+        # asyncio primitives are bound to one event loop; the file-by-file
+        # pipeline starts a new loop per file, the learned limit is kept.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._cond = asyncio.Condition()
+            self.in_flight = 0
+        return self._cond
+
+    def slot(self):
+        """Async context manager for one request."""
+        return _Slot(self)
+
+    async def acquire(self):
+        cond = self._condition()
+        async with cond:
+            while True:
+                pause = self.blocked_until - time.monotonic()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(cond.wait(), timeout=pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                await cond.wait()
+
+    async def release(self, latency, exc=None):
+        cond = self._condition()
+        async with cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if exc is None:
+                self._on_success(latency)
+            elif is_backpressure(exc):
+                self._on_backpressure(exc)
+            cond.notify_all()
+
+    def _p95(self):
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def _on_success(self, latency):
+        self.latencies.append(latency)
+        self.successes_in_round += 1
+        if self.successes_in_round < self.limit or len(self.latencies) < 5:
+            return
+        self.successes_in_round = 0
+
+        p95 = self._p95()
+        if self.baseline_p95 is None:
+            self.baseline_p95 = p95
+        else:
+            # Let the baseline drift up slowly so it follows longer chunks
+            self.baseline_p95 = min(p95, self.baseline_p95 * 1.05)
+
+        if p95 <= self.baseline_p95 * self.latency_tolerance:
+            if self.limit < self.max_limit:
+                self.limit += 1
+                self.peak_limit = max(self.peak_limit, self.limit)
+                logging.info(f"📈 {self.name}: concurrency → {self.limit} (p95 {p95:.1f}s)")
+        elif self.limit > self.min_limit:
+            self.limit -= 1
+            logging.info(f"📉 {self.name}: latency rising (p95 {p95:.1f}s), concurrency → {self.limit}")
+
+    def _on_backpressure(self, exc):
+        self.throttled += 1
+        now = time.monotonic()
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+        # Only halve once per round trip, not once per failed in-flight request
+        cooldown = self._p95() if self.latencies else 1.0
+        if now - self.last_decrease < cooldown:
+            return
+        self.last_decrease = now
+        self.successes_in_round = 0
+        self.limit = max(self.min_limit, self.limit // 2)
+        logging.warning(f"🐢 {self.name}: backpressure ({exc}), concurrency → {self.limit}")
+
+    def stats(self):
+        return {
+            "provider": self.name,
+            "limit": self.limit,
+            "peak_limit": self.peak_limit,
+            "throttled": self.throttled,
+            "p95_sec": round(self._p95(), 2) if self.latencies else None,
+        }
+
+
+LIMITERS = {}
+
+
+def get_limiter(provider, initial=None, max_limit=None):
+    """
+    Shared AdaptiveLimiter for a provider, created on first use.
+    The ceiling can be set per provider with <PROVIDER>_MAX_CONCURRENT in .env.
+    """
+    name = provider.lower()
+    if name not in LIMITERS:
+        default_initial, min_limit, default_max = PROVIDER_LIMITS.get(name, (4, 1, 16))
+        env_max = os.getenv(f"{name.upper()}_MAX_CONCURRENT")
+        max_limit = max_limit or (int(env_max) if env_max else default_max)
+        LIMITERS[name] = AdaptiveLimiter(
+            name,
+            initial=initial or default_initial,
+            min_limit=min_limit,
+            max_limit=max_limit,
+        )
+    return LIMITERS[name]
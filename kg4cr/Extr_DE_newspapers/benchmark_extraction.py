@@ -0,0 +1,158 @@
+import json
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from tabulate import tabulate
+
+import extract_info_newspapers_DE as extractor
+from extract_info_newspapers_DE import process_chunks, smart_chunk_text
+from adaptive_limiter import AdaptiveLimiter
+from mock_llm_server import add_mock_arguments, mock_from_args, start_mock_server
+
+# Providers that can be pointed at the mock server (Groq goes through its SDK)
+MOCK_ENDPOINTS = {
+    "ollama": ("OLLAMA_URL", "/api"),
+    "unihpc": ("UNIHPC_URL", "/api/generate"),
+    "maia": ("MAIA_URL", "/v1/chat/completions"),
+    "openrouter": ("OPENROUTER_URL", "/v1/chat/completions"),
+}
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100) of a list, or None if it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def synthetic_text(records, num_notices):
+    """Register-notice-like text built from canned records, for runs without OCR input."""
+    notices = []
+    for i in range(num_notices):
+        r = records[i % len(records)]
+        notices.append(
+            f"¶ {r.get('Court_name') or 'Berlin'} {i + 1}\n"
+            f"In das Handelsregister Abteilung B ist heute unter Nr. {r.get('Registration_Code') or i} "
+            f"die Firma {r.get('Company_name') or 'Muster G.m.b.H.'} eingetragen worden. "
+            "Gegenstand des Unternehmens ist der Handel mit Waren aller Art sowie die Beteiligung an "
+            "gleichartigen Unternehmungen. Das Stammkapital beträgt 20 000 Reichsmark. "
+            "Zum Geschäftsführer ist der Kaufmann bestellt. Prokura ist erteilt.\n"
+            f"Berlin, den 6. September {r.get('Registration_year') or 1927}. Amtsgericht."
+        )
+    return "\n".join(notices)
+
+
+def load_chunks(args, records):
+    if args.input:
+        path = Path(args.input)
+        files = sorted(path.rglob("*.txt")) if path.is_dir() else [path]
+        text = "\n".join(f.read_text(encoding="utf-8") for f in files)
+    else:
+        text = synthetic_text(records, args.notices)
+    chunks = smart_chunk_text(text, max_words=args.max_words, overlap_words=args.overlap)
+    if args.max_chunks:
+        chunks = chunks[:args.max_chunks]
+    return chunks
+
+
+async def run_case(chunks, mock, provider, mode, concurrency, args):
+    """Run process_chunks once against the mock and summarize throughput and latency."""
+    limiter = None
+    if args.adaptive:
+        limiter = AdaptiveLimiter(provider, initial=concurrency, max_limit=args.adaptive_max or 4 * concurrency)
+
+    mock.reset_stats()
+    start = time.time()
+    result = await process_chunks(
+        chunks,
+        mode=mode,
+        delay_between=args.delay,
+        max_concurrent=concurrency,
+        max_retries=args.max_retries,
+        provider=provider,
+        limiter=limiter,
+    )
+    wall = time.time() - start
+
+    ok_times = [t for i, t in enumerate(result["chunk_times"], start=1) if i not in result["failed_chunks"]]
+    row = {
+        "mode": mode,
+        "concurrency": concurrency if mode == "parallel" else 1,
+        "chunks": len(chunks),
+        "failed": len(result["failed_chunks"]),
+        "wall_sec": round(wall, 2),
+        "chunks_per_sec": round(len(chunks) / wall, 2) if wall else None,
+        "p50_sec": round(percentile(ok_times, 50), 2) if ok_times else None,
+        "p95_sec": round(percentile(ok_times, 95), 2) if ok_times else None,
+        "requests": mock.stats["requests"],
+        # Every chunk costs one request; anything beyond that was a retry
+        "retries": mock.stats["requests"] - len(chunks),
+        "http_429": mock.stats["rejected_capacity"],
+        "peak_in_flight": mock.stats["peak_in_flight"],
+        "records": len(result["results"]),
+    }
+    if limiter is not None:
+        row["final_limit"] = limiter.limit
+    return row
+
+
+async def main(args):
+    mock = mock_from_args(args)
+    runner, base_url = await start_mock_server(mock)
+    setting, path = MOCK_ENDPOINTS[args.provider]
+    setattr(extractor, setting, base_url + path)
+    extractor.set_response_cache(None)
+    extractor.set_streaming(args.stream)
+
+    chunks = load_chunks(args, mock.records)
+    print(f"Benchmarking {len(chunks)} chunks against mock {args.provider} at {base_url} "
+          f"(latency {args.latency}, error rate {args.error_rate}, capacity {args.capacity or 'unlimited'})")
+
+    rows = []
+    try:
+        for _ in range(args.repeat):
+            for mode in args.modes:
+                levels = args.concurrency if mode == "parallel" else [1]
+                for concurrency in levels:
+                    rows.append(await run_case(chunks, mock, args.provider, mode, concurrency, args))
+    finally:
+        await runner.cleanup()
+
+    print(tabulate(rows, headers="keys", tablefmt="github"))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline throughput benchmark of process_chunks against the local mock LLM server."
+    )
+    parser.add_argument("--provider", choices=sorted(MOCK_ENDPOINTS), default="ollama",
+                        help="Request format to benchmark (the mock answers all of them).")
+    parser.add_argument("--input", help="OCR .txt file or folder to chunk (default: synthetic notices).")
+    parser.add_argument("--notices", type=int, default=200, help="Number of synthetic notices without --input.")
+    parser.add_argument("--max_words", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--max_chunks", type=int, default=None, help="Only use the first N chunks.")
+    parser.add_argument("--modes", nargs="+", choices=["parallel", "sequential"], default=["parallel", "sequential"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16],
+                        help="max_concurrent values to sweep in parallel mode.")
+    parser.add_argument("--max_retries", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.0, help="Delay between chunks in sequential mode.")
+    parser.add_argument("--adaptive", action="store_true", help="Use the AIMD limiter starting at each level.")
+    parser.add_argument("--adaptive_max", type=int, default=None)
+    parser.add_argument("--stream", action="store_true", help="Benchmark streamed answers.")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", help="Also write the result rows to this JSON file.")
+    parser.add_argument("--verbose", action="store_true", help="Keep the per-chunk log output.")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.CRITICAL)
+    asyncio.run(main(args))
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import hashlib
+import logging
+
+
+class ChunkJournal:
+    """
+    Append-only JSONL journal of chunk results.
+
+    Every finished (or finally failed) chunk is written as one line with its
+    raw model response, so a restarted run can take successful chunks from
+    the journal and only send the missing ones to the LLM again. Chunks are
+    identified by file, position and a hash of their text, so changing the
+    chunking parameters invalidates old entries instead of mixing them up.
+
+    With `per_file`, `path` is a folder holding one journal per input file,
+    read when the file is first looked up. Workers sharing a manifest use
+    this: only the worker holding a file's lease writes its journal, and
+    whichever worker leases the file next resumes from it.
+    """
+
+    def __init__(self, path, per_file=False):
+        self.path = str(path)
+        self.per_file = per_file
+        self.entries = {}
+        self.restored = 0
+        self._loaded = set()
+
+        if per_file:
+            os.makedirs(self.path, exist_ok=True)
+            self.fh = None
+            return
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        if os.path.isfile(self.path):
+            self._load(self.path)
+        self.fh = open(self.path, "a", encoding="utf-8")
+
+    def file_path(self, file_key):
+        """Journal of one input file (per_file mode)."""
+        return os.path.join(self.path, hashlib.sha1(file_key.encode("utf-8")).hexdigest()[:16] + ".jsonl")
+
+    def _load_file(self, file_key):
+        if file_key in self._loaded:
+            return
+        self._loaded.add(file_key)
+        path = self.file_path(file_key)
+        if os.path.isfile(path):
+            self._load(path)
+
+    def _load(self, path):
+        skipped = 0
+        loaded = len(self.entries)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Truncated last line after a crash
+                    skipped += 1
+                    continue
+                if entry.get("status") == "ok" and entry.get("response"):
+                    key = (entry["file"], entry["chunk_id"], entry["chunk_hash"])
+                    self.entries[key] = entry["response"]
+        logging.info(f"📓 Loaded {len(self.entries) - loaded} finished chunks from journal {path}"
+                     + (f" ({skipped} unreadable lines skipped)" if skipped else ""))
+
+    @staticmethod
+    def chunk_hash(chunk):
+        return hashlib.sha1(chunk.encode("utf-8")).hexdigest()
+
+    def get(self, file_key, chunk_id, chunk):
+        """Return the journaled response of a chunk, or None if it has to be (re)processed."""
+        if self.per_file:
+            self._load_file(file_key)
+        response = self.entries.get((file_key, chunk_id, self.chunk_hash(chunk)))
+        if response is not None:
+            self.restored += 1
+        return response
+
+    def record(self, file_key, chunk_id, chunk, response, status):
+        """
+        Append the outcome of one chunk to the journal: "ok", "failed" or
+        "truncated" (an answer cut off in a repetition loop). Only "ok"
+        entries are restored.
+        """
+        chunk_hash = self.chunk_hash(chunk)
+        entry = {
+            "file": file_key,
+            "chunk_id": chunk_id,
+            "chunk_hash": chunk_hash,
+            "status": status,
+            "response": response,
+            "ts": round(time.time(), 3),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        if self.per_file:
+            self._load_file(file_key)
+            with open(self.file_path(file_key), "a", encoding="utf-8") as f:
+                f.write(line)
+        else:
+            self.fh.write(line)
+            self.fh.flush()
+        if status == "ok" and response:
+            self.entries[(file_key, chunk_id, chunk_hash)] = response
+
+    def close(self):
+        if self.fh is not None:
+            self.fh.close()
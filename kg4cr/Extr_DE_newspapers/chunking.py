@@ -0,0 +1,227 @@
+import re
+import math
+import logging
+
+# Rough characters per token for OCR'd German text on Llama/Qwen-style tokenizers
+CHARS_PER_TOKEN = 3.2
+
+# A notice ends with "[Ort], den [Datum]." optionally followed by the court signature
+NOTICE_END = re.compile(
+    r"[A-ZÄÖÜ][^\n,]{1,40}(?:,\s*[^\n,]{1,15})?,\s+den\s+\d{1,2}\.\s*"
+    r"(?:[A-ZÄÖÜ][a-zäöü]+\.?|\d{1,2}\.)\s*\d{3,4}\.?"
+    r"(?:\s*(?:Das\s+)?(?:Amtsgericht|Landgericht|Registergericht)[^\n.]{0,40}\.?)?"
+)
+# A notice starts with a "¶ [Ort] [Nummer]" header, or with an "In das Handelsregister ..." line
+# that does not directly follow such a header
+NOTICE_HEADER = re.compile(r"¶")
+NOTICE_START = re.compile(r"\n(?=[ \t]*In (?:das|unser) (?:Handels|Genossenschafts)register)")
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?;])\s+")
+
+HISTOGRAM_BINS = [(0.0, 0.25), (0.25, 0.5), (0.5, 0.75), (0.75, 1.0), (1.0, math.inf)]
+
+
+def approx_token_count(text):
+    """Fast token estimate from the character count."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def load_token_counter(spec=None):
+    """
+    Return a function text -> token count.
+    spec: None/"approx" (character estimate), "tiktoken:<encoding>" or
+    "hf:<model name>" (Hugging Face tokenizer). Falls back to the estimate
+    if the tokenizer library is not installed.
+    """
+    if not spec or spec == "approx":
+        return approx_token_count
+
+    kind, _, name = spec.partition(":")
+    try:
+        if kind == "tiktoken":
+            import tiktoken
+            encoding = tiktoken.get_encoding(name or "cl100k_base")
+            return lambda text: len(encoding.encode(text))
+        if kind == "hf":
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(name)
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    except ImportError as e:
+        logging.warning(f"Tokenizer '{spec}' not available ({e}), using approximate token counts")
+        return approx_token_count
+    raise ValueError(f"Unsupported tokenizer spec: {spec}")
+
+
+def _split_at(text, positions):
+    """Cut text at the given character offsets; whitespace-only pieces stay with the piece before them."""
+    pieces = []
+    start = 0
+    for pos in sorted(set(positions)):
+        if start < pos < len(text):
+            pieces.append(text[start:pos])
+            start = pos
+    pieces.append(text[start:])
+
+    units = []
+    for piece in pieces:
+        if units and not piece.strip():
+            units[-1] += piece
+        elif units and not units[-1].strip():
+            units[-1] += piece
+        else:
+            units.append(piece)
+    return [u for u in units if u.strip()]
+
+
+def split_notices(text):
+    """
+    Split text into units that each hold (at most) one notice. Joined
+    with "", the units give the text back, separators included.
+    """
+    cuts = [m.end() for m in NOTICE_END.finditer(text)]
+    cuts += [m.start() for m in NOTICE_HEADER.finditer(text)]
+    for m in NOTICE_START.finditer(text):
+        # The body of a "¶ [Ort] [Nummer]" header stays with its header
+        line_start = text.rfind("\n", 0, m.start()) + 1
+        if "¶" not in text[line_start:m.start()]:
+            cuts.append(m.start() + 1)
+    return _split_at(text, cuts)
+
+
+class TokenChunker:
+    """
+    Split text into chunks that fit the model's context window.
+
+    The token budget per chunk is the context length minus the prompt and a
+    reserve for the model's answer (optionally capped by max_chunk_tokens).
+    Chunks are packed from whole notices; only a notice that alone exceeds
+    the budget is cut, at paragraph or sentence ends first and at words as a
+    last resort, with `overlap_tokens` carried over at such hard cuts.
+    Sizes of all produced chunks are collected for histogram().
+    """
+
+    def __init__(
+        self,
+        context_tokens=8192,
+        prompt="",
+        reserve_tokens=2048,
+        max_chunk_tokens=None,
+        overlap_tokens=50,
+        tokenizer=None,
+    ):
+        self.count_tokens = load_token_counter(tokenizer)
+        self.prompt_tokens = self.count_tokens(prompt) if prompt else 0
+        budget = context_tokens - self.prompt_tokens - reserve_tokens
+        if max_chunk_tokens:
+            budget = min(budget, max_chunk_tokens)
+        if budget < 100:
+            raise ValueError(
+                f"Token budget per chunk is {budget} (context {context_tokens}, prompt {self.prompt_tokens}, "
+                f"reserve {reserve_tokens}); increase the context length"
+            )
+        self.budget = budget
+        self.overlap_tokens = overlap_tokens
+        self.chunk_sizes = []
+
+    def __call__(self, text):
+        return self.chunk(text)
+
+    def chunk(self, text):
+        chunks = []
+        current, current_tokens = [], 0
+
+        def flush():
+            nonlocal current, current_tokens
+            if current:
+                chunks.append("".join(current).strip())
+            current, current_tokens = [], 0
+
+        for unit in split_notices(text):
+            n = self.count_tokens(unit)
+            if n > self.budget:
+                flush()
+                chunks.extend(self._split_oversized(unit))
+                continue
+            if current_tokens + n > self.budget:
+                flush()
+            current.append(unit)
+            current_tokens += n
+        flush()
+
+        chunks = [c for c in chunks if c]
+        sizes = [self.count_tokens(c) for c in chunks]
+        self.chunk_sizes.extend(sizes)
+        logging.info(
+            f"Total chunks created: {len(chunks)} "
+            f"(tokens per chunk: {min(sizes, default=0)}-{max(sizes, default=0)}, budget {self.budget})"
+        )
+        return chunks
+
+    def _split_oversized(self, unit):
+        """Cut a single notice that does not fit into one chunk."""
+        pieces = []
+        for paragraph in PARAGRAPH_SPLIT.split(unit):
+            pieces.extend(SENTENCE_SPLIT.split(paragraph))
+
+        chunks = []
+        current, current_tokens = [], 0
+        for piece in pieces:
+            n = self.count_tokens(piece)
+            if n > self.budget:
+                if current:
+                    chunks.append(" ".join(current))
+                    current, current_tokens = [], 0
+                chunks.extend(self._split_words(piece))
+                continue
+            if current_tokens + n > self.budget:
+                chunks.append(" ".join(current))
+                current = self._overlap_tail(current)
+                current_tokens = sum(self.count_tokens(p) for p in current)
+            current.append(piece)
+            current_tokens += n
+        if current:
+            chunks.append(" ".join(current))
+        return [c.strip() for c in chunks]
+
+    def _overlap_tail(self, pieces):
+        """Trailing pieces worth up to overlap_tokens, repeated at the start of the next chunk."""
+        tail, tokens = [], 0
+        for piece in reversed(pieces):
+            n = self.count_tokens(piece)
+            if tokens + n > self.overlap_tokens:
+                break
+            tail.insert(0, piece)
+            tokens += n
+        return tail
+
+    def _split_words(self, text):
+        """Fixed word windows sized from the average tokens per word of the text."""
+        words = text.split()
+        tokens_per_word = self.count_tokens(text) / max(1, len(words))
+        window = max(1, int(self.budget / tokens_per_word))
+        overlap = min(int(self.overlap_tokens / tokens_per_word), window - 1)
+
+        chunks = []
+        i = 0
+        while i < len(words):
+            end = min(i + window, len(words))
+            chunks.append(" ".join(words[i:end]))
+            if end == len(words):
+                break
+            i = end - overlap
+        return chunks
+
+    def histogram(self):
+        """Text histogram of chunk sizes relative to the token budget."""
+        total = len(self.chunk_sizes)
+        lines = [f"Chunk sizes ({total} chunks, budget {self.budget} tokens, prompt {self.prompt_tokens} tokens):"]
+        for low, high in HISTOGRAM_BINS:
+            count = sum(1 for s in self.chunk_sizes if low * self.budget < s <= high * self.budget)
+            if low == 0.0:
+                count += sum(1 for s in self.chunk_sizes if s == 0)
+            label = f"{int(low * 100):>3}-{int(high * 100)}%" if high != math.inf else f"  >{int(low * 100)}%"
+            bar = "█" * round(40 * count / total) if total else ""
+            lines.append(f"  {label:>9} | {count:>6} {bar}")
+        if total:
+            lines.append(f"  mean {sum(self.chunk_sizes) / total:.0f} tokens")
+        return "\n".join(lines)
@@ -0,0 +1,244 @@
+import os
+import re
+import csv
+import time
+import argparse
+from collections import Counter
+from rapidfuzz import fuzz, process
+from rdflib import URIRef
+
+from rdf_text import normalize_text, register_court_uri
+from rdf_postprocesing import EX
+from entity_resolution import read_entities
+from json2rdf import TripleWriter
+
+# Register court URIs and node headers of company_register_de/generate_rdf.py
+REGISTER_COURT = "http://example.org/RegisterCourt/"
+REGISTER_COURT_NODE = re.compile(r'^court:\S+ a ex:RegisterCourt ;\s*rdfs:label "(.*)"@de', re.M)
+
+PLACE_TOKEN = re.compile(r"[a-z]+")
+# Court types; words before them are state prefixes ("Bad. Amtsgericht Mannheim", "Preuß. Amtsgericht ...")
+COURT_TYPES = {"amtsgericht", "amtsgerichts", "registergericht", "registergerichts", "konkursgericht", "gericht"}
+# Everything after these is a department ("Amtsgericht Leipzig, Abt. III")
+DEPARTMENT_WORDS = {"abt", "abteilung"}
+# Left out on both sides, so "Weiden i. Opf." matches "Weiden i.d.OPf." and "Frankfurt a. M." "Frankfurt am Main"
+CONNECTORS = {"a", "am", "an", "i", "im", "in", "d", "der", "die", "den", "des", "v", "vor", "b", "bei", "zu", "bez", "bezirk"}
+SPELLINGS = {"sankt": "st"}
+# Qualifiers of places in territories lost after 1945: "Grünberg, Schl." is not Grünberg (Hessen)
+FORMER_TERRITORIES = {"schl", "schles", "schlesien", "pomm", "pommern", "pr", "ostpr", "westpr", "posen",
+                      "ostpreussen", "westpreussen"}
+# OCR-damaged first place tokens are matched fuzzily only from this length on, so "Kamen" does not become "Kamenz"
+FUZZY_MIN_LENGTH = 7
+
+
+def place_tokens(name):
+    """
+    Tokens of the place of a court name, e.g. "Amtsgericht Frankfurt a. M."
+    -> ["frankfurt", "m"]. Branch courts ("Amtsgericht Merzig - Zweigstelle
+    Wadern") are named by the place of the branch.
+    """
+    tokens = PLACE_TOKEN.findall(normalize_text(name or "").lower())
+    for i, token in enumerate(tokens):
+        if token in COURT_TYPES:
+            tokens = tokens[i + 1:]
+            break
+    for i, token in enumerate(tokens):
+        if token in DEPARTMENT_WORDS:
+            tokens = tokens[:i]
+            break
+    if "zweigstelle" in tokens:
+        tokens = tokens[tokens.index("zweigstelle") + 1:]
+    return [SPELLINGS.get(t, t) for t in tokens if t not in CONNECTORS and t not in COURT_TYPES]
+
+
+class _Node:
+    __slots__ = ("children", "key", "below")
+
+    def __init__(self):
+        self.children = {}
+        # Place key of the register court ending here, if any
+        self.key = None
+        # Place keys of all register courts at or below this node
+        self.below = set()
+
+
+class CourtIndex:
+    """
+    Lookup of register courts by the place tokens of their names, built
+    once from the register graph: a token trie, so a historical name
+    resolves in one walk over its tokens.
+
+    A newspaper token matches a register token if it is equal or the only
+    register token at that position it abbreviates ("Rh." -> Rhein). The
+    first token may instead be an OCR variant (rapidfuzz ratio >= the
+    threshold). A name that stops early matches if only one register court
+    lies below ("Kempten" -> "Kempten (Allgäu)", but not "Frankfurt"). A
+    name that goes on after a register court keeps its extra tokens as a
+    qualifier ("Minden i. W." -> "Minden"), unless they name a former
+    territory. Courts whose names give the same place key (two spellings of
+    Weiden i.d.OPf.) resolve to the smallest URI.
+    """
+
+    def __init__(self, courts, fuzzy_threshold=90):
+        self.root = _Node()
+        self.uris = {}
+        self.names = dict(courts)
+        self.fuzzy_threshold = fuzzy_threshold
+        self._resolved = {}
+        self._fuzzy = {}
+        for uri, name in sorted(self.names.items()):
+            key = tuple(place_tokens(name))
+            if not key:
+                continue
+            if key in self.uris:
+                self.uris[key] = min(self.uris[key], uri)
+                continue
+            self.uris[key] = uri
+            node = self.root
+            node.below.add(key)
+            for token in key:
+                node = node.children.setdefault(token, _Node())
+                node.below.add(key)
+            node.key = key
+
+    def __len__(self):
+        return len(self.uris)
+
+    def _first(self, token):
+        child = self.root.children.get(token)
+        if child is not None or len(token) < FUZZY_MIN_LENGTH:
+            return child, False
+        if token not in self._fuzzy:
+            match = process.extractOne(token, list(self.root.children), scorer=fuzz.ratio,
+                                       score_cutoff=self.fuzzy_threshold)
+            self._fuzzy[token] = match[0] if match else None
+        best = self._fuzzy[token]
+        return (self.root.children[best], True) if best else (None, False)
+
+    def _walk(self, tokens):
+        if not tokens:
+            return None, "no_place"
+        if FORMER_TERRITORIES.intersection(tokens[1:]):
+            return None, "former_territory"
+        node, fuzzy = self._first(tokens[0])
+        if node is None:
+            return None, "unknown"
+        abbreviated = False
+        i = 1
+        while i < len(tokens):
+            child = node.children.get(tokens[i])
+            if child is None:
+                candidates = [c for token, c in node.children.items() if token.startswith(tokens[i])]
+                if len(candidates) != 1:
+                    break
+                child = candidates[0]
+                abbreviated = True
+            node = child
+            i += 1
+
+        if node.key is not None:
+            key = node.key
+        elif i < len(tokens):
+            # The name goes on where a longer register name does not
+            return None, "conflict"
+        elif len(node.below) == 1:
+            key = next(iter(node.below))
+        else:
+            return None, "ambiguous"
+
+        if fuzzy:
+            method = "fuzzy"
+        elif i < len(tokens):
+            method = "qualified"
+        elif node.key is None:
+            method = "partial"
+        elif abbreviated:
+            method = "abbreviated"
+        else:
+            method = "exact"
+        return self.uris[key], method
+
+    def resolve(self, name):
+        """(register court URI or None, match method or the reason for no match) of a court name."""
+        tokens = tuple(place_tokens(name))
+        if tokens not in self._resolved:
+            self._resolved[tokens] = self._walk(tokens)
+        return self._resolved[tokens]
+
+
+def read_register_courts(path):
+    """
+    URIs and names of the register courts of the generate_rdf output. The
+    court nodes are read from the lines df_to_ttl writes, as local names
+    such as court:Amtsgericht_Weiden_i.d._OPf. are not valid Turtle for
+    rdflib; the URIs are minted from the names as df_to_ttl mints them.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        names = REGISTER_COURT_NODE.findall(f.read())
+    return {REGISTER_COURT + register_court_uri(name): name for name in names}
+
+
+def link_courts(nt_path, register_path, output_path, report_path=None, fuzzy_threshold=90, strict=False):
+    """
+    Link the courts of an N-Triples newspaper graph to the register courts
+    of the generate_rdf output with ex:registerCourt triples. With `strict`,
+    only exact and abbreviated matches are linked. Returns the number of
+    links written.
+    """
+    start = time.time()
+    index = CourtIndex(read_register_courts(register_path), fuzzy_threshold)
+    names, company_court = read_entities(nt_path)
+    courts = names["court"]
+    companies = Counter(company_court.values())
+    print(f"📂 {len(index)} register court places, {len(courts)} newspaper courts")
+
+    methods = Counter()
+    linked_companies = 0
+    rows = []
+    with TripleWriter(output_path, "nt") as writer:
+        for court in sorted(courts):
+            register_uri, method = index.resolve(courts[court])
+            if strict and method not in ("exact", "abbreviated"):
+                register_uri = None
+            methods[method] += 1
+            if register_uri is not None:
+                writer.add((URIRef(court), EX.registerCourt, URIRef(register_uri)))
+                linked_companies += companies[court]
+            rows.append((court, courts[court], companies[court], register_uri or "",
+                         index.names.get(register_uri, ""), method))
+
+    print("🔗 " + ", ".join(f"{method}={count}" for method, count in methods.most_common()))
+    total_companies = sum(companies[court] for court in courts)
+    if total_companies:
+        print(f"🏛️ {linked_companies}/{total_companies} company links reach a register court "
+              f"({linked_companies / total_companies:.1%}) in {time.time() - start:.2f}s")
+    if report_path:
+        with open(report_path, "w", encoding="utf-8", newline="") as f:
+            out = csv.writer(f, delimiter="\t")
+            out.writerow(["court", "courtName", "companies", "registerCourt", "registerCourtName", "match"])
+            out.writerows(sorted(rows, key=lambda row: -row[2]))
+        print(f"📝 Report saved to: {report_path}")
+    print(f"💾 {writer.count} court links saved to: {output_path}")
+    return writer.count
+
+
+if __name__ == "__main__":
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    register_default = os.path.join(BASE_DIR, "data", "processed", "with_Ontology", "register_courts_combined.ttl")
+
+    parser = argparse.ArgumentParser(
+        description="Link the courts of an N-Triples newspaper graph to the XJustiz register courts "
+                    "(generate_rdf output) with ex:registerCourt triples."
+    )
+    parser.add_argument("--input", required=True, help="N-Triples newspaper graph.")
+    parser.add_argument("--register", default=register_default, help="Register court graph of generate_rdf.py.")
+    parser.add_argument("--output", default=None, help="Link triples (default: <input>_register_links.nt).")
+    parser.add_argument("--report", default=None, help="TSV of every court with its register court and match type.")
+    parser.add_argument("--fuzzy_threshold", type=float, default=90,
+                        help="Minimum similarity (0-100) of an OCR-damaged place name to a register court place.")
+    parser.add_argument("--strict", action="store_true", help="Only link exact and abbreviated place names.")
+    args = parser.parse_args()
+
+    output = args.output or args.input.rsplit(".", 1)[0] + "_register_links.nt"
+    link_courts(args.input, args.register, output, report_path=args.report,
+                fuzzy_threshold=args.fuzzy_threshold, strict=args.strict)
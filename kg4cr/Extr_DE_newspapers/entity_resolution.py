@@ -0,0 +1,335 @@
+import re
+import time
+import random
+import hashlib
+import argparse
+from collections import Counter, defaultdict
+import numpy as np
+from rapidfuzz import fuzz, process
+from rdflib import Literal, RDF, URIRef
+from rdflib.namespace import OWL
+
+from rdf_text import normalize_text
+from rdf_postprocesing import EX, iter_nt_statements
+from json2rdf import TripleWriter
+
+CLUSTER = "http://example.org/cluster/"
+
+# Spelled-out legal forms, so "Gesellschaft mit beschränkter Haftung" and "G. m. b. H." get the same key
+LEGAL_FORMS = [
+    (re.compile(r"gesellschaft mit beschraenkter haftung"), "gmbh"),
+    (re.compile(r"eingetragene genossenschaft mit beschraenkter haftpflicht"), "egmbh"),
+    (re.compile(r"eingetragene genossenschaft mit unbeschraenkter haftpflicht"), "egmuh"),
+    (re.compile(r"kommanditgesellschaft auf aktien"), "kgaa"),
+    (re.compile(r"aktien-?gesellschaft"), "ag"),
+    (re.compile(r"kommandit-?gesellschaft"), "kg"),
+    (re.compile(r"offene handelsgesellschaft"), "ohg"),
+]
+TOKEN = re.compile(r"[a-z0-9]+")
+DIGITS = re.compile(r"\d+")
+# Legal forms after abbreviation, as tokens or as runs of letters ("G. m. b. H.")
+LEGAL_FORM_TOKENS = {"gmbh", "ag", "kg", "kgaa", "ohg", "egmbh", "egmuh", "eg", "ev", "gbr"}
+
+# MinHash: one (a, b) pair per permutation of the 61-bit shingle hashes
+MERSENNE_PRIME = (1 << 61) - 1
+SHINGLE_SIZE = 3
+# A token counts as too frequent for blocking only above this many names
+MIN_STOP_COUNT = 50
+# Court names are compared by their place: "Amtsgericht Kamen" is not "Amtsgericht Kamenz"
+COURT_WORDS = {"amtsgericht", "amtsgerichts", "registergericht", "registergerichts", "gericht", "abt", "abteilung"}
+
+
+def name_tokens(name):
+    """Lower-case ASCII tokens of an entity name, with legal forms abbreviated."""
+    text = normalize_text(name or "").lower()
+    for pattern, short in LEGAL_FORMS:
+        text = pattern.sub(short, text)
+    return TOKEN.findall(text)
+
+
+class MinHasher:
+    """MinHash signatures of character shingles; the per-shingle hash vectors are cached."""
+
+    def __init__(self, num_perm, seed=1):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME)) for _ in range(num_perm)]
+        self._vectors = {}
+
+    def _vector(self, shingle):
+        vector = self._vectors.get(shingle)
+        if vector is None:
+            h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+            vector = self._vectors[shingle] = tuple((a * h + b) % MERSENNE_PRIME for a, b in self.params)
+        return vector
+
+    def signature(self, text):
+        if len(text) <= SHINGLE_SIZE:
+            shingles = {text}
+        else:
+            shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+        return tuple(map(min, zip(*(self._vector(s) for s in shingles))))
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, ri, rj):
+        """Merge the clusters of two roots; the smaller index stays root."""
+        self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def _numbers_agree(a, b):
+    """Numbers in names (Bauverein 1923, Werk II -> 2) tell companies apart; both need the same ones."""
+    numbers_a, numbers_b = DIGITS.findall(a), DIGITS.findall(b)
+    return numbers_a == numbers_b or not numbers_a or not numbers_b
+
+
+def _legal_forms(tokens):
+    """Legal forms of a tokenized name; runs of one-letter tokens are read as one ("g m b h" -> gmbh)."""
+    forms = set()
+    letters = ""
+    for token in tokens + [""]:
+        if len(token) == 1:
+            letters += token
+            continue
+        if letters in LEGAL_FORM_TOKENS:
+            forms.add(letters)
+        letters = ""
+        if token in LEGAL_FORM_TOKENS:
+            forms.add(token)
+    return forms
+
+
+def _legal_forms_agree(a, b):
+    """A KG is not the AG of the same name; names with legal forms need the same ones."""
+    return a == b or not a or not b
+
+
+def resolve_names(names, threshold=90, bands=20, rows=3, max_block=500, stop_fraction=0.01, groups=None,
+                  stop_words=(), compare_core=False):
+    """
+    Cluster entity names that differ only by punctuation, spacing, legal
+    form spelling or OCR errors.
+
+    Names with the same compact key (tokens without separators) are merged
+    directly. The distinct keys are then blocked with MinHash LSH over
+    character 3-grams (`bands` x `rows` permutations), leaving out tokens
+    that occur in more than `stop_fraction` of the keys (Amtsgericht, GmbH,
+    ...) and the `stop_words`, so only keys sharing a bucket are compared:
+    keys with a rapidfuzz ratio >= `threshold` (0-100) match, unless they
+    contain different numbers (Bauverein 1923, Werk 2) or legal forms
+    (Müller & Co. KG, Müller & Co. AG). Names without any letters or
+    digits ("-", "?") stay single. With
+    `compare_core`, the ratio is taken without the `stop_words` (for court
+    names, whose court type would dominate it). Buckets larger than
+    `max_block` are skipped. With `groups` (one value per name, e.g. the
+    court), names only match within the same group. Two clusters are only
+    merged if their first keys match as well, so chains of small
+    differences do not grow into one large cluster.
+
+    Returns (cluster index per name, stats).
+    """
+    start = time.time()
+    tokens_per_name = [name_tokens(name) for name in names]
+    group_of = groups if groups is not None else [None] * len(names)
+
+    # Exact stage: one entry per distinct (group, compact key); empty keys are not matched
+    key_index = {}
+    name_keys = []
+    key_tokens = []
+    for tokens, group in zip(tokens_per_name, group_of):
+        if not tokens:
+            name_keys.append(None)
+            continue
+        key = (group, "".join(tokens))
+        if key not in key_index:
+            key_index[key] = len(key_tokens)
+            key_tokens.append(tokens)
+        name_keys.append(key_index[key])
+    keys = list(key_index)
+
+    # Blocking text: the key without its most frequent tokens
+    doc_freq = Counter(token for tokens in key_tokens for token in set(tokens))
+    stop_count = max(stop_fraction * len(keys), MIN_STOP_COUNT)
+    stop_words = set(stop_words)
+    stop_tokens = {token for token, count in doc_freq.items() if count > stop_count} | stop_words
+    if compare_core:
+        texts = ["".join(t for t in tokens if t not in stop_words) or key for (_, key), tokens in zip(keys, key_tokens)]
+    else:
+        texts = [key for _, key in keys]
+
+    hasher = MinHasher(bands * rows)
+    buckets = defaultdict(list)
+    for i, ((group, key), tokens) in enumerate(zip(keys, key_tokens)):
+        text = "".join(t for t in tokens if t not in stop_tokens) or key
+        if not text:
+            continue
+        signature = hasher.signature(text)
+        for band in range(bands):
+            buckets[(group, band, signature[band * rows:(band + 1) * rows])].append(i)
+
+    legal_forms = [_legal_forms(tokens) for tokens in key_tokens]
+
+    def confirmed(i, j, ratio_checked=False):
+        a, b = texts[i], texts[j]
+        return ((ratio_checked or fuzz.ratio(a, b, score_cutoff=threshold)) and _numbers_agree(a, b)
+                and _legal_forms_agree(legal_forms[i], legal_forms[j]))
+
+    union_find = UnionFind(len(keys))
+    stats = {"names": len(names), "distinct_keys": len(keys), "stop_tokens": len(stop_tokens),
+             "buckets": 0, "skipped_buckets": 0, "comparisons": 0, "matches": 0}
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        if len(members) > max_block:
+            stats["skipped_buckets"] += 1
+            continue
+        stats["buckets"] += 1
+        stats["comparisons"] += len(members) * (len(members) - 1) // 2
+        # All pairs of the bucket at once in rapidfuzz's C code; scores below the threshold are 0
+        bucket_texts = [texts[i] for i in members]
+        scores = process.cdist(bucket_texts, bucket_texts, scorer=fuzz.ratio, score_cutoff=threshold, dtype=np.uint8)
+        for x, y in zip(*np.nonzero(np.triu(scores, 1))):
+            i, j = members[x], members[y]
+            # Pairs in several buckets: only the first match can merge them
+            root_i, root_j = union_find.find(i), union_find.find(j)
+            if root_i == root_j or not confirmed(i, j, ratio_checked=True):
+                continue
+            if (root_i, root_j) != (i, j) and not confirmed(root_i, root_j):
+                continue
+            stats["matches"] += 1
+            union_find.union(root_i, root_j)
+    stats["naive_comparisons"] = len(keys) * (len(keys) - 1) // 2
+
+    # Names without a key are clusters of their own, numbered after the keys
+    clusters = [union_find.find(k) if k is not None else len(keys) + i for i, k in enumerate(name_keys)]
+    stats["clusters"] = len(set(clusters))
+    stats["time_sec"] = round(time.time() - start, 2)
+    return clusters, stats
+
+
+def read_entities(nt_path):
+    """Names of the companies and courts of an N-Triples graph, and each company's court (largest value per subject)."""
+    names = {"company": {}, "court": {}}
+    company_court = {}
+    typed = {str(EX.Company): "company", str(EX.Court): "court"}
+    kinds = {}
+    name_predicates = {str(EX.companyName): "company", str(EX.courtName): "court"}
+    rdf_type, registered_at = str(RDF.type), str(EX.registeredAt)
+
+    for s, p, o, is_literal in iter_nt_statements(nt_path):
+        kind = name_predicates.get(p)
+        if kind is not None:
+            names[kind][s] = max(o, names[kind].get(s, o))
+        elif p == registered_at:
+            company_court[s] = max(o, company_court.get(s, o))
+        elif p == rdf_type and not is_literal and o in typed:
+            kinds[s] = typed[o]
+    # Only subjects of the matching type
+    for kind in names:
+        names[kind] = {s: name for s, name in names[kind].items() if kinds.get(s) == kind}
+    return names, company_court
+
+
+def cluster_links(uris, clusters):
+    """Canonical URI (the smallest member URI) and the member URIs of each cluster."""
+    members = defaultdict(list)
+    for uri, cluster in zip(uris, clusters):
+        members[cluster].append(uri)
+    return {cluster: min(group) for cluster, group in members.items()}, members
+
+
+def write_links(writer, kind, uris, clusters, links="sameas"):
+    """owl:sameAs from each clustered entity to its cluster's canonical URI, or ex:inCluster for every entity."""
+    canonical, members = cluster_links(uris, clusters)
+    written = 0
+    for cluster, group in members.items():
+        if links == "sameas":
+            for uri in group:
+                if uri != canonical[cluster]:
+                    writer.add((URIRef(uri), OWL.sameAs, URIRef(canonical[cluster])))
+                    written += 1
+        else:
+            cluster_uri = URIRef(f"{CLUSTER}{kind}/{canonical[cluster].rsplit('/', 1)[-1]}")
+            for uri in group:
+                writer.add((URIRef(uri), EX.inCluster, cluster_uri))
+                written += 1
+            writer.add((cluster_uri, EX.clusterSize, Literal(len(group))))
+    return written
+
+
+def resolve_graph(nt_path, output_path, kinds=("court", "company"), links="sameas", within_court=False,
+                  company_threshold=90, court_threshold=92, show=0, **options):
+    """Resolve the companies and/or courts of an N-Triples graph and write the link triples."""
+    names, company_court = read_entities(nt_path)
+    court_cluster = {}
+    with TripleWriter(output_path, "nt") as writer:
+        for kind in ("court", "company"):
+            if kind not in kinds:
+                continue
+            uris = sorted(names[kind])
+            groups = None
+            if kind == "company" and within_court:
+                # Courts resolved above count as the same court
+                groups = [court_cluster.get(company_court.get(uri), company_court.get(uri)) for uri in uris]
+            if kind == "company":
+                kind_options = {"threshold": company_threshold}
+            else:
+                kind_options = {"threshold": court_threshold, "stop_words": COURT_WORDS, "compare_core": True}
+            clusters, stats = resolve_names([names[kind][uri] for uri in uris], groups=groups, **kind_options, **options)
+            if kind == "court":
+                canonical, _ = cluster_links(uris, clusters)
+                court_cluster = {uri: canonical[cluster] for uri, cluster in zip(uris, clusters)}
+            stats["links"] = write_links(writer, kind, uris, clusters, links)
+            print(f"🔗 {kind}: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+            if show:
+                show_clusters(kind, uris, clusters, names[kind], show)
+    print(f"💾 {writer.count} link triples saved to: {output_path}")
+    return writer.count
+
+
+def show_clusters(kind, uris, clusters, names, limit):
+    members = defaultdict(list)
+    for uri, cluster in zip(uris, clusters):
+        members[cluster].append(names[uri])
+    merged = sorted((group for group in members.values() if len(set(group)) > 1), key=len, reverse=True)
+    for group in merged[:limit]:
+        print(f"   {kind}: " + " | ".join(sorted(set(group))[:8]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fuzzy entity resolution of the companies and courts of an N-Triples graph "
+                    "(json2rdf or rdf_postprocesing --stream output), written as owl:sameAs or cluster links."
+    )
+    parser.add_argument("--input", required=True, help="N-Triples graph.")
+    parser.add_argument("--output", default=None, help="Link triples (default: <input>_links.nt).")
+    parser.add_argument("--kinds", nargs="+", choices=["company", "court"], default=["court", "company"])
+    parser.add_argument("--links", choices=["sameas", "cluster"], default="sameas",
+                        help="owl:sameAs to a canonical entity, or ex:inCluster for every entity.")
+    parser.add_argument("--company_threshold", type=float, default=90, help="Minimum similarity (0-100) of company names.")
+    parser.add_argument("--court_threshold", type=float, default=92, help="Minimum similarity (0-100) of court names.")
+    parser.add_argument("--within_court", action="store_true", help="Only match companies of the same (resolved) court.")
+    parser.add_argument("--bands", type=int, default=20, help="LSH bands; more bands find more candidate pairs.")
+    parser.add_argument("--rows", type=int, default=3, help="MinHash rows per band; more rows need more similar names.")
+    parser.add_argument("--max_block", type=int, default=500, help="Skip LSH buckets with more names than this.")
+    parser.add_argument("--stop_fraction", type=float, default=0.01,
+                        help="Tokens in more than this fraction of names are left out of the blocking.")
+    parser.add_argument("--show", type=int, default=0, help="Print this many of the largest merged clusters.")
+    args = parser.parse_args()
+
+    output = args.output or args.input.rsplit(".", 1)[0] + "_links.nt"
+    resolve_graph(
+        args.input, output, kinds=args.kinds, links=args.links, within_court=args.within_court,
+        company_threshold=args.company_threshold, court_threshold=args.court_threshold, show=args.show,
+        bands=args.bands, rows=args.rows, max_block=args.max_block, stop_fraction=args.stop_fraction,
+    )
@@ -30,20 +30,19 @@ def compute_weighted_similarity(gt_item, parsed_item):
     return score
 
 # --- Main Comparison ---
-def compare_jsons(gt_path, parsed_path):
-    with open(gt_path, 'r', encoding='utf-8') as f:
-        gt_data = json.load(f)
-    with open(parsed_path, 'r', encoding='utf-8') as f:
-        parsed_data = json.load(f)
-
+def score_records(gt_data, parsed_data):
+    """
+    Greedily match every GT record to its most similar unmatched parsed record.
+    Returns a dict with max_score, obtained_score, similarity, the matches
+    (gt index, parsed index or None, score) and the Registration_Code mismatches.
+    """
     ideal_weighted_similarity_score = sum(weight for _, weight in weights.values())
     max_score = len(gt_data) * ideal_weighted_similarity_score
     obtained_score = 0
     matched_indices = set()
+    matches = []
     mismatched_reg_codes = []
 
-    print("Detailed Comparison Results:\n")
-
     for i, gt_item in enumerate(gt_data):
         best_score = 0
         best_match_index = None
@@ -65,8 +64,7 @@ def compare_jsons(gt_path, parsed_path):
             parsed_item = {}
 
         obtained_score += best_score
-        print(f"GT Record {i+1}: best match → Parsed Record {best_match_index+1 if best_match_index is not None else 'None'} "
-              f"with weighted_similarity_score = {best_score} / {ideal_weighted_similarity_score}")
+        matches.append((i, best_match_index, best_score))
 
         # --- Check for Registration_Code mismatch ---
         gt_code = gt_item.get("Registration_Code")
@@ -75,9 +73,37 @@ def compare_jsons(gt_path, parsed_path):
         # Only flag if they differ (not both None or equal)
         if (gt_code or parsed_code) and (str(gt_code).strip().lower() != str(parsed_code).strip().lower()):
             mismatched_reg_codes.append((i + 1, gt_code, parsed_code, gt_item, parsed_item))
-    
+
+    return {
+        "ideal_record_score": ideal_weighted_similarity_score,
+        "max_score": max_score,
+        "obtained_score": obtained_score,
+        "similarity": obtained_score / max_score if max_score else 0,
+        "matches": matches,
+        "mismatched_reg_codes": mismatched_reg_codes,
+    }
+
+
+def compare_jsons(gt_path, parsed_path):
+    with open(gt_path, 'r', encoding='utf-8') as f:
+        gt_data = json.load(f)
+    with open(parsed_path, 'r', encoding='utf-8') as f:
+        parsed_data = json.load(f)
+
+    result = score_records(gt_data, parsed_data)
+    ideal_weighted_similarity_score = result["ideal_record_score"]
+    max_score = result["max_score"]
+    obtained_score = result["obtained_score"]
+    mismatched_reg_codes = result["mismatched_reg_codes"]
+
+    print("Detailed Comparison Results:\n")
+
+    for i, best_match_index, best_score in result["matches"]:
+        print(f"GT Record {i+1}: best match → Parsed Record {best_match_index+1 if best_match_index is not None else 'None'} "
+              f"with weighted_similarity_score = {best_score} / {ideal_weighted_similarity_score}")
+
     # --- Summary ---
-    overall_similarity = obtained_score / max_score if max_score else 0
+    overall_similarity = result["similarity"]
 
     print("\n--- Registration_Code Mismatches ---")
     if not mismatched_reg_codes:
@@ -1,16 +1,25 @@
 import os
 import json
 import traceback
-import re
 import logging
 import argparse
 from pathlib import Path
 import asyncio
-import aiohttp
-from groq import Groq
+import contextlib
 import time
 import logging
-from prompts import EXTRACTION_PROMPT_DE, EXTRACTION_PROMPT_EN, mistral_EXTRACTION_PROMPT_DE
+from prompts import PROMPTS, BATCH_INSTRUCTIONS_DE
+from llm_cache import ResponseCache
+from adaptive_limiter import backoff_delay, parse_retry_after
+from relevance_filter import filter_chunks
+from chunking import approx_token_count
+from json_records import iter_json_objects, parse_object, extract_records
+from record_dedup import merge_adjacent_duplicates
+import request_metrics as metrics
+from run_schedule import BudgetExhausted
+from ocr_normalize import read_normalized
+from llm_stream import read_stream, stopped_by_repetition, StreamedText
+from provider_clients import make_session, get_groq_client, close_provider_clients
 from dotenv import load_dotenv
 from tabulate import tabulate  # pip install tabulate
 import csv
@@ -31,7 +40,7 @@ OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gemma3:12b")
 # OpenRouter setup
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "meta-llama/llama-3.3-70b-instruct:free")
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
 
 # Groq setup
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -46,17 +55,138 @@ MAIA_URL = os.getenv("MAIA_URL")
 UNIHPC_URL = os.getenv("UNIHPC_URL")
 UNIHPC_MODEL = os.getenv("UNIHPC_MODEL", "qwen2.5vl:72b")
 
-# Choose prompt language
-EXTRACTION_PROMPT = EXTRACTION_PROMPT_DE # EXTRACTION_PROMPT_DE
+# Keep Ollama-style models loaded between requests so the shared prompt prefix stays cached
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Prompt variant (see prompts.PROMPTS); <PROVIDER>_PROMPT in .env selects one per provider
+PROMPT_VARIANT = os.getenv("EXTRACTION_PROMPT_VARIANT", "de")
+PROVIDER_PROMPTS = {}
+
+TEMPERATURE = 0.01
+
+# Stream answers (ollama/openrouter/maia/unihpc) and stop on a closed JSON array or repetition loops
+LLM_STREAM = os.getenv("LLM_STREAM", "false").lower() in ("1", "true", "yes")
+
+# Repair mojibake and the long s in the input before chunking (cached next to the inputs)
+OCR_NORMALIZE = os.getenv("OCR_NORMALIZE", "false").lower() in ("1", "true", "yes")
+
+# Response cache setup (optional, enabled when LLM_CACHE_PATH is set)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "1024"))
+RESPONSE_CACHE = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_MB) if LLM_CACHE_PATH else None
+
+
+class ProviderHTTPError(Exception):
+    """Non-200 answer from a provider API, keeping the status code and Retry-After delay."""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def raise_for_provider_status(name, response, body):
+    """Raise ProviderHTTPError for a non-200 aiohttp response."""
+    if response.status != 200:
+        raise ProviderHTTPError(
+            f"{name} API error {response.status}: {body}",
+            status=response.status,
+            retry_after=parse_retry_after(response.headers.get("Retry-After")),
+        )
+
+
+def set_streaming(enabled):
+    """Switch streamed requests with early termination on or off."""
+    global LLM_STREAM
+    LLM_STREAM = enabled
+
+
+def set_input_normalization(enabled):
+    """Read inputs through ocr_normalize (see OCR_NORMALIZE)."""
+    global OCR_NORMALIZE
+    OCR_NORMALIZE = enabled
+
+
+def set_response_cache(cache):
+    """Replace the module-wide response cache (None disables caching)."""
+    global RESPONSE_CACHE
+    RESPONSE_CACHE = cache
+
+
+def set_prompt_variant(name, provider=None):
+    """Use prompt variant `name` for the run, or only for `provider`."""
+    if name not in PROMPTS:
+        raise ValueError(f"Unknown prompt variant '{name}' (available: {', '.join(PROMPTS)})")
+    global PROMPT_VARIANT
+    if provider is None:
+        PROMPT_VARIANT = name
+    else:
+        PROVIDER_PROMPTS[provider.lower()] = name
+
+
+def get_prompt_variant(provider):
+    """Prompt variant for a provider: set_prompt_variant(provider=...), <PROVIDER>_PROMPT, then the run default."""
+    name = PROVIDER_PROMPTS.get(provider.lower()) or os.getenv(f"{provider.upper()}_PROMPT") or PROMPT_VARIANT
+    if name not in PROMPTS:
+        raise ValueError(f"Unknown prompt variant '{name}' for {provider} (available: {', '.join(PROMPTS)})")
+    return name
+
+
+def get_provider_model(provider):
+    """Model name configured for a provider."""
+    return {
+        "ollama": OLLAMA_MODEL,
+        "openrouter": OPENROUTER_MODEL,
+        "groq": GROQ_MODEL,
+        "maia": MAIA_MODEL,
+        "unihpc": UNIHPC_MODEL,
+    }.get(provider.lower())
+
+
+async def extract_info_from_text(text, provider, session=None, instructions=None, accept=None):
+    """
+    Async request depending on provider, answered from the response cache when possible.
+    `instructions` are appended to the extraction prompt (e.g. for batched requests).
+    `provider` is a provider name or a provider_router.ProviderRouter.
+    With `accept`, only answers for which accept(answer) is true are cached.
+    """
+    if not isinstance(provider, str):
+        # The router picks a backend and calls back with its name
+        return await provider.extract(text, session=session, instructions=instructions, accept=accept)
 
-async def extract_info_from_text(text, provider, session=None):
-    """Async request depending on provider"""
     system_message = "You are an information extraction model. "
     "Your only task is to extract structured legal data from historical German newspaper entries. "
     "You must respond ONLY with valid JSON — no text, no explanations, no markdown, no prose. "
     "The JSON must strictly follow the format defined below."
-    user_message = EXTRACTION_PROMPT.strip() + "\n\nTEXT:\n"+ text.strip()
+    variant = get_prompt_variant(provider)
+    prompt = PROMPTS[variant].strip()
+    if instructions:
+        prompt += "\n\n" + instructions.strip()
+    user_message = prompt + "\n\nTEXT:\n"+ text.strip()
+
+    with metrics.request_trace(provider.lower(), get_provider_model(provider)):
+        metrics.annotate(prompt=variant)
+        cache_key = None
+        if RESPONSE_CACHE is not None:
+            cache_key = RESPONSE_CACHE.make_key(
+                provider.lower(), get_provider_model(provider), system_message, prompt, text.strip(), TEMPERATURE
+            )
+            cached = RESPONSE_CACHE.get(cache_key)
+            if cached is not None:
+                metrics.annotate(cached=True)
+                return cached
+
+        result = await request_provider(provider, system_message, user_message, session=session)
+
+    # An answer cut off in a repetition loop is used for this run but asked for again next time
+    if (cache_key is not None and result and result.strip() and not stopped_by_repetition(result)
+            and (accept is None or accept(result))):
+        RESPONSE_CACHE.put(cache_key, result)
+    return result
 
+
+async def request_provider(provider, system_message, user_message, session=None):
+    """Send one chat request to the given provider and return the raw model output"""
     if provider.lower() == "ollama":
         url = f"{OLLAMA_URL}/chat" if not OLLAMA_URL.endswith("/chat") else OLLAMA_URL
         data = {
@@ -65,17 +195,22 @@ async def extract_info_from_text(text, provider, session=None):
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": user_message}
             ],
-            "temperature": 0.01,
-            "stream": False
+            "temperature": TEMPERATURE,
+            "stream": LLM_STREAM,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
         }
         async with session.post(url, json=data) as response:
+            if LLM_STREAM:
+                if response.status != 200:
+                    raise_for_provider_status("Ollama", response, await response.text())
+                return await read_stream(response, "ollama-chat", OLLAMA_MODEL)
             text = await response.text()
-            if response.status != 200:
-                raise Exception(f"Ollama API error {response.status}: {text}")
+            raise_for_provider_status("Ollama", response, text)
             try:
                 res = json.loads(text)
             except Exception:
                 raise Exception(f"Ollama returned non-JSON: {text}")
+            metrics.note_usage_from(res)
             return res.get("message", {}).get("content", "")
 
     elif provider.lower() == "openrouter":
@@ -95,32 +230,45 @@ async def extract_info_from_text(text, provider, session=None):
         data = {
             "model": OPENROUTER_MODEL,
             "messages": messages,
-            "temperature": 0.01
+            "temperature": TEMPERATURE,
+            "stream": LLM_STREAM,
         }
 
         async with session.post(OPENROUTER_URL, headers=headers, data=json.dumps(data)) as response:
             if response.status != 200:
-                raise Exception(f"OpenRouter API error: {await response.text()}")
+                raise_for_provider_status("OpenRouter", response, await response.text())
+            if LLM_STREAM:
+                return await read_stream(response, "openai", OPENROUTER_MODEL)
             res = await response.json()
+            metrics.note_usage_from(res)
             return res["choices"][0]["message"]["content"]
 
     elif provider.lower() == "groq":
-        def _call_groq():
-            client = Groq(api_key=GROQ_API_KEY)
-            completion = client.chat.completions.create(
+        try:
+            completion = await get_groq_client().chat.completions.create(
                 model=GROQ_MODEL,
                 messages=[
                     {"role": "system", "content": system_message},
                     {"role": "user", "content": user_message}
                 ],
-                temperature=0.01,
+                temperature=TEMPERATURE,
                 max_completion_tokens=1024,
                 top_p=1,
                 stream=False,
             )
+            if completion.usage is not None:
+                metrics.note_usage(completion.usage.prompt_tokens, completion.usage.completion_tokens)
             return completion.choices[0].message.content
-
-        return await asyncio.to_thread(_call_groq)
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            if status is None:
+                raise
+            headers = getattr(getattr(e, "response", None), "headers", None) or {}
+            raise ProviderHTTPError(
+                f"Groq API error {status}: {e}",
+                status=status,
+                retry_after=parse_retry_after(headers.get("retry-after")),
+            ) from e
 
     elif provider.lower() == "maia":
         headers = {
@@ -133,12 +281,16 @@ async def extract_info_from_text(text, provider, session=None):
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": user_message}
             ],
-            "temperature": 0.01
+            "temperature": TEMPERATURE,
+            "stream": LLM_STREAM,
         }
         async with session.post(MAIA_URL, headers=headers, json=data) as response:
             if response.status != 200:
-                raise Exception(f"MAIA API error: {await response.text()}")
+                raise_for_provider_status("MAIA", response, await response.text())
+            if LLM_STREAM:
+                return await read_stream(response, "openai", MAIA_MODEL)
             res = await response.json()
+            metrics.note_usage_from(res)
             return res["choices"][0]["message"]["content"]
 
     elif provider.lower() == "unihpc":
@@ -148,8 +300,9 @@ async def extract_info_from_text(text, provider, session=None):
             "model": UNIHPC_MODEL,
             "system": system_message,
             "prompt": user_message,
-            "temperature": 0.01,
-            "stream": False,
+            "temperature": TEMPERATURE,
+            "stream": LLM_STREAM,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
             # 'max_tokens': 4096,
         }
 
@@ -157,14 +310,23 @@ async def extract_info_from_text(text, provider, session=None):
         # print(json.dumps(data, indent=2))
 
         async with session.post(UNIHPC_URL, json=data) as response:
+            if LLM_STREAM:
+                if response.status != 200:
+                    raise_for_provider_status("UNI-HPC", response, await response.text())
+                result = await read_stream(response, "ollama-generate", UNIHPC_MODEL)
+                if not result.strip():
+                    logging.warning(f"Empty response from model {UNIHPC_MODEL}")
+                    return "[]"
+                return result
+
             text = await response.text()
-            if response.status != 200:
-                raise Exception(f"UNI-HPC API error {response.status}: {text}")
+            raise_for_provider_status("UNI-HPC", response, text)
 
             try:
                 res = json.loads(text)
             except Exception:
                 raise Exception(f"UNI-HPC returned non-JSON: {text}")
+            metrics.note_usage_from(res)
 
             print("DEBUG UNI-HPC RAW RESPONSE:", res)
 
@@ -181,6 +343,13 @@ async def extract_info_from_text(text, provider, session=None):
         raise ValueError(f"Unsupported provider: {provider}")
 
 
+def journal_status(result):
+    """Journal status of a chunk result: "failed", "truncated" (cut off in a repetition loop, retried on re-runs) or "ok"."""
+    if result is None:
+        return "failed"
+    return "truncated" if stopped_by_repetition(result) else "ok"
+
+
 def smart_chunk_text(text, max_words=5000, overlap_words=50):
     """Split text into chunks of max_words with overlap."""
     words = text.split()
@@ -196,6 +365,172 @@ def smart_chunk_text(text, max_words=5000, overlap_words=50):
 
     logging.info(f"Total chunks created: {len(chunks)}")
     return chunks
+
+
+async def extract_chunk_with_retries(
+    chunk_id,
+    chunk,
+    session,
+    provider=None,
+    max_retries=3,
+    semaphore=None,
+    journal=None,
+    file_key=None,
+    limiter=None,
+    budget=None,
+):
+    """
+    Send one chunk to the provider, retrying on errors or empty answers.
+    With a journal, chunks finished in an earlier run are taken from it and
+    new outcomes are appended to it. With a run_schedule.TimeBudget that is
+    used up, BudgetExhausted is raised instead of sending the chunk.
+    Returns (raw_result or None, elapsed seconds).
+    """
+    if journal is not None:
+        result = journal.get(file_key, chunk_id, chunk)
+        if result is not None:
+            logging.info(f"📓 Chunk {chunk_id+1} restored from journal")
+            return result, 0.0
+
+    async def request():
+        result = await extract_info_from_text(chunk, provider=provider, session=session)
+        return result if result and result.strip() else None
+
+    trace_fields = {"file": file_key, "chunk": chunk_id + 1}
+    result, elapsed = await call_with_retries(
+        f"chunk {chunk_id+1}", request, max_retries=max_retries, semaphore=semaphore, limiter=limiter,
+        trace_fields=trace_fields, budget=budget,
+    )
+    if journal is not None:
+        journal.record(file_key, chunk_id, chunk, result, journal_status(result))
+    return result, elapsed
+
+
+async def call_with_retries(
+    label, request, max_retries=3, semaphore=None, limiter=None, trace_fields=None, budget=None
+):
+    """
+    Await request() until it returns a result other than None.
+    With an AdaptiveLimiter, the limiter replaces the semaphore and learns
+    the provider's concurrency from the request outcomes. The time spent
+    waiting for a slot and `trace_fields` go into the request metrics.
+    Each attempt first checks the `budget` (BudgetExhausted is passed on).
+    Returns (result or None, elapsed seconds).
+    """
+    start_time = time.time()
+    for attempt in range(1, max_retries + 1):
+        error = None
+        try:
+            gate = limiter.slot() if limiter is not None else (semaphore or contextlib.nullcontext())
+            wait_start = time.time()
+            async with gate:
+                if budget is not None:
+                    budget.check(label)
+                metrics.start_attempt(label, attempt, round(time.time() - wait_start, 4), trace_fields)
+                result = await request()
+            if result is not None:
+                elapsed = time.time() - start_time
+                logging.info(f"🟢 Finished {label} in {elapsed:.2f}s (attempt {attempt})")
+                return result, elapsed
+        except BudgetExhausted:
+            raise
+        except Exception as e:
+            error = e
+            logging.error(f"❌ {label.capitalize()} failed on attempt {attempt}: {e}")
+        if attempt < max_retries:
+            await asyncio.sleep(backoff_delay(error, attempt))
+    elapsed = time.time() - start_time
+    logging.error(f"🚫 {label.capitalize()} failed after {max_retries} retries ({elapsed:.2f}s)")
+    return None, elapsed
+
+
+def split_batch_response(raw, num_chunks):
+    """
+    Split the answer to a batched request into one JSON array string per chunk.
+    Returns None if any record lacks a valid "Chunk_id".
+    """
+    per_chunk = [[] for _ in range(num_chunks)]
+    for fragment, truncated in iter_json_objects(raw):
+        record, _ = parse_object(fragment, truncated)
+        if not isinstance(record, dict):
+            continue
+        chunk_no = record.pop("Chunk_id", None)
+        try:
+            chunk_no = int(chunk_no)
+        except (TypeError, ValueError):
+            return None
+        if not 1 <= chunk_no <= num_chunks:
+            return None
+        per_chunk[chunk_no - 1].append(record)
+    return [json.dumps(records, ensure_ascii=False) for records in per_chunk]
+
+
+async def extract_batch_with_retries(
+    chunks, session, provider=None, max_retries=3, limiter=None, budget=None, trace_fields=None
+):
+    """
+    Send several short chunks in one request, tagged "### TEXT 1", "### TEXT 2", ...
+    Returns a list with one raw JSON array string per chunk, or None if the
+    request failed or its answer could not be attributed to the chunks.
+    Only answers that can be attributed are cached. `trace_fields` (one
+    dict per chunk) name the files the request is counted towards in the
+    request metrics.
+    """
+    batch_text = "\n\n".join(f"### TEXT {i}\n{chunk.strip()}" for i, chunk in enumerate(chunks, start=1))
+
+    async def request():
+        result = await extract_info_from_text(
+            batch_text, provider=provider, session=session, instructions=BATCH_INSTRUCTIONS_DE,
+            accept=lambda answer: split_batch_response(answer, len(chunks)) is not None,
+        )
+        return result if result and result.strip() else None
+
+    raw, _ = await call_with_retries(
+        f"batch of {len(chunks)} chunks", request, max_retries=max_retries, limiter=limiter, budget=budget,
+        trace_fields={"files": [fields.get("file") for fields in trace_fields]} if trace_fields else None,
+    )
+    if raw is None:
+        return None
+    results = split_batch_response(raw, len(chunks))
+    if results is None:
+        logging.warning(f"⚠️ Batch answer without usable Chunk_id, re-sending {len(chunks)} chunks one by one")
+        return None
+    if stopped_by_repetition(raw):
+        # The chunk results inherit the cut-off, so they are not journaled as finished
+        results = [StreamedText(result, raw.stop_reason) for result in results]
+    return results
+
+
+def collect_records(chunk_results, chunks=None, file_key=None):
+    """
+    Extract and validate the records of all raw chunk responses (None entries are skipped).
+    Each record is parsed on its own, so one malformed object only loses that record.
+    With the chunk texts, records extracted twice from neighbouring chunks
+    are merged (see record_dedup). The parse outcome of each chunk goes into
+    the request metrics under `file_key`.
+    Returns (records, number of rejected objects).
+    """
+    chunk_records = []
+    rejected = 0
+    for chunk_id, result in enumerate(chunk_results):
+        records = []
+        if result:
+            records, stats = extract_records(result)
+            metrics.record_parse(f"chunk {chunk_id+1}", stats, {"file": file_key, "chunk": chunk_id + 1})
+            rejected += stats["rejected"]
+            if stats["salvaged"]:
+                logging.info(f"🩹 Salvaged {stats['salvaged']} malformed records")
+        chunk_records.append(records)
+
+    if chunks is None:
+        return [r for records in chunk_records for r in records], rejected
+
+    records, merged = merge_adjacent_duplicates(chunk_records, chunks)
+    if merged:
+        logging.info(f"🔗 Merged {merged} duplicate records from overlapping chunks")
+    return records, rejected
+
+
 async def process_chunks(
     chunks,
     mode="parallel",
@@ -203,32 +538,44 @@ async def process_chunks(
     max_concurrent=5,
     max_retries=3,
     provider=None,
+    journal=None,
+    file_key=None,
+    limiter=None,
+    session=None,
+    budget=None,
 ):
-    timeout = aiohttp.ClientTimeout(total=180)
+    """
+    Extract all chunks of one file, in parallel or one after another.
+    `session` is the run's shared aiohttp session; without one a session is
+    opened for this call. Chunks not sent because the `budget` ran out are
+    listed in "deferred_chunks".
+    """
     semaphore = asyncio.Semaphore(max_concurrent)
 
     failed_chunks = []
+    deferred_chunks = []
 
     async def process_single_chunk(chunk_id, chunk, session, provider=provider):
-        start_time = time.time()
-        for attempt in range(1, max_retries + 1):
-            try:
-                async with semaphore:
-                    result = await extract_info_from_text(chunk, provider=provider, session=session)
-                if result and result.strip():
-                    elapsed = time.time() - start_time
-                    logging.info(f"🟢 Finished chunk {chunk_id+1} in {elapsed:.2f}s (attempt {attempt})")
-                    return result, elapsed
-            except Exception as e:
-                logging.error(f"❌ Chunk {chunk_id+1} failed on attempt {attempt}: {e}")
-            await asyncio.sleep(1.5 * attempt)
-        elapsed = time.time() - start_time
-        logging.error(f"🚫 Chunk {chunk_id+1} failed after {max_retries} retries ({elapsed:.2f}s)")
-        failed_chunks.append(chunk_id + 1)
-        return None, elapsed
+        try:
+            result, elapsed = await extract_chunk_with_retries(
+                chunk_id, chunk, session,
+                provider=provider, max_retries=max_retries, semaphore=semaphore,
+                journal=journal, file_key=file_key, limiter=limiter, budget=budget,
+            )
+        except BudgetExhausted:
+            deferred_chunks.append(chunk_id + 1)
+            return None, 0.0
+        if result is None:
+            failed_chunks.append(chunk_id + 1)
+        return result, elapsed
 
     # --- main logic ---
-    async with aiohttp.ClientSession(timeout=timeout) as session:
+    own_session = None
+    if session is None:
+        limit = max(max_concurrent, limiter.max_limit) if limiter is not None else max_concurrent
+        session = own_session = make_session(limit=limit)
+
+    try:
         start = time.time()
 
         if mode.lower() == "parallel":
@@ -242,14 +589,12 @@ async def process_chunks(
                 await asyncio.sleep(delay_between)
 
         total_time = time.time() - start
+    finally:
+        if own_session is not None:
+            await own_session.close()
 
-    combined_jsons = []
-    per_chunk_times = []
-    for idx, (result, t) in enumerate(results):
-        per_chunk_times.append(t)
-        if result:
-            matches = re.findall(r'{[\s\S]*?}', result)
-            combined_jsons.extend(matches)
+    per_chunk_times = [t for _, t in results]
+    records, rejected = collect_records([result for result, _ in results], chunks, file_key)
 
     logging.info("=== ⏱️ Chunk processing summary ===")
     logging.info(f"Mode: {mode.upper()} | Total chunks: {len(chunks)} | Total time: {total_time:.2f}s")
@@ -259,33 +604,72 @@ async def process_chunks(
 
     # Return structured info
     return {
-        "results": combined_jsons,
-        "failed_chunks": failed_chunks,
+        "results": records,
+        "rejected": rejected,
+        "failed_chunks": sorted(failed_chunks),
+        "deferred_chunks": sorted(deferred_chunks),
         "total_chunks": len(chunks),
-        "time_sec": round(total_time, 2)
+        "time_sec": round(total_time, 2),
+        "chunk_times": per_chunk_times,
     }
 
 
-async def process_single_file(
-    input_path,
-    output_path,
-    max_words=5000,
-    overlap_words=50,
-    strict=True,
-    mode="parallel",
-    provider=None,
-):
+def prepare_chunks(text, file_name, max_words=5000, overlap_words=50, chunker=None, prefilter_threshold=None):
     """
-    Process a single text file using async extraction pipeline.
-    Returns detailed stats for logging and summary reporting.
+    Chunk a file's text and optionally drop chunks without register notices.
+    Returns (chunks, number of chunks skipped by the prefilter).
     """
+    if chunker is not None:
+        chunks = chunker(text)
+    else:
+        chunks = smart_chunk_text(text, max_words=max_words, overlap_words=overlap_words)
+
+    if prefilter_threshold is None:
+        return chunks, 0
+    kept, skipped = filter_chunks(chunks, threshold=prefilter_threshold)
+    if skipped:
+        logging.info(f"🔎 Prefilter skipped {skipped}/{len(chunks)} chunks of {file_name}")
+    return kept, skipped
+
+
+def prefiltered_file_stats(file_name, mode, skipped):
+    """Stats for a file whose chunks were all skipped by the prefilter."""
+    return {
+        "file": file_name,
+        "mode": mode,
+        "chunks": 0,
+        "time_sec": 0,
+        "status": "⏭️ no register notices (prefilter)",
+        "skipped_chunks": skipped,
+    }
+
+
+def deferred_file_stats(file_name, mode, total_chunks, deferred_chunks, total_time):
+    """Stats for a file left unfinished because the run's time budget ran out."""
+    logging.warning(
+        f"⏸️ {file_name}: {len(deferred_chunks)} of {total_chunks} chunks not sent before the time budget ran out, "
+        "output not written (finished chunks are kept in the journal)"
+    )
+    return {
+        "file": file_name,
+        "mode": mode,
+        "chunks": total_chunks,
+        "time_sec": total_time,
+        "status": f"⏸️ deferred ({len(deferred_chunks)} chunks left)",
+    }
 
+
+def read_input_file(input_path, mode):
+    """
+    Read and strip an input text file, normalized by ocr_normalize if
+    OCR_NORMALIZE is set.
+    Returns (text, None) on success or (None, stats) if the file is missing or empty.
+    """
     input_path = Path(input_path)
-    output_path = Path(output_path)
 
     if not input_path.is_file():
         logging.error(f"Input file not found: {input_path}")
-        return {
+        return None, {
             "file": input_path.name,
             "mode": mode,
             "chunks": 0,
@@ -293,12 +677,15 @@ async def process_single_file(
             "status": "❌ file not found",
         }
 
-    with open(input_path, "r", encoding="utf-8") as f:
-        text = f.read().strip()
+    if OCR_NORMALIZE:
+        text = read_normalized(input_path).strip()
+    else:
+        with open(input_path, "r", encoding="utf-8") as f:
+            text = f.read().strip()
 
     if not text:
         logging.warning(f"Input file is empty: {input_path.name}")
-        return {
+        return None, {
             "file": input_path.name,
             "mode": mode,
             "chunks": 0,
@@ -306,18 +693,26 @@ async def process_single_file(
             "status": "⚠️ empty file",
         }
 
-    logging.info(f"Processing file: {input_path.name}")
+    return text, None
 
-    # --- Processing starts ---
-    start_time = time.time()
-    chunks = smart_chunk_text(text, max_words=max_words, overlap_words=overlap_words)
 
-    result = await process_chunks(chunks, mode=mode, provider=provider)
-    all_matches = result["results"]
-    failed_chunks = result["failed_chunks"]
-    total_chunks = result["total_chunks"]
-
-    total_time = result["time_sec"]
+def save_file_result(
+    input_path,
+    output_path,
+    records,
+    failed_chunks,
+    total_chunks,
+    total_time,
+    strict=True,
+    mode="parallel",
+    rejected=0,
+):
+    """
+    Write the validated records of one file to output_path.
+    Returns the per-file stats dict used in the run summary.
+    """
+    input_path = Path(input_path)
+    output_path = Path(output_path)
 
     if failed_chunks and strict:
         logging.warning(
@@ -331,46 +726,340 @@ async def process_single_file(
             "status": f"❌ failed chunks {failed_chunks}",
         }
 
-    if not all_matches:
-        logging.warning(f"No entities extracted from: {input_path.name}")
+    if not records:
+        if rejected:
+            logging.error(f"JSON parsing error for {input_path.name}: all {rejected} objects invalid")
+        else:
+            logging.warning(f"No entities extracted from: {input_path.name}")
         return {
             "file": input_path.name,
             "mode": mode,
             "chunks": total_chunks,
             "time_sec": total_time,
-            "status": "❌ no data extracted",
+            "status": "❌ parse failed" if rejected else "❌ no data extracted",
         }
 
-    json_array_str = "[" + ",\n".join(all_matches) + "]"
-    try:
-        json_data = json.loads(json_array_str)
-        parse_ok = True
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON parsing error for {input_path.name}: {e}")
-        parse_ok = False
-
-    if strict and not parse_ok:
-        logging.warning(f"Skipping save for {input_path.name} due to parse error (strict mode).")
-        return {
-            "file": input_path.name,
-            "mode": mode,
-            "chunks": total_chunks,
-            "time_sec": total_time,
-            "status": "❌ parse failed",
-        }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as out:
+        json.dump(records, out, ensure_ascii=False, indent=2)
+    logging.info(f"✅ Output saved to: {output_path}")
 
-    if parse_ok:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, "w", encoding="utf-8") as out:
-            json.dump(json_data, out, ensure_ascii=False, indent=2)
-        logging.info(f"✅ Output saved to: {output_path}")
-        return {
-            "file": input_path.name,
-            "mode": mode,
-            "chunks": total_chunks,
-            "time_sec": total_time,
-            "status": "✅ success" if not failed_chunks else f"⚠️ partial success (missing chunks {failed_chunks})",
-        }
+    status = "✅ success" if not failed_chunks else f"⚠️ partial success (missing chunks {failed_chunks})"
+    if rejected:
+        logging.warning(f"Dropped {rejected} invalid records from {input_path.name}")
+        status += f" ({rejected} invalid records dropped)"
+    return {
+        "file": input_path.name,
+        "mode": mode,
+        "chunks": total_chunks,
+        "time_sec": total_time,
+        "status": status,
+    }
+
+
+async def process_single_file(
+    input_path,
+    output_path,
+    max_words=5000,
+    overlap_words=50,
+    strict=True,
+    mode="parallel",
+    provider=None,
+    max_concurrent=5,
+    journal=None,
+    limiter=None,
+    chunker=None,
+    prefilter_threshold=None,
+    session=None,
+    budget=None,
+):
+    """
+    Process a single text file using async extraction pipeline.
+    If a ChunkJournal is given, chunks already finished in an earlier run are
+    reused and only the missing ones are sent to the LLM.
+    `chunker` (text -> list of chunks, e.g. chunking.TokenChunker) replaces
+    the word-based smart_chunk_text. With `prefilter_threshold`, chunks
+    scoring below it in relevance_filter are not sent to the LLM. Pass the
+    run's `session` to keep connections open across files. If the `budget`
+    runs out before all chunks are sent, no output is written.
+    Returns detailed stats for logging and summary reporting.
+    """
+
+    text, stats = read_input_file(input_path, mode)
+    if text is None:
+        return stats
+
+    logging.info(f"Processing file: {Path(input_path).name}")
+
+    # --- Processing starts ---
+    chunks, skipped = prepare_chunks(
+        text, Path(input_path).name, max_words, overlap_words, chunker, prefilter_threshold
+    )
+    if not chunks:
+        return prefiltered_file_stats(Path(input_path).name, mode, skipped)
+
+    result = await process_chunks(
+        chunks,
+        mode=mode,
+        provider=provider,
+        max_concurrent=max_concurrent,
+        journal=journal,
+        file_key=Path(input_path).as_posix(),
+        limiter=limiter,
+        session=session,
+        budget=budget,
+    )
+    if result["deferred_chunks"]:
+        stats = deferred_file_stats(
+            Path(input_path).name, mode, result["total_chunks"], result["deferred_chunks"], result["time_sec"]
+        )
+        stats["skipped_chunks"] = skipped
+        return stats
+
+    stats = save_file_result(
+        input_path,
+        output_path,
+        result["results"],
+        result["failed_chunks"],
+        result["total_chunks"],
+        result["time_sec"],
+        strict=strict,
+        mode=mode,
+        rejected=result["rejected"],
+    )
+    stats["skipped_chunks"] = skipped
+    return stats
+
+
+async def process_files_pooled(
+    file_jobs,
+    max_words=5000,
+    overlap_words=50,
+    strict=True,
+    provider=None,
+    max_concurrent=5,
+    max_retries=3,
+    journal=None,
+    limiter=None,
+    chunker=None,
+    prefilter_threshold=None,
+    batch_tokens=None,
+    batch_max_chunks=8,
+    on_file_done=None,
+    budget=None,
+):
+    """
+    Process many text files on one event loop with one shared HTTP session.
+
+    The chunks of all files feed a single queue served by `max_concurrent`
+    workers, so the number of in-flight requests is bounded across the whole
+    corpus instead of per file and the backend is not left idle between files.
+    `file_jobs` is an iterable of (input_path, output_path) pairs; files are
+    chunked lazily in the given order. Returns one stats dict per file in the
+    same format as process_single_file. A ChunkJournal can be passed to
+    resume interrupted runs chunk by chunk. With an AdaptiveLimiter, enough
+    workers are started to reach its ceiling and the limiter decides how many
+    requests are actually in flight. With `batch_tokens`, a worker packs
+    queued chunks (of any file) into one request up to that many estimated
+    tokens and `batch_max_chunks` chunks. `on_file_done(input_path, stats)`
+    is called as soon as each file is finished. Once the `budget` is used up
+    no further files are taken from `file_jobs` and queued chunks are not
+    sent; their files are reported as deferred and not written.
+    """
+    mode = "pooled"
+    num_workers = max(max_concurrent, limiter.max_limit) if limiter is not None else max_concurrent
+    queue = asyncio.Queue(maxsize=num_workers * 4)
+    summary = []
+
+    def report(input_path, stats):
+        summary.append(stats)
+        if on_file_done is not None:
+            on_file_done(input_path, stats)
+
+    def finish_file(state):
+        total_time = round(time.time() - state["start"], 2)
+        failed_chunks = sorted(state["failed"])
+        if state["deferred"]:
+            stats = deferred_file_stats(
+                state["input_path"].name, mode, len(state["results"]), sorted(state["deferred"]), total_time
+            )
+            stats["skipped_chunks"] = state["skipped"]
+            report(state["input_path"], stats)
+            return
+        try:
+            records, rejected = collect_records(state["results"], state["chunks"], state["input_path"].as_posix())
+            stats = save_file_result(
+                state["input_path"],
+                state["output_path"],
+                records,
+                failed_chunks,
+                len(state["results"]),
+                total_time,
+                strict=strict,
+                mode=mode,
+                rejected=rejected,
+            )
+        except Exception as e:
+            logging.error(f"❌ Unexpected error saving {state['input_path'].name}: {e}")
+            stats = {
+                "file": state["input_path"].name,
+                "mode": mode,
+                "chunks": len(state["results"]),
+                "time_sec": total_time,
+                "status": f"💥 exception: {e}",
+            }
+        stats["skipped_chunks"] = state["skipped"]
+        report(state["input_path"], stats)
+
+    async def producer():
+        jobs = iter(file_jobs)
+        while budget is None or not budget.exhausted():
+            # Taking the next job may block (e.g. waiting for a lease), keep the workers running meanwhile
+            job = await asyncio.to_thread(next, jobs, None)
+            if job is None:
+                break
+            input_path, output_path = job
+            input_path = Path(input_path)
+            # One unreadable file must not stop the workers serving the others
+            try:
+                text, stats = read_input_file(input_path, mode)
+                if text is not None:
+                    logging.info(f"Queueing file: {input_path.name}")
+                    chunks, skipped = prepare_chunks(
+                        text, input_path.name, max_words, overlap_words, chunker, prefilter_threshold
+                    )
+            except Exception as e:
+                logging.error(f"❌ Unexpected error preparing {input_path.name}: {e}")
+                report(input_path, {
+                    "file": input_path.name,
+                    "mode": mode,
+                    "chunks": "-",
+                    "time_sec": 0,
+                    "status": f"💥 exception: {e}",
+                })
+                continue
+            if text is None:
+                report(input_path, stats)
+                continue
+
+            if not chunks:
+                report(input_path, prefiltered_file_stats(input_path.name, mode, skipped))
+                continue
+            state = {
+                "input_path": input_path,
+                "output_path": Path(output_path),
+                "chunks": chunks,
+                "results": [None] * len(chunks),
+                "failed": [],
+                "deferred": [],
+                "pending": len(chunks),
+                "skipped": skipped,
+                "start": time.time(),
+            }
+            for chunk_id, chunk in enumerate(chunks):
+                await queue.put((state, chunk_id, chunk))
+
+        for _ in range(num_workers):
+            await queue.put(None)
+
+    def store_result(state, chunk_id, result, deferred=False):
+        state["results"][chunk_id] = result
+        if deferred:
+            state["deferred"].append(chunk_id + 1)
+        elif result is None:
+            state["failed"].append(chunk_id + 1)
+        state["pending"] -= 1
+        if state["pending"] == 0:
+            finish_file(state)
+
+    async def process_item(session, item):
+        state, chunk_id, chunk = item
+        try:
+            result, _ = await extract_chunk_with_retries(
+                chunk_id, chunk, session, provider=provider, max_retries=max_retries,
+                journal=journal, file_key=state["input_path"].as_posix(), limiter=limiter, budget=budget,
+            )
+        except BudgetExhausted:
+            store_result(state, chunk_id, None, deferred=True)
+            return
+        store_result(state, chunk_id, result)
+
+    async def process_batch(session, batch):
+        if journal is not None:
+            pending = []
+            for state, chunk_id, chunk in batch:
+                restored = journal.get(state["input_path"].as_posix(), chunk_id, chunk)
+                if restored is not None:
+                    store_result(state, chunk_id, restored)
+                else:
+                    pending.append((state, chunk_id, chunk))
+            batch = pending
+
+        if len(batch) > 1:
+            try:
+                results = await extract_batch_with_retries(
+                    [chunk for _, _, chunk in batch], session,
+                    provider=provider, max_retries=max_retries, limiter=limiter, budget=budget,
+                    trace_fields=[
+                        {"file": state["input_path"].as_posix(), "chunk": chunk_id + 1} for state, chunk_id, _ in batch
+                    ],
+                )
+            except BudgetExhausted:
+                for state, chunk_id, _ in batch:
+                    store_result(state, chunk_id, None, deferred=True)
+                return
+            if results is not None:
+                for (state, chunk_id, chunk), result in zip(batch, results):
+                    if journal is not None:
+                        journal.record(state["input_path"].as_posix(), chunk_id, chunk, result, journal_status(result))
+                    store_result(state, chunk_id, result)
+                return
+
+        for item in batch:
+            await process_item(session, item)
+
+    async def worker(session):
+        carry = None
+        stop = False
+        while not stop:
+            item = carry if carry is not None else await queue.get()
+            carry = None
+            if item is None:
+                return
+            if not batch_tokens:
+                await process_item(session, item)
+                continue
+
+            # Pack further queued chunks into the same request while they fit
+            batch = [item]
+            tokens = approx_token_count(item[2])
+            while len(batch) < batch_max_chunks:
+                try:
+                    nxt = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                if tokens + approx_token_count(nxt[2]) > batch_tokens:
+                    carry = nxt
+                    break
+                batch.append(nxt)
+                tokens += approx_token_count(nxt[2])
+            await process_batch(session, batch)
+
+    async with make_session(limit=num_workers) as session:
+        start = time.time()
+        workers = [asyncio.create_task(worker(session)) for _ in range(num_workers)]
+        await producer()
+        await asyncio.gather(*workers)
+    await close_provider_clients()
+
+    logging.info(
+        f"=== ⏱️ Pooled run: {len(summary)} files | max_concurrent={max_concurrent} | "
+        f"Total time: {time.time() - start:.2f}s ==="
+    )
+    return summary
 
 
 if __name__ == "__main__":
@@ -1,119 +1,149 @@
 import os
 import json
+import time
 import glob
-import re
+import hashlib
+import argparse
+from functools import partial
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 from rdflib import Graph, Literal, RDF, RDFS, XSD, Namespace, URIRef
 
+from rdf_text import clean_uri, clean_uri_cached, safe_literal
 
-def safe_literal(value, datatype=None):
-    """Safely create RDF Literals, handling invalid gYear values and other formats."""
-    if value in (None, "", "unbekannt", "unknown", "?", "-", "N/A"):
-        return None
 
-    if datatype == XSD.gYear:
+def get_json_loads(backend="json"):
+    """json.loads, or orjson.loads with backend="orjson" (falls back to json if orjson is not installed)."""
+    if backend == "orjson":
         try:
-            year_str = str(value).strip().replace(".", "")
-            if year_str.isdigit() and 0 < int(year_str) < 9999:
-                return Literal(year_str, datatype=XSD.gYear)
-            else:
-                return Literal(str(value))
-        except Exception:
-            return Literal(str(value))
-
-    return Literal(value, datatype=datatype) if datatype else Literal(value)
-
-
-def clean_uri(s):
-    """Clean a string to make it URI-safe (handles German umlauts)."""
-    if not s:
-        return "unknown"
-    s = s.strip()
-    s = (
-        s.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue")
-        .replace("Ä", "Ae").replace("Ö", "Oe").replace("Ü", "Ue")
-        .replace("ß", "ss")
-    )
-    s = s.replace(" ", "_")
-    s = re.sub(r"[^\w_]", "", s)
-    return s
+            import orjson
+            return orjson.loads
+        except ImportError as e:
+            print(f"⚠️ orjson not available ({e}), using json")
+    elif backend != "json":
+        raise ValueError(f"Unsupported JSON backend: {backend}")
+    return json.loads
+
+
+def load_json_file(file, loads=json.loads):
+    """
+    Records of one extracted JSON file with their fileName, keeping those
+    with court and company name. Files that are not a JSON list (e.g. an
+    {"error": ...} object) are skipped, and so are entries that are not objects.
+    """
+    try:
+        with open(file, "rb") as f:
+            data = loads(f.read())
+    except Exception as e:
+        print(f"⚠️ Skipping {file}: {e}")
+        return []
+    if not isinstance(data, list):
+        print(f"⚠️ Skipping {file}: top level is a {type(data).__name__}, not a list of records")
+        return []
+    file_name = os.path.basename(file)
+    filtered_data = []
+    for entry in data:
+        if not isinstance(entry, dict):
+            continue
+        # Add file_name field to each entry
+        entry["fileName"] = file_name
+        if entry.get("Court_name") and entry.get("Company_name"):
+            filtered_data.append(entry)
+    return filtered_data
 
 
 def load_and_preprocess_json(path):
     """Load JSONs from a folder or file, combine, and filter."""
-    all_data = []
-
     if os.path.isdir(path):
         json_files = glob.glob(os.path.join(path, "*.json"))
     else:
         json_files = [path] if path.lower().endswith(".json") else []
 
+    all_data = []
     for file in json_files:
-        with open(file, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-                # Add file_name field to each entry
-                for d in data:
-                    d["fileName"] = os.path.basename(file)
-                all_data.extend(data)
-            except Exception as e:
-                print(f"⚠️ Skipping {file}: {e}")
-
-    filtered_data = [
-        entry for entry in all_data
-        if entry.get("Court_name") and entry.get("Company_name")
-    ]
-    return filtered_data
+        all_data.extend(load_json_file(file))
+    return all_data
+
+
+def find_json_files(folder, exclude=()):
+    """All .json files below `folder` (outside the `exclude` folders), found in one pass, in a stable order."""
+    excluded = {os.path.abspath(path) for path in exclude}
+    json_files = []
+    stack = [folder]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if os.path.abspath(entry.path) not in excluded:
+                        stack.append(entry.path)
+                elif entry.name.lower().endswith(".json"):
+                    json_files.append(entry.path)
+    return sorted(json_files)
+
+
+EX = Namespace("http://example.org/schema/")
+COMP = Namespace("http://example.org/company/")
+COURT = Namespace("http://example.org/court/")
+
+PREFIXES = {"ex": EX, "rdf": RDF, "rdfs": RDFS, "xsd": XSD}
+
+# Ontology schema written at the top of every graph
+SCHEMA_TRIPLES = [
+    (EX.Company, RDF.type, RDFS.Class),
+    (EX.Court, RDF.type, RDFS.Class),
+    (EX.companyName, RDF.type, RDF.Property),
+    (EX.courtName, RDF.type, RDF.Property),
+    (EX.registeredAt, RDF.type, RDF.Property),
+    (EX.registrationCode, RDF.type, RDF.Property),
+    (EX.registrationYear, RDF.type, RDF.Property),
+    (EX.articleDate, RDF.type, RDF.Property),
+    (EX.fileName, RDF.type, RDF.Property),
+]
+
+
+def record_triples(entry, idx):
+    """Triples of one extracted record (company, its court and the registration details)."""
+    company_uri = URIRef(f"http://example.org/company/{clean_uri(entry.get('Company_name', str(idx)))}")
+    court_uri = URIRef(f"http://example.org/court/{clean_uri_cached(entry.get('Court_name', str(idx)))}")
+
+    yield company_uri, RDF.type, EX.Company
+    yield court_uri, RDF.type, EX.Court
+    yield company_uri, EX.companyName, Literal(entry.get("Company_name"))
+    yield court_uri, EX.courtName, Literal(entry.get("Court_name"))
+    yield company_uri, EX.registeredAt, court_uri
+
+    if entry.get("Registration_Code"):
+        yield company_uri, EX.registrationCode, Literal(entry["Registration_Code"])
+
+    if entry.get("Registration_year"):
+        year_literal = safe_literal(entry["Registration_year"], datatype=XSD.gYear)
+        if year_literal:
+            yield company_uri, EX.registrationYear, year_literal
+
+    if entry.get("Date_of_article"):
+        yield company_uri, EX.articleDate, Literal(entry["Date_of_article"])
+
+    if entry.get("fileName"):
+        yield company_uri, EX.fileName, Literal(entry["fileName"])
 
 
 def json_to_ttl(json_data, ttl_path):
     """Convert JSON list of dicts to RDF/Turtle format."""
-    EX = Namespace("http://example.org/schema/")
-    COMP = Namespace("http://example.org/company/")
-    COURT = Namespace("http://example.org/court/")
-
     g = Graph()
-    g.bind("ex", EX)
-    g.bind("rdf", RDF)
-    g.bind("rdfs", RDFS)
-    g.bind("xsd", XSD)
+    for prefix, namespace in PREFIXES.items():
+        g.bind(prefix, namespace)
 
     # Force RDFLib to keep prefix declarations
     g.add((RDF.type, RDFS.label, Literal("keep_prefix")))
 
     # Define ontology schema
-    g.add((EX.Company, RDF.type, RDFS.Class))
-    g.add((EX.Court, RDF.type, RDFS.Class))
-    g.add((EX.companyName, RDF.type, RDF.Property))
-    g.add((EX.courtName, RDF.type, RDF.Property))
-    g.add((EX.registeredAt, RDF.type, RDF.Property))
-    g.add((EX.registrationCode, RDF.type, RDF.Property))
-    g.add((EX.registrationYear, RDF.type, RDF.Property))
-    g.add((EX.articleDate, RDF.type, RDF.Property))
-    g.add((EX.fileName, RDF.type, RDF.Property))
+    for triple in SCHEMA_TRIPLES:
+        g.add(triple)
 
     for idx, entry in enumerate(json_data):
-        company_uri = URIRef(f"http://example.org/company/{clean_uri(entry.get('Company_name', str(idx)))}")
-        court_uri = URIRef(f"http://example.org/court/{clean_uri(entry.get('Court_name', str(idx)))}")
-
-        g.add((company_uri, RDF.type, EX.Company))
-        g.add((court_uri, RDF.type, EX.Court))
-        g.add((company_uri, EX.companyName, Literal(entry.get("Company_name"))))
-        g.add((court_uri, EX.courtName, Literal(entry.get("Court_name"))))
-        g.add((company_uri, EX.registeredAt, court_uri))
-
-        if entry.get("Registration_Code"):
-            g.add((company_uri, EX.registrationCode, Literal(entry["Registration_Code"])))
-
-        if entry.get("Registration_year"):
-            year_literal = safe_literal(entry["Registration_year"], datatype=XSD.gYear)
-            if year_literal:
-                g.add((company_uri, EX.registrationYear, year_literal))
-
-        if entry.get("Date_of_article"):
-            g.add((company_uri, EX.articleDate, Literal(entry["Date_of_article"])))
-
-        if entry.get("fileName"):
-            g.add((company_uri, EX.fileName, Literal(entry["fileName"])))
+        for triple in record_triples(entry, idx):
+            g.add(triple)
 
     # Serialize with full URIs (not compacted prefixes)
     ttl_data = g.serialize(format="turtle")
@@ -125,35 +155,332 @@ def json_to_ttl(json_data, ttl_path):
 
     print(f"✅ RDF graph successfully generated at: {ttl_path}")
 
+
+NT_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def nt_term(term):
+    """N-Triples form of an rdflib URIRef or Literal (also valid Turtle)."""
+    if isinstance(term, Literal):
+        lexical = f'"{str(term).translate(NT_ESCAPES)}"'
+        if term.language:
+            return f"{lexical}@{term.language}"
+        if term.datatype is not None and term.datatype != XSD.string:
+            return f"{lexical}^^<{term.datatype}>"
+        return lexical
+    return f"<{term}>"
+
+
+class TripleWriter:
+    """
+    Write triples straight to an N-Triples (fmt="nt") or Turtle (fmt="ttl")
+    file as they are produced, instead of collecting them in a Graph.
+
+    Like a Graph, each distinct triple is written once: only an 8-byte
+    digest per written triple is kept in memory. Callers that produce no
+    duplicates can pass dedup=False to skip that. The Turtle output is the
+    prefix header followed by one statement per triple.
+    """
+
+    def __init__(self, path, fmt="nt", dedup=True):
+        if fmt not in ("nt", "ttl"):
+            raise ValueError(f"Unknown RDF format '{fmt}' (use 'nt' or 'ttl')")
+        self.path = path
+        self.fmt = fmt
+        self.count = 0
+        self.duplicates = 0
+        self._seen = set() if dedup else None
+        self._file = open(path, "w", encoding="utf-8", buffering=1 << 20)
+        if fmt == "ttl":
+            for prefix, namespace in PREFIXES.items():
+                self._file.write(f"@prefix {prefix}: <{namespace}> .\n")
+            self._file.write("\n")
+
+    def add(self, triple):
+        self.add_line(" ".join(nt_term(term) for term in triple) + " .\n")
+
+    def add_line(self, line):
+        """Write an N-Triples line (ending in " .\\n") unless it was written before."""
+        if self._seen is not None:
+            digest = hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest()
+            if digest in self._seen:
+                self.duplicates += 1
+                return
+            self._seen.add(digest)
+        self._file.write(line)
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def json_to_rdf_stream(records, rdf_path, fmt="nt"):
+    """
+    Streaming variant of json_to_ttl: `records` may be any iterable (e.g. a
+    generator over the JSON files) and every triple is written to `rdf_path`
+    as soon as it is produced, so memory does not grow with the graph.
+    Returns the number of triples written.
+    """
+    with TripleWriter(rdf_path, fmt) as writer:
+        for triple in SCHEMA_TRIPLES:
+            writer.add(triple)
+        for idx, entry in enumerate(records):
+            for triple in record_triples(entry, idx):
+                writer.add(triple)
+    print(f"✅ {writer.count} triples ({writer.duplicates} duplicates skipped) written to: {rdf_path}")
+    return writer.count
+
+
+def iter_json_records(json_files, workers=1, backend="json"):
+    """
+    Filtered records of the given JSON files, in file order. With more than
+    one worker the files are parsed in a process pool and the records are
+    yielded as the files come back, so they can be streamed into the writer.
+    """
+    load = partial(load_json_file, loads=get_json_loads(backend))
+    if workers == 1 or len(json_files) < 2:
+        for json_file in json_files:
+            yield from load(json_file)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Only a few files per process are parsed ahead, so records do not pile up in memory
+        files = iter(json_files)
+        pending = deque(pool.submit(load, f) for f in islice(files, 4 * workers))
+        while pending:
+            records = pending.popleft().result()
+            next_file = next(files, None)
+            if next_file is not None:
+                pending.append(pool.submit(load, next_file))
+            yield from records
+
+
+FRAGMENT_VERSION = "1"  # bump when record_triples or SCHEMA_TRIPLES change, to rebuild all fragments
+FRAGMENT_MANIFEST = "manifest.json"
+SCHEMA_FRAGMENT = "_schema.nt"
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def build_fragment(json_file, fragment_path, loads=json.loads):
+    """Write the triples of one JSON file to its own N-Triples fragment. Returns (records, triples)."""
+    records = load_json_file(json_file, loads)
+    tmp = f"{fragment_path}.tmp"
+    with TripleWriter(tmp, "nt") as writer:
+        for idx, entry in enumerate(records):
+            for triple in record_triples(entry, idx):
+                writer.add(triple)
+    os.replace(tmp, fragment_path)
+    return len(records), writer.count
+
+
+def build_incremental(folder, fragment_dir, workers=1, backend="json", exclude=()):
+    """
+    Keep one N-Triples fragment per JSON file in `fragment_dir` and rebuild
+    only the fragments of new or changed files (by size/mtime, confirmed by
+    a content hash); fragments of deleted files are removed. The manifest
+    maps each JSON file (relative to `folder`) to its hash and fragment.
+    Returns the fragment paths in file order (schema first) and the counts
+    of unchanged, added, changed and removed files.
+    """
+    os.makedirs(fragment_dir, exist_ok=True)
+    manifest_path = os.path.join(fragment_dir, FRAGMENT_MANIFEST)
+    schema_path = os.path.join(fragment_dir, SCHEMA_FRAGMENT)
+    rebuild_schema = not os.path.isfile(schema_path)
+    manifest = {"version": FRAGMENT_VERSION, "files": {}}
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("version") == FRAGMENT_VERSION:
+            manifest = stored
+        else:
+            print("ℹ️  Triple generation changed since the last build, rebuilding all fragments")
+            # Fragments of the old version (also of files deleted since) would be left behind
+            for entry in stored.get("files", {}).values():
+                fragment_path = os.path.join(fragment_dir, entry["fragment"])
+                if os.path.isfile(fragment_path):
+                    os.remove(fragment_path)
+            rebuild_schema = True
+    known = manifest["files"]
+
+    if rebuild_schema:
+        tmp = f"{schema_path}.tmp"
+        with TripleWriter(tmp, "nt") as writer:
+            for triple in SCHEMA_TRIPLES:
+                writer.add(triple)
+        os.replace(tmp, schema_path)
+
+    counts = {"unchanged": 0, "added": 0, "changed": 0, "removed": 0}
+    current, todo = {}, []
+    for json_file in find_json_files(folder, exclude=[fragment_dir, *exclude]):
+        relative = os.path.relpath(json_file, folder).replace(os.sep, "/")
+        stat = os.stat(json_file)
+        entry = known.get(relative)
+        fragment = hashlib.sha1(relative.encode("utf-8")).hexdigest()[:16] + ".nt"
+        fragment_path = os.path.join(fragment_dir, fragment)
+        if entry and os.path.isfile(fragment_path):
+            if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                current[relative] = entry
+                counts["unchanged"] += 1
+                continue
+            sha = file_sha256(json_file)
+            if sha == entry["sha256"]:
+                # Touched but not changed
+                current[relative] = {**entry, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                counts["unchanged"] += 1
+                continue
+        else:
+            sha = file_sha256(json_file)
+        counts["changed" if entry else "added"] += 1
+        current[relative] = {"sha256": sha, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "fragment": fragment}
+        todo.append((relative, json_file, fragment_path))
+
+    for relative, entry in known.items():
+        if relative not in current:
+            counts["removed"] += 1
+            fragment_path = os.path.join(fragment_dir, entry["fragment"])
+            if os.path.isfile(fragment_path):
+                os.remove(fragment_path)
+
+    start = time.time()
+    build = partial(build_fragment, loads=get_json_loads(backend))
+    if workers == 1 or len(todo) < 2:
+        results = [build(json_file, fragment_path) for _, json_file, fragment_path in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(build, [t[1] for t in todo], [t[2] for t in todo]))
+    for (relative, _, _), (records, triples) in zip(todo, results):
+        current[relative].update(records=records, triples=triples)
+    if todo:
+        print(f"🧩 Built {len(todo)} fragments in {time.time() - start:.1f}s")
+
+    manifest["files"] = current
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, manifest_path)
+
+    fragments = [schema_path] + [os.path.join(fragment_dir, current[r]["fragment"]) for r in sorted(current)]
+    return fragments, counts
+
+
+def combine_fragments(fragments, rdf_path, fmt="nt"):
+    """Concatenate fragments into one file, writing triples shared by several files (courts) once."""
+    with TripleWriter(rdf_path, fmt) as writer:
+        for fragment in fragments:
+            with open(fragment, "r", encoding="utf-8") as f:
+                for line in f:
+                    writer.add_line(line)
+    print(f"✅ {writer.count} triples ({writer.duplicates} duplicates skipped) written to: {rdf_path}")
+    return writer.count
+
+
 if __name__ == "__main__":
     # Go 3 levels up (from kg4cr/Extr_DE_newspapers/json2rdf.py → KG4CR/)
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+    parser = argparse.ArgumentParser(description="Convert the extracted JSON records into one RDF file.")
+    parser.add_argument(
+        "--input",
+        default=os.path.join(BASE_DIR, "data", "processed", "DE_newspapers_1920_45_processed"),
+        help="Folder with the extracted JSON files (searched recursively).",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="RDF file to write (default: Qlever/DE_1920_45_comb_ontology.<ttl|nt> in the input folder).",
+    )
+    parser.add_argument(
+        "--writer",
+        choices=["graph", "stream"],
+        default="graph",
+        help="graph: build an rdflib Graph and serialize it as compact Turtle; stream: write every triple "
+             "to disk as records are read (bounded memory, much faster on the full corpus).",
+    )
+    parser.add_argument(
+        "--incremental",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="FRAGMENT_DIR",
+        help="Keep per-file N-Triples fragments (default: Qlever/fragments) and only convert new or changed "
+             "JSON files, then combine the fragments into the output.",
+    )
+    parser.add_argument(
+        "--no_combine",
+        action="store_true",
+        help="With --incremental: only update the fragments (e.g. for CAT_INPUT_FILES in the Qleverfile).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes parsing the JSON files (default: one per CPU; 1 loads them in this process).",
+    )
+    parser.add_argument(
+        "--json_backend",
+        choices=["json", "orjson"],
+        default="json",
+        help="JSON parser; orjson is considerably faster if installed.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["ttl", "nt"],
+        default="ttl",
+        help="Output format of the stream writer. QLever indexes N-Triples directly.",
+    )
+    args = parser.parse_args()
+
     # Define input/output folders
-    folder_path = os.path.join(BASE_DIR, "data", "processed", "DE_newspapers_1920_45_processed")
+    folder_path = args.input
     # Define TTL output path inside a 'Qlever' subfolder
     qlever_folder = os.path.join(folder_path, "Qlever")
-    ttl_path = os.path.join(qlever_folder, "DE_1920_45_comb_ontology.ttl")
+    extension = args.format if args.writer == "stream" or args.incremental is not None else "ttl"
+    ttl_path = args.output or os.path.join(qlever_folder, f"DE_1920_45_comb_ontology.{extension}")
 
     # Ensure directory exists
-    os.makedirs(qlever_folder, exist_ok=True)
-
-    # Collect all JSON file paths from all subfolders
-    all_json_files = []
-    for root, _, files in os.walk(folder_path):
-        for f in files:
-            if f.lower().endswith(".json"):
-                all_json_files.append(os.path.join(root, f))
-
-    print(f"🔍 Found {len(all_json_files)} JSON files to process across subfolders.")
-
-    # Load and preprocess data from all JSONs
-    combined_data = []
-    for json_file in all_json_files:
-        data = load_and_preprocess_json(json_file)  # assuming this takes a file path now
-        combined_data.extend(data)
-    print(f"ℹ️  Combined and filtered to {len(combined_data)} valid entries.")
-    # Convert to RDF/Turtle
-    json_to_ttl(combined_data, ttl_path)
-
-    print(f"✅ RDF graph successfully generated at: {ttl_path}")
+    os.makedirs(os.path.dirname(os.path.abspath(ttl_path)), exist_ok=True)
+
+    if args.incremental is not None:
+        fragment_dir = args.incremental or os.path.join(qlever_folder, "fragments")
+        fragments, counts = build_incremental(
+            folder_path, fragment_dir, workers=args.workers, backend=args.json_backend, exclude=[qlever_folder]
+        )
+        print(
+            f"🔍 {len(fragments) - 1} JSON files: {counts['unchanged']} unchanged, {counts['added']} added, "
+            f"{counts['changed']} changed, {counts['removed']} removed"
+        )
+        if args.no_combine:
+            print(f"✅ Fragments up to date in: {fragment_dir}")
+        else:
+            combine_fragments(fragments, ttl_path, fmt=args.format)
+            print(f"✅ RDF graph successfully generated at: {ttl_path}")
+    else:
+        # Collect all JSON file paths from all subfolders (the output folder holds no inputs)
+        all_json_files = find_json_files(folder_path, exclude=[qlever_folder])
+
+        print(f"🔍 Found {len(all_json_files)} JSON files to process across subfolders.")
+
+        records = iter_json_records(all_json_files, workers=args.workers, backend=args.json_backend)
+        if args.writer == "stream":
+            json_to_rdf_stream(records, ttl_path, fmt=args.format)
+        else:
+            # Load and preprocess data from all JSONs
+            combined_data = list(records)
+            print(f"ℹ️  Combined and filtered to {len(combined_data)} valid entries.")
+            # Convert to RDF/Turtle
+            json_to_ttl(combined_data, ttl_path)
+
+        print(f"✅ RDF graph successfully generated at: {ttl_path}")
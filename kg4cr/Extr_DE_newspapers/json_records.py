@@ -0,0 +1,152 @@
+import re
+import json
+
+EXPECTED_FIELDS = ("Court_name", "Date_of_article", "Company_name", "Registration_Code", "Registration_year")
+
+CODE_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+PYTHON_LITERALS = {"None": "null", "True": "true", "False": "false"}
+PYTHON_LITERAL = re.compile(r":\s*(None|True|False)\b")
+
+
+def iter_json_objects(text):
+    """
+    Scan model output for top-level JSON objects, also inside arrays.
+    Tracks strings and nesting, so braces in values and nested objects do not
+    break records apart. Yields (fragment, truncated); the last fragment is
+    marked truncated if the output ends inside an object.
+    """
+    text = CODE_FENCE.sub("", text or "")
+    depth = 0
+    start = None
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"' and depth > 0:
+            in_string = True
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                yield text[start:i + 1], False
+    if depth > 0 and start is not None:
+        yield text[start:], True
+
+
+def _cut_to_last_member(fragment):
+    """Close a truncated object after its last complete member, or None if there is none."""
+    depth = 0
+    in_string = False
+    escaped = False
+    last_comma = None
+    for i, ch in enumerate(fragment):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+        elif ch == "," and depth == 1:
+            last_comma = i
+    if last_comma is None:
+        return None
+    return fragment[:last_comma] + "}"
+
+
+def parse_object(fragment, truncated=False):
+    """
+    Parse one object fragment, repairing trailing commas, Python literals and
+    a truncated tail. Returns (object or None, repaired flag).
+    """
+    try:
+        return json.loads(fragment), False
+    except json.JSONDecodeError:
+        pass
+
+    if truncated:
+        fragment = _cut_to_last_member(fragment)
+        if fragment is None:
+            return None, False
+    fixed = TRAILING_COMMA.sub(r"\1", fragment)
+    fixed = PYTHON_LITERAL.sub(lambda m: ": " + PYTHON_LITERALS[m.group(1)], fixed)
+    try:
+        return json.loads(fixed), True
+    except json.JSONDecodeError:
+        return None, False
+
+
+def validate_record(obj):
+    """
+    Bring a parsed object into the expected record shape.
+    Unknown keys are dropped, missing fields set to None and numbers turned
+    into strings. Returns None if a field holds a nested value or neither
+    Court_name nor Company_name is present.
+    """
+    if not isinstance(obj, dict):
+        return None
+    record = {}
+    for field in EXPECTED_FIELDS:
+        value = obj.get(field)
+        if isinstance(value, (dict, list)):
+            return None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if isinstance(value, str):
+            value = value.strip() or None
+        record[field] = value
+    if not record["Court_name"] and not record["Company_name"]:
+        return None
+    return record
+
+
+def _expand(obj):
+    """Unwrap {"records": [...]}-style wrappers around the actual records."""
+    if isinstance(obj, dict) and not any(field in obj for field in EXPECTED_FIELDS):
+        nested = [v for value in obj.values() if isinstance(value, list) for v in value if isinstance(v, dict)]
+        if nested:
+            return nested
+    return [obj]
+
+
+def extract_records(raw):
+    """
+    Extract valid records from one raw model answer.
+    Returns (records, stats) with counts of objects found, records kept,
+    records salvaged by repairs and objects rejected.
+    """
+    records = []
+    stats = {"objects": 0, "valid": 0, "salvaged": 0, "rejected": 0}
+    for fragment, truncated in iter_json_objects(raw):
+        stats["objects"] += 1
+        obj, repaired = parse_object(fragment, truncated)
+        if obj is None:
+            stats["rejected"] += 1
+            continue
+        for candidate in _expand(obj):
+            record = validate_record(candidate)
+            if record is None:
+                stats["rejected"] += 1
+                continue
+            records.append(record)
+            stats["valid"] += 1
+            stats["salvaged"] += int(repaired)
+    return records, stats
@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw LLM responses, stored in a single SQLite file.
+
+    Entries are keyed by a hash of everything that determines the answer
+    (provider, model, system message, prompt, chunk text, temperature), so
+    re-running a batch only sends chunks whose request actually changed.
+    When the stored responses exceed `max_size_mb`, the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, path, max_size_mb=1024):
+        self.path = str(path)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self.conn.commit()
+        self.total_size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(provider, model, system_message, prompt, text, temperature):
+        """Hash the request parameters that determine the model output."""
+        payload = json.dumps(
+            [provider, model, system_message, prompt, text, temperature],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached response for key, or None."""
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        return row[0]
+
+    def put(self, key, response):
+        """Store a response and evict old entries if the cache grew too large."""
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+            (key, response, size, now, now),
+        )
+        self.conn.commit()
+        self.total_size += size - (old[0] if old else 0)
+        if self.total_size > self.max_size_bytes:
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is at 90% of its size limit."""
+        target = int(self.max_size_bytes * 0.9)
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        to_delete = []
+        for key, size in rows:
+            if self.total_size <= target:
+                break
+            to_delete.append((key,))
+            self.total_size -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+        self.conn.commit()
+        self.evictions += len(to_delete)
+        logging.info(f"🧹 Evicted {len(to_delete)} cached responses ({self.total_size / 1e6:.1f} MB left)")
+
+    def stats(self):
+        """Counters for the run summary."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_mb": round(self.total_size / 1e6, 2),
+        }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,171 @@
+import json
+import logging
+
+from request_metrics import note_usage_from
+
+
+# Prefix of StreamMonitor.stop_reason when the answer was cut off in a loop
+REPETITION_STOP = "repetition loop"
+
+
+class StreamedText(str):
+    """A streamed answer, with the reason the stream was stopped early (or None)."""
+
+    stop_reason = None
+
+    def __new__(cls, text, stop_reason=None):
+        result = super().__new__(cls, text)
+        result.stop_reason = stop_reason
+        return result
+
+
+def stopped_by_repetition(text):
+    """Whether an answer was cut off by the repetition-loop detector, i.e. is incomplete."""
+    return (getattr(text, "stop_reason", None) or "").startswith(REPETITION_STOP)
+
+
+class StreamMonitor:
+    """
+    Collect streamed model output and decide when to stop reading.
+
+    Stops when the top-level JSON array is closed (anything after it is
+    discarded) or when the tail of the output repeats the same unit of
+    `min_unit`..`max_unit` characters `min_repeats` times, which is how
+    degenerating models loop until max_tokens. In that case only the first
+    copy of the repeated unit is kept. A bracketed aside in prose
+    ("[siehe unten]") does not count as the array: only brackets holding
+    nothing but objects, commas and whitespace do.
+
+    The records are parsed from the collected text once the stream ends
+    (json_records.extract_records), not while it arrives.
+    """
+
+    def __init__(self, check_every=200, min_unit=16, max_unit=400, min_repeats=3):
+        self.check_every = check_every
+        self.min_unit = min_unit
+        self.max_unit = max_unit
+        self.min_repeats = min_repeats
+        self.text = ""
+        self.stop_reason = None
+        self._depth = 0
+        self._array_started = False
+        # Non-JSON text directly inside the candidate array
+        self._array_prose = False
+        self._in_string = False
+        self._escaped = False
+        self._since_check = 0
+
+    def feed(self, piece):
+        """Add a piece of output; returns True once reading can stop."""
+        if self.stop_reason:
+            return True
+        for i, ch in enumerate(piece):
+            if self._track(ch):
+                self.text += piece[:i + 1]
+                self.stop_reason = "array closed"
+                return True
+        self.text += piece
+
+        self._since_check += len(piece)
+        if self._since_check >= self.check_every:
+            self._since_check = 0
+            unit = self._repeated_unit()
+            if unit:
+                while self.text[-2 * unit:-unit] == self.text[-unit:]:
+                    self.text = self.text[:-unit]
+                self.stop_reason = f"{REPETITION_STOP} ({unit} chars)"
+                return True
+        return False
+
+    def _track(self, ch):
+        """Follow JSON nesting; True when the top-level array has just been closed."""
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif ch == "\\":
+                self._escaped = True
+            elif ch == '"':
+                self._in_string = False
+            return False
+        if ch == '"' and self._depth > 0:
+            if self._depth == 1 and self._array_started:
+                self._array_prose = True
+            self._in_string = True
+        elif ch in "[{":
+            if self._depth == 0:
+                self._array_started = ch == "["
+                self._array_prose = False
+            elif self._depth == 1 and self._array_started and ch == "[":
+                self._array_prose = True
+            self._depth += 1
+        elif ch in "]}" and self._depth > 0:
+            self._depth -= 1
+            return ch == "]" and self._depth == 0 and self._array_started and not self._array_prose
+        elif self._depth == 1 and self._array_started and not ch.isspace() and ch != ",":
+            self._array_prose = True
+        return False
+
+    def _repeated_unit(self):
+        text = self.text
+        for unit in range(self.min_unit, self.max_unit + 1):
+            if unit * self.min_repeats > len(text):
+                break
+            tail = text[-unit:]
+            if all(text[-(k + 1) * unit:len(text) - k * unit] == tail for k in range(1, self.min_repeats)):
+                return unit
+        return None
+
+
+async def iter_stream_pieces(response, fmt):
+    """
+    Yield text pieces from a streaming aiohttp response.
+    fmt: "ollama-chat" / "ollama-generate" (NDJSON) or "openai" (server-sent events).
+    """
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
+
+        if fmt == "openai":
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            event = json.loads(data)
+            if "error" in event:
+                raise Exception(f"Stream error: {event['error']}")
+            if event.get("usage"):
+                note_usage_from(event)
+            choices = event.get("choices") or [{}]
+            piece = (choices[0].get("delta") or {}).get("content")
+            if piece:
+                yield piece
+        else:
+            event = json.loads(line)
+            if "error" in event:
+                raise Exception(f"Stream error: {event['error']}")
+            if fmt == "ollama-chat":
+                piece = (event.get("message") or {}).get("content")
+            else:
+                piece = event.get("response")
+            if piece:
+                yield piece
+            if event.get("done"):
+                note_usage_from(event)
+                return
+
+
+async def read_stream(response, fmt, label=""):
+    """
+    Read a streamed answer, cancelling the request as soon as the monitor
+    says stop. Returns a StreamedText carrying the stop reason.
+    """
+    monitor = StreamMonitor()
+    async for piece in iter_stream_pieces(response, fmt):
+        if monitor.feed(piece):
+            # Closing the connection makes the backend stop generating
+            response.close()
+            logging.info(f"✂️ Stopped stream early{f' ({label})' if label else ''}: {monitor.stop_reason}")
+            break
+    return StreamedText(monitor.text, monitor.stop_reason)
@@ -0,0 +1,210 @@
+import re
+import json
+import glob
+import random
+import asyncio
+import logging
+import argparse
+from aiohttp import web
+
+DEFAULT_RESPONSES = "./data/processed/DE_newspapers_llm_tests/*.json"
+BATCH_TEXT = re.compile(r"^### TEXT (\d+)", re.MULTILINE)
+
+
+def load_canned_records(pattern):
+    """All records of the JSON files matching `pattern` (e.g. the GT and model outputs)."""
+    records = []
+    for path in sorted(glob.glob(pattern)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Skipping canned response file {path}: {e}")
+            continue
+        if isinstance(data, list):
+            records.extend(r for r in data if isinstance(r, dict))
+    return records
+
+
+class MockLLM:
+    """
+    Stand-in for an LLM backend with configurable latency and failures.
+
+    latency: "fixed:<s>", "uniform:<min>,<max>" or "lognormal:<median>,<sigma>"
+    seconds per request. Requests beyond `capacity` concurrent ones get a 429
+    (like an overloaded vLLM/Ollama queue), `error_rate` of the remaining ones
+    fail with `error_status` (and `retry_after` if set). Answers are JSON
+    arrays of `records_per_response` records sampled from the canned records;
+    for batched prompts ("### TEXT n") each record gets a Chunk_id.
+    """
+
+    def __init__(self, records, latency="lognormal:1.0,0.4", error_rate=0.0, error_status=503,
+                 retry_after=None, capacity=None, records_per_response=3, seed=None):
+        self.records = records or [{
+            "Court_name": "Amtsgericht Berlin-Mitte",
+            "Date_of_article": "06.09.1927",
+            "Company_name": "Muster & Co. G.m.b.H.",
+            "Registration_Code": "HRB 12345",
+            "Registration_year": "1927",
+        }]
+        self.latency_kind, _, params = latency.partition(":")
+        self.latency_params = [float(p) for p in params.split(",") if p]
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.capacity = capacity
+        self.records_per_response = records_per_response
+        self.random = random.Random(seed)
+        self.in_flight = 0
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "rejected_capacity": 0, "peak_in_flight": 0}
+
+    def reset_stats(self):
+        for key in self.stats:
+            self.stats[key] = 0
+
+    def sample_latency(self):
+        p = self.latency_params
+        if self.latency_kind == "fixed":
+            return p[0]
+        if self.latency_kind == "uniform":
+            return self.random.uniform(p[0], p[1])
+        if self.latency_kind == "lognormal":
+            return self.random.lognormvariate(0, p[1]) * p[0]
+        raise ValueError(f"Unsupported latency distribution: {self.latency_kind}")
+
+    def answer(self, prompt):
+        batch_ids = [int(n) for n in BATCH_TEXT.findall(prompt)]
+        records = []
+        for chunk_id in batch_ids or [None]:
+            k = min(self.records_per_response, len(self.records))
+            for record in self.random.sample(self.records, k):
+                record = dict(record)
+                if chunk_id is not None:
+                    record["Chunk_id"] = chunk_id
+                records.append(record)
+        return json.dumps(records, ensure_ascii=False)
+
+    async def handle(self, request, fmt):
+        self.stats["requests"] += 1
+        payload = await request.json()
+
+        if self.capacity is not None and self.in_flight >= self.capacity:
+            self.stats["rejected_capacity"] += 1
+            return web.json_response({"error": "server overloaded"}, status=429, headers={"Retry-After": "1"})
+
+        self.in_flight += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+        try:
+            await asyncio.sleep(self.sample_latency())
+            if self.random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else None
+                return web.json_response({"error": "injected failure"}, status=self.error_status, headers=headers)
+
+            if fmt == "ollama-generate":
+                prompt = payload.get("prompt", "")
+            else:
+                prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+            content = self.answer(prompt)
+            self.stats["ok"] += 1
+
+            if payload.get("stream"):
+                return await self._stream(request, fmt, payload, content)
+            return web.json_response(self._body(fmt, payload, content))
+        finally:
+            self.in_flight -= 1
+
+    def _body(self, fmt, payload, content):
+        model = payload.get("model", "mock")
+        if fmt == "ollama-chat":
+            return {"model": model, "message": {"role": "assistant", "content": content}, "done": True}
+        if fmt == "ollama-generate":
+            return {"model": model, "response": content, "done": True}
+        return {"model": model, "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+
+    async def _stream(self, request, fmt, payload, content, piece_len=12):
+        content_type = "text/event-stream" if fmt == "openai" else "application/x-ndjson"
+        response = web.StreamResponse(headers={"Content-Type": content_type})
+        await response.prepare(request)
+        try:
+            for i in range(0, len(content), piece_len):
+                piece = content[i:i + piece_len]
+                if fmt == "ollama-chat":
+                    line = json.dumps({"message": {"role": "assistant", "content": piece}, "done": False}) + "\n"
+                elif fmt == "ollama-generate":
+                    line = json.dumps({"response": piece, "done": False}) + "\n"
+                else:
+                    line = "data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": piece}}]}) + "\n\n"
+                await response.write(line.encode("utf-8"))
+            await response.write(b"data: [DONE]\n\n" if fmt == "openai" else b'{"done": true}\n')
+        except ConnectionResetError:
+            # Client stopped reading early (see llm_stream)
+            pass
+        return response
+
+    def app(self):
+        async def stats(request):
+            return web.json_response(dict(self.stats, in_flight=self.in_flight))
+
+        app = web.Application(client_max_size=16 * 1024 ** 2)
+        app.router.add_post("/api/chat", lambda r: self.handle(r, "ollama-chat"))
+        app.router.add_post("/api/generate", lambda r: self.handle(r, "ollama-generate"))
+        app.router.add_post("/v1/chat/completions", lambda r: self.handle(r, "openai"))
+        app.router.add_post("/chat/completions", lambda r: self.handle(r, "openai"))
+        app.router.add_get("/stats", stats)
+        return app
+
+
+async def start_mock_server(mock, host="127.0.0.1", port=0):
+    """Run the mock on the current event loop. Returns (runner, base URL); call runner.cleanup() to stop."""
+    runner = web.AppRunner(mock.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+
+def add_mock_arguments(parser):
+    parser.add_argument("--latency", default="lognormal:1.0,0.4",
+                        help='Latency per request: "fixed:S", "uniform:MIN,MAX" or "lognormal:MEDIAN,SIGMA".')
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Share of requests that fail.")
+    parser.add_argument("--error_status", type=int, default=503, help="HTTP status of injected failures.")
+    parser.add_argument("--retry_after", type=float, default=None, help="Retry-After seconds sent with failures.")
+    parser.add_argument("--capacity", type=int, default=None,
+                        help="Concurrent requests served before answering 429 (default: unlimited).")
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES,
+                        help="Glob of JSON record files replayed as answers.")
+    parser.add_argument("--records_per_response", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def mock_from_args(args):
+    return MockLLM(
+        load_canned_records(args.responses),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        capacity=args.capacity,
+        records_per_response=args.records_per_response,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local mock LLM server (Ollama /api/chat, /api/generate and OpenAI /v1/chat/completions)."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    mock = mock_from_args(args)
+    logging.info(f"Serving {len(mock.records)} canned records on http://{args.host}:{args.port} "
+                 f"(OLLAMA_URL=http://{args.host}:{args.port}/api, "
+                 f"UNIHPC_URL=http://{args.host}:{args.port}/api/generate, "
+                 f"MAIA_URL/OPENROUTER_URL=http://{args.host}:{args.port}/v1/chat/completions)")
+    web.run_app(mock.app(), host=args.host, port=args.port)
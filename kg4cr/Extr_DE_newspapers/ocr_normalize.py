@@ -0,0 +1,156 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import argparse
+import unicodedata
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+# Bump when normalize_ocr_text changes, so cached files are rebuilt
+NORMALIZER_VERSION = "1"
+CACHE_DIR = ".normalized"
+CACHE_SUFFIX = ".norm"
+
+# UTF-8 text that was decoded as cp1252/latin-1: a lead byte (Ã, Å, â, ...) followed by as many
+# continuation bytes as its sequence needs, e.g. "Ã¼" (ü), "Å¿" (ſ), "â€“" (–)
+_CONT = "[\u0080-\u00bf\u0152\u0153\u0160\u0161\u0178\u017d\u017e\u0192\u02c6\u02dc\u2013\u2014\u2018-\u201e\u2020-\u2022\u2026\u2030\u2039\u203a\u20ac\u2122]"
+MOJIBAKE = re.compile(f"[\u00c2-\u00df]{_CONT}|[\u00e0-\u00ef]{_CONT}{{2}}|[\u00f0-\u00f4]{_CONT}{{3}}")
+# Long s, soft hyphens and zero-width characters
+CHAR_FIXES = str.maketrans({"\u017f": "s", "\u00ad": None, "\u200b": None, "\u200c": None, "\u200d": None, "\ufeff": None})
+
+
+def _as_cp1252_bytes(s):
+    out = bytearray()
+    for ch in s:
+        try:
+            out += ch.encode("cp1252")
+        except UnicodeEncodeError:
+            # Bytes cp1252 leaves undefined were decoded as latin-1 control characters
+            out += ch.encode("latin-1")
+    return bytes(out)
+
+
+def _fix_mojibake(match):
+    try:
+        fixed = _as_cp1252_bytes(match.group(0)).decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return match.group(0)
+    # Only Latin letters (ü, ß, ſ, é, ...) and punctuation count as repairs; anything else
+    # was genuine text such as "ß»"
+    if all(ord(ch) < 0x180 or 0x2000 <= ord(ch) <= 0x20cf for ch in fixed):
+        return fixed
+    return match.group(0)
+
+
+def normalize_ocr_text(text):
+    """
+    Repair OCR text before it is chunked and sent to the LLM: undo mojibake
+    ("GeÅ¿ellÅ¿chaft" → "Geſellſchaft"), map the long s to s, drop soft
+    hyphens and zero-width characters and compose umlauts (NFC). Umlauts,
+    line breaks and notice markers (¶) are kept, unlike
+    rdf_postprocesing.normalize_text. Returns (text, number of fixes).
+    """
+    # Counted before the repair, so a repaired "Å¿" is one fix and not also a long s
+    fixes = sum(1 for ch in text if ord(ch) in CHAR_FIXES)
+
+    def fix(match):
+        nonlocal fixes
+        fixed = _fix_mojibake(match)
+        if fixed != match.group(0):
+            # Characters of the repaired sequence (a "\u00ad" in "Ã\u00ad") were counted above
+            fixes += 1 - sum(1 for ch in match.group(0) if ord(ch) in CHAR_FIXES)
+        return fixed
+
+    text = MOJIBAKE.sub(fix, text)
+    return unicodedata.normalize("NFC", text).translate(CHAR_FIXES), fixes
+
+
+def cache_path(input_path, raw):
+    """Cache file of an input's normalized text, next to the input and keyed by a hash of its content."""
+    digest = hashlib.sha256(NORMALIZER_VERSION.encode("ascii") + b"\0" + raw).hexdigest()[:32]
+    return Path(input_path).parent / CACHE_DIR / (digest + CACHE_SUFFIX)
+
+
+def _normalize_file(input_path):
+    """Normalize one file into its cache. Returns (path, fixes or None if it was cached already)."""
+    input_path = Path(input_path)
+    raw = input_path.read_bytes()
+    target = cache_path(input_path, raw)
+    if target.is_file():
+        return str(input_path), None
+    text, fixes = normalize_ocr_text(raw.decode("utf-8"))
+    target.parent.mkdir(exist_ok=True)
+    # Several processes or workers may write the same entry; each writes its own temp file
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, target)
+    return str(input_path), fixes
+
+
+def read_normalized(input_path):
+    """Normalized text of an input file, from its cache if present (and stored there otherwise)."""
+    input_path = Path(input_path)
+    raw = input_path.read_bytes()
+    target = cache_path(input_path, raw)
+    if not target.is_file():
+        try:
+            _normalize_file(input_path)
+        except OSError as e:
+            # Read-only input folder: normalize without caching
+            logging.warning(f"⚠️ Cannot cache normalized {input_path.name}: {e}")
+            return normalize_ocr_text(raw.decode("utf-8"))[0]
+    return target.read_text(encoding="utf-8")
+
+
+def prenormalize_files(paths, workers=None):
+    """
+    Normalize many files in a process pool (`workers` processes, default
+    one per CPU) so the extraction run only reads the cached results.
+    Returns stats: files, cached, normalized, fixes, failed, time_sec.
+    """
+    paths = [str(p) for p in paths]
+    stats = {"files": len(paths), "cached": 0, "normalized": 0, "fixes": 0, "failed": 0}
+    start = time.time()
+    if paths:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            futures = {path: pool.submit(_normalize_file, path) for path in paths}
+            for path, future in futures.items():
+                try:
+                    _, fixes = future.result()
+                except (OSError, UnicodeDecodeError) as e:
+                    logging.error(f"❌ Normalizing {path} failed: {e}")
+                    stats["failed"] += 1
+                    continue
+                if fixes is None:
+                    stats["cached"] += 1
+                else:
+                    stats["normalized"] += 1
+                    stats["fixes"] += fixes
+    stats["time_sec"] = round(time.time() - start, 2)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pre-normalize OCR text files (mojibake, long s) into per-folder .normalized caches."
+    )
+    parser.add_argument("input", help="Input .txt file or folder (searched recursively).")
+    parser.add_argument("--workers", type=int, default=None, help="Processes to use (default: one per CPU).")
+    parser.add_argument("--show", action="store_true", help="Print the changed lines of a single input file.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    input_path = Path(args.input)
+    if args.show:
+        original = input_path.read_text(encoding="utf-8").splitlines()
+        normalized, fixes = normalize_ocr_text("\n".join(original))
+        for before, after in zip(original, normalized.splitlines()):
+            if before != after:
+                print(f"- {before}\n+ {after}")
+        print(f"{fixes} fixes")
+    else:
+        files = sorted(input_path.rglob("*.txt")) if input_path.is_dir() else [input_path]
+        print(prenormalize_files(files, args.workers))
@@ -0,0 +1,122 @@
+import json
+import time
+import asyncio
+import logging
+import argparse
+from tabulate import tabulate
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import extract_info_newspapers_DE as extractor
+from extract_info_newspapers_DE import process_chunks, smart_chunk_text
+from chunking import load_token_counter
+from evaluate_extraction_results import score_records
+from provider_clients import close_provider_clients
+from prompts import PROMPTS, BATCH_INSTRUCTIONS_DE
+
+
+def token_costs(count_tokens, variants, num_chunks=None):
+    """Prompt tokens per variant, relative to the first one and (optionally) summed over a number of chunks."""
+    rows = []
+    baseline = None
+    for name in variants:
+        tokens = count_tokens(PROMPTS[name].strip())
+        baseline = baseline or tokens
+        row = {
+            "variant": name,
+            "chars": len(PROMPTS[name].strip()),
+            "prompt_tokens": tokens,
+            "vs_first": f"{tokens / baseline:.0%}",
+            "with_batch_instructions": tokens + count_tokens(BATCH_INSTRUCTIONS_DE.strip()),
+        }
+        if num_chunks:
+            row[f"prompt_tokens_{num_chunks}_chunks"] = tokens * num_chunks
+        rows.append(row)
+    return rows
+
+
+async def score_variant(name, chunks, gt_records, args):
+    """Extract the annotated text with one prompt variant and score the records against the GT."""
+    extractor.set_prompt_variant(name, provider=args.provider)
+    start = time.time()
+    result = await process_chunks(
+        chunks,
+        mode="parallel",
+        max_concurrent=args.max_concurrent,
+        max_retries=args.max_retries,
+        provider=args.provider,
+    )
+    score = score_records(gt_records, result["results"])
+    return {
+        "variant": name,
+        "records": len(result["results"]),
+        "gt_records": len(gt_records),
+        "failed_chunks": len(result["failed_chunks"]),
+        "score": f"{score['obtained_score']}/{score['max_score']}",
+        "similarity": round(score["similarity"], 4),
+        "code_mismatches": len(score["mismatched_reg_codes"]),
+        "time_sec": round(time.time() - start, 1),
+    }
+
+
+async def score_variants(chunks, gt_records, args):
+    rows = []
+    try:
+        for name in args.variants:
+            rows.append(await score_variant(name, chunks, gt_records, args))
+    finally:
+        await close_provider_clients()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the token cost of the extraction prompt variants and, with --text/--gt, "
+                    "their accuracy on an annotated issue."
+    )
+    parser.add_argument("--variants", nargs="+", choices=list(PROMPTS), default=list(PROMPTS))
+    parser.add_argument("--tokenizer", default=None,
+                        help="Token counter as for run_extraction_pipeline.py (approx, tiktoken:<enc>, hf:<model>).")
+    parser.add_argument("--text", help="OCR text file the ground truth was annotated on; enables scoring.")
+    parser.add_argument(
+        "--gt",
+        default="./data/processed/DE_newspapers_llm_tests/GT_Reichsanzeiger_06_09_1927.json",
+        help="Ground-truth JSON records.",
+    )
+    parser.add_argument("--provider", default="unihpc", choices=["unihpc", "ollama", "openrouter", "groq", "maia"])
+    parser.add_argument("--max_words", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--max_concurrent", type=int, default=5)
+    parser.add_argument("--max_retries", type=int, default=3)
+    parser.add_argument("--json", help="Also write the result rows to this JSON file.")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    count_tokens = load_token_counter(args.tokenizer)
+
+    chunks = None
+    if args.text:
+        with open(args.text, "r", encoding="utf-8") as f:
+            chunks = smart_chunk_text(f.read(), max_words=args.max_words, overlap_words=args.overlap)
+
+    cost_rows = token_costs(count_tokens, args.variants, len(chunks) if chunks else None)
+    print("=== Prompt token cost ===")
+    print(tabulate(cost_rows, headers="keys", tablefmt="github"))
+    results = {"tokens": cost_rows}
+
+    if chunks:
+        with open(args.gt, "r", encoding="utf-8") as f:
+            gt_records = json.load(f)
+        score_rows = asyncio.run(score_variants(chunks, gt_records, args))
+        tokens = {row["variant"]: row["prompt_tokens"] for row in cost_rows}
+        for row in score_rows:
+            row["prompt_tokens"] = tokens[row["variant"]]
+        print(f"\n=== Accuracy on {args.text} ({len(chunks)} chunks, {args.provider}) ===")
+        print(tabulate(score_rows, headers="keys", tablefmt="github"))
+        results["scores"] = score_rows
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
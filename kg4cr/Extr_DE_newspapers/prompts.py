@@ -380,4 +380,48 @@ Do not include ```json or any other Markdown formatting.
 Do not include any explanation before or after.
 Only return a valid JSON object, starting with `{` and ending with `}`.
 If a value is not available, set it to null. Do not return anything other than the JSON response.
-"""
\ No newline at end of file
+"""
+# Condensed EXTRACTION_PROMPT_DE: same rules, one example notice, no repeated output instructions
+EXTRACTION_PROMPT_DE_COMPACT = """
+Sie extrahieren Handelsregister- und Konkursbekanntmachungen aus OCR-Text historischer deutscher Zeitungen (1920-1945). Ein Textblock kann mehrere Bekanntmachungen enthalten; geben Sie für jede Firma ein eigenes JSON-Objekt mit diesen fünf Schlüsseln zurück:
+
+- "Court_name": Gericht mit Ort, z.B. "Amtsgericht Glogau". Die Unterschrift "Amtsgericht." am Abschnittsende gehört zum Ort in "[Ort], den [Datum]." davor.
+- "Date_of_article": Datum der Bekanntmachung im Originalformat, z.B. "2. September 1927" (aus "[Ort], den [Datum].").
+- "Company_name": vollständiger Firmenname bzw. Inhaber mit Geschäftsart, ohne Adresse.
+- "Registration_Code": Registernummer, nur wenn im Text genannt:
+  - "Handelsregister A [Nr.]", "H.-R. A [Nr.]", "Abt. A" → "HRA [Nr.]"; entsprechend B → "HRB [Nr.]"
+  - Handelsregister ohne A/B, auch "Zu Nr. [Nr.]" / "unter Nr. [Nr.]" am Absatzanfang → "HRX [Nr.]"
+  - andere Register mit Namen beibehalten: "Genossenschaftsregister Nr. [Nr.]", "Firmenregister Nr. [Nr.]", "Gesellschaftsregister Nr. [Nr.]", "Prokurenregister Nr. [Nr.]" (auch bei Wortstellungen wie "unter Nr. 5 unseres Genossenschaftsregisters")
+  - nie Buchstaben erfinden, nie "HRA B" oder "HRB A"
+- "Registration_year": vierstelliges Jahr, meist aus Date_of_article, z.B. "1927".
+
+OCR-Artefakte wie "⸗" (Silbentrennung) oder "ſ" ignorieren. Fehlende Werte sind null.
+
+Beispiel:
+'In dem Konkursverfahren über das
+Vermögen der Firma Winter u. Looke,
+Alleininhaber Buchhändler August Alt
+3u Greifswald, Schuhhagen 11
+H.⸗R. A 219), wird ein Termin bestimmt.
+Greifswald, den 30. August 1927.
+Amtsgericht.'
+→ [{"Court_name": "Amtsgericht Greifswald", "Date_of_article": "30. August 1927", "Company_name": "Winter u. Looke, Alleininhaber Buchhändler August Alt", "Registration_Code": "HRA 219", "Registration_year": "1927"}]
+
+Antworten Sie ausschließlich mit einem gültigen JSON-Array, beginnend mit [ und endend mit ], ohne Markdown und ohne Erklärungen.
+"""
+
+# Appended to the extraction prompt when several chunks are sent in one request
+BATCH_INSTRUCTIONS_DE = """
+## MEHRERE TEXTBLÖCKE
+Der Text besteht aus mehreren unabhängigen Textblöcken, die jeweils mit "### TEXT <Nummer>" beginnen.
+Fügen Sie jedem JSON-Objekt zusätzlich den Schlüssel "Chunk_id" mit der Nummer des Textblocks hinzu, aus dem der Eintrag stammt (z.B. "Chunk_id": 2).
+Geben Sie die Einträge aller Textblöcke in einem einzigen JSON-Array zurück.
+"""
+
+# Prompt variants selectable per run (--prompt) or per provider (--prompt_for, <PROVIDER>_PROMPT in .env)
+PROMPTS = {
+    "de": EXTRACTION_PROMPT_DE,
+    "de_compact": EXTRACTION_PROMPT_DE_COMPACT,
+    "de_mistral": mistral_EXTRACTION_PROMPT_DE,
+    "en": EXTRACTION_PROMPT_EN,
+}
@@ -0,0 +1,60 @@
+import os
+import asyncio
+import aiohttp
+from groq import AsyncGroq
+
+import request_metrics
+
+# Idle keep-alive connections stay open this long, so consecutive chunks
+# reuse the TLS connection instead of handshaking again
+KEEPALIVE_TIMEOUT = 75
+DNS_CACHE_TTL = 600
+REQUEST_TIMEOUT = 180
+
+_groq_clients = {}
+
+
+def make_session(limit=100, timeout=REQUEST_TIMEOUT):
+    """
+    aiohttp session for a whole run: at most `limit` pooled connections to
+    the provider host, kept alive between requests, with cached DNS lookups.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        use_dns_cache=True,
+        enable_cleanup_closed=True,
+    )
+    # Connect and time-to-first-byte timings for the request metrics
+    trace_configs = [request_metrics.trace_config()] if request_metrics.RECORDER is not None else None
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        trace_configs=trace_configs,
+    )
+
+
+def get_groq_client():
+    """
+    Shared AsyncGroq client of the running event loop, created on first use.
+    The SDK keeps its own connection pool, so it is built once per run
+    instead of once per chunk.
+    """
+    loop = asyncio.get_running_loop()
+    client = _groq_clients.get(loop)
+    if client is None:
+        # Clients of finished loops cannot be reused
+        for old_loop in [l for l in _groq_clients if l.is_closed()]:
+            del _groq_clients[old_loop]
+        client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), timeout=REQUEST_TIMEOUT)
+        _groq_clients[loop] = client
+    return client
+
+
+async def close_provider_clients():
+    """Close the SDK clients of the running loop; call before the loop ends."""
+    client = _groq_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
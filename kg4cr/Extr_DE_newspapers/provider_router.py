@@ -0,0 +1,198 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+from adaptive_limiter import get_limiter
+import request_metrics as metrics
+
+# Consecutive failures after which a backend is taken out of rotation
+FAILURES_TO_EJECT = 3
+EJECT_SECONDS = 30.0
+MAX_EJECT_SECONDS = 300.0
+# Latencies needed before a backend's percentile is trusted for hedging
+MIN_HEDGE_SAMPLES = 10
+
+
+class Backend:
+    """Routing state of one provider: its AIMD limiter, recent latencies and health."""
+
+    def __init__(self, name, max_limit=None):
+        self.name = name
+        self.limiter = get_limiter(name, max_limit=max_limit)
+        self.latencies = deque(maxlen=100)
+        self.ewma_latency = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.eject_seconds = EJECT_SECONDS
+        # Requests routed here and not finished yet, including those waiting for a slot
+        self.assigned = 0
+        self.stats = {"requests": 0, "ok": 0, "failed": 0, "hedges": 0, "hedges_won": 0}
+
+    def healthy(self, now):
+        return now >= self.ejected_until
+
+    def expected_wait(self, default_latency):
+        """Seconds until a new request would finish: assigned work over throughput (limit / latency)."""
+        latency = self.ewma_latency or default_latency
+        # Back off from a backend that has started failing before it is ejected
+        return (self.assigned + 1) * latency * (1 + self.consecutive_failures) / max(1, self.limiter.limit)
+
+    def latency_percentile(self, q):
+        if len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(q / 100 * (len(ordered) - 1))]
+
+    def record_success(self, latency):
+        self.stats["ok"] += 1
+        self.latencies.append(latency)
+        self.ewma_latency = latency if self.ewma_latency is None else 0.8 * self.ewma_latency + 0.2 * latency
+        self.consecutive_failures = 0
+        self.eject_seconds = EJECT_SECONDS
+
+    def record_failure(self, exc):
+        self.stats["failed"] += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= FAILURES_TO_EJECT:
+            self.ejected_until = time.monotonic() + self.eject_seconds
+            logging.warning(
+                f"🩺 {self.name}: {self.consecutive_failures} failures in a row ({exc}), "
+                f"out of rotation for {self.eject_seconds:.0f}s"
+            )
+            self.eject_seconds = min(MAX_EJECT_SECONDS, self.eject_seconds * 2)
+            self.consecutive_failures = 0
+
+
+class ProviderRouter:
+    """
+    Spread requests over several providers.
+
+    Each request goes to the healthy backend expected to finish it first,
+    i.e. the one with the most spare throughput (AIMD limit over recent
+    latency, minus what it already has in flight). A backend failing
+    `FAILURES_TO_EJECT` times in a row is skipped for a while, with the pause
+    doubling on repeated ejections. With `hedge_percentile`, a request still
+    running after that latency percentile of its backend is sent to a second
+    backend as well and the first answer wins. Empty answers count as
+    failures of their backend. `max_limit` caps every backend's concurrency
+    (default: the per-provider ceiling).
+
+    `request_fn(text, provider, session, instructions, accept)` performs one
+    request (extract_info_from_text); the router can be passed wherever a
+    provider name is expected.
+    """
+
+    def __init__(self, providers, request_fn, hedge_percentile=None, max_limit=None):
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.backends = [Backend(name.lower(), max_limit) for name in providers]
+        self.request_fn = request_fn
+        self.hedge_percentile = hedge_percentile
+
+    @property
+    def name(self):
+        return "+".join(b.name for b in self.backends)
+
+    @property
+    def max_capacity(self):
+        """Requests that can be in flight over all backends at their concurrency ceilings."""
+        return sum(b.limiter.max_limit for b in self.backends)
+
+    def pick(self, exclude=None):
+        """Backend expected to answer first, or None if only excluded ones are left."""
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b is not exclude]
+        if not candidates:
+            return None
+        healthy = [b for b in candidates if b.healthy(now)]
+        if not healthy:
+            if exclude is not None:
+                return None
+            # Everything is ejected: try the backend that comes back first
+            return min(candidates, key=lambda b: b.ejected_until)
+        known = [b.ewma_latency for b in healthy if b.ewma_latency is not None]
+        default_latency = sum(known) / len(known) if known else 1.0
+        return min(healthy, key=lambda b: b.expected_wait(default_latency))
+
+    async def _call(self, backend, text, session, instructions, started=None, accept=None):
+        backend.assigned += 1
+        wait_start = time.monotonic()
+        try:
+            async with backend.limiter.slot() as slot:
+                metrics.add_queue_wait(slot.start - wait_start)
+                # Requests that queued while their backend got ejected go elsewhere
+                alternative = None if backend.healthy(time.monotonic()) else self.pick(exclude=backend)
+                if alternative is None:
+                    backend.stats["requests"] += 1
+                    if started is not None:
+                        started.set()
+                    result = await self.request_fn(text, backend.name, session, instructions, accept)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            backend.record_failure(e)
+            raise
+        finally:
+            backend.assigned -= 1
+
+        if alternative is not None:
+            return await self._call(alternative, text, session, instructions, started, accept)
+        if not result or not result.strip():
+            backend.record_failure("empty answer")
+        else:
+            backend.record_success(time.monotonic() - slot.start)
+        return result
+
+    async def extract(self, text, session=None, instructions=None, accept=None):
+        primary = self.pick()
+        hedge_after = primary.latency_percentile(self.hedge_percentile) if self.hedge_percentile else None
+        if hedge_after is None:
+            return await self._call(primary, text, session, instructions, accept=accept)
+
+        started = asyncio.Event()
+        first = asyncio.create_task(self._call(primary, text, session, instructions, started, accept))
+        waiting = asyncio.create_task(started.wait())
+        tasks = {first, waiting}
+        try:
+            # Time the request from when it is sent, not while it queues for a slot
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            done, _ = await asyncio.wait({first}, timeout=hedge_after)
+            secondary = None if done else self.pick(exclude=primary)
+            if secondary is None:
+                return await first
+
+            secondary.stats["hedges"] += 1
+            logging.info(
+                f"🪃 Hedging request to {secondary.name}: {primary.name} "
+                f"slower than p{self.hedge_percentile:g} ({hedge_after:.1f}s)"
+            )
+            second = asyncio.create_task(self._call(secondary, text, session, instructions, accept=accept))
+            tasks.add(second)
+            pending, error = {first, second}, None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif task.result() and task.result().strip():
+                        if task is second:
+                            secondary.stats["hedges_won"] += 1
+                        return task.result()
+            if error is not None:
+                raise error
+            return None
+        finally:
+            # The slower copy is cancelled, which closes its connection
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self):
+        rows = []
+        for b in self.backends:
+            row = {"provider": b.name, **b.stats}
+            row["limit"] = b.limiter.limit
+            row["latency_sec"] = round(b.ewma_latency, 2) if b.ewma_latency is not None else None
+            rows.append(row)
+        return rows
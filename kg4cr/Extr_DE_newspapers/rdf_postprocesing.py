@@ -1,60 +1,95 @@
 import os
 import re
-from rdflib import Graph, Namespace, Literal, RDF
+import argparse
+from rdflib import Graph, Namespace, Literal, RDF, URIRef
+
+from rdf_text import normalize_text
+from json2rdf import TripleWriter
+
+EX = Namespace("http://example.org/schema/")
+COMP = Namespace("http://example.org/company/")
+COURT = Namespace("http://example.org/court/")
+
+# Company properties kept by the postprocessing, by predicate IRI
+COMPANY_FIELDS = {
+    str(EX.companyName): "companyName",
+    str(EX.registrationCode): "registrationCode",
+    str(EX.registrationYear): "registrationYear",
+    str(EX.fileName): "fileName",
+    str(EX.registeredAt): "courtURI",
+}
+
+# One N-Triples statement: subject and predicate IRIs, then an IRI or literal object
+NT_STATEMENT = re.compile(r'^<([^>]*)>\s+<([^>]*)>\s+(?:<([^>]*)>|"((?:[^"\\]|\\.)*)"\S*)\s*\.\s*$')
+NT_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+NT_UNESCAPES = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+
+def keep_company(c):
+    """Whether a company entity passes the filters (no court, non-register courts, placeholder names)."""
+    cname = (c["companyName"] or "").lower()
+    court = (c["courtName"] or "").lower()
+    regcode = c["registrationCode"]
+    regyear = c["registrationYear"]
+
+    if cname == court == (regcode or "").lower() == (regyear or "").lower():
+        return False
+    if any(x in court for x in ["polizei", "stadtkämmerei", "juſtizminiſter"]):
+        return False
+    if not c["courtName"] and not c["registrationCode"]:
+        return False
+    if not any(x in court for x in ["amt", "regricht"]):
+        return False
+    if cname.strip() == "gesellschaft mit beschraenkter haftung":
+        return False
+    return True
+
+
+def dedup_companies(companies):
+    """One entity per company name: the first one with the fewest missing court/code/year values."""
+    deduped = {}
+    for c in companies:
+        name = c["companyName"]
+        if not name:
+            continue
+        nulls = sum(v in (None, "") for v in [c["courtName"], c["registrationCode"], c["registrationYear"]])
+        if name not in deduped or nulls < deduped[name]["_null_count"]:
+            c["_null_count"] = nulls
+            deduped[name] = c
+    return deduped
+
+
+def court_uri_of(c):
+    """URI of a company entity's court, or None without a court name."""
+    if not c["courtName"]:
+        return None
+    return c["courtURI"] or COURT[c["courtName"].replace(" ", "_")]
 
-def normalize_text(text: str) -> str:
-    """
-    Normalize and clean German text with encoding corruptions and OCR artifacts.
-    Converts umlauts and ß to ASCII equivalents (ue, oe, ae, ss).
-    Example: München -> Muenchen, GeÅ¿ellÅ¿chaft -> Gesellschaft -> Gesellschaft -> Gesellschaft -> Gesellschaft
-    """
 
-    if not text:
-        return text
-
-    # 1. Try to fix double-encoding (MÃ¼nchen → München → Muenchen)
-    try:
-        text = text.encode("latin-1").decode("utf-8")
-    except (UnicodeEncodeError, UnicodeDecodeError):
-        pass
-
-    # 2. Replace known corruptions
-    replacements = {
-        "Ã¼": "ü", "Ãœ": "Ü",
-        "Ã¶": "ö", "Ã–": "Ö",
-        "Ã¤": "ä", "Ã„": "Ä",
-        "ÃŸ": "ß", "Å¿": "ß",
-        "Ã©": "é",
-        "â€“": "-", "â€”": "-", "â€": '"', "â€œ": '"',
-        "Ã ": "à", "Ã¡": "á", "Ã²": "ò", "Ã³": "ó",
-        "Â": "",
-    }
-
-    for k, v in replacements.items():
-        text = text.replace(k, v)
-
-    # 3. Fix long-s and OCR artifacts
-    text = text.replace("ſ", "s")
-    text = text.replace("Å¿", "ß")
-
-    # 4. Fix specific corrupted common terms
-    text = text.replace("GeÅ¿ellÅ¿chaft", "Gesellschaft")
-    text = text.replace("AktiengeÅ¿ellÅ¿chaft", "Aktiengesellschaft")
-
-    # 5. Replace German umlauts with ASCII equivalents
-    umlaut_map = {
-        "ä": "ae", "ö": "oe", "ü": "ue",
-        "Ä": "Ae", "Ö": "Oe", "Ü": "Ue",
-        "ß": "ss"
-    }
-    for k, v in umlaut_map.items():
-        text = text.replace(k, v)
-
-    # 6. Remove stray or non-printable chars
-    text = re.sub(r"[~`^¨´]", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-
-    return text.strip()
+def company_triples(c):
+    """Triples of a cleaned company entity, with the link to its court."""
+    comp_uri = c["uri"]
+    yield comp_uri, RDF.type, EX.Company
+    yield comp_uri, EX.companyName, Literal(c["companyName"])
+
+    if c["registrationCode"]:
+        yield comp_uri, EX.registrationCode, Literal(c["registrationCode"])
+    if c["registrationYear"]:
+        yield comp_uri, EX.registrationYear, Literal(c["registrationYear"])
+    if c["fileName"]:
+        yield comp_uri, EX.fileName, Literal(c["fileName"])
+
+    court_uri = court_uri_of(c)
+    if court_uri is not None:
+        yield comp_uri, EX.registeredAt, court_uri
+
+
+def court_triples(c):
+    """Type and name of a company entity's court."""
+    court_uri = court_uri_of(c)
+    if court_uri is not None:
+        yield court_uri, RDF.type, EX.Court
+        yield court_uri, EX.courtName, Literal(c["courtName"])
 
 
 def postprocess_ttl(ttl_path, output_path):
@@ -63,10 +98,6 @@ def postprocess_ttl(ttl_path, output_path):
     and correcting encoding/ocr artifacts (with ASCII umlaut normalization).
     """
 
-    EX = Namespace("http://example.org/schema/")
-    COMP = Namespace("http://example.org/company/")
-    COURT = Namespace("http://example.org/court/")
-
     g = Graph()
     g.parse(ttl_path, format="turtle")
 
@@ -107,38 +138,12 @@ def postprocess_ttl(ttl_path, output_path):
     print(f"🔍 Extracted {len(companies)} company entities.")
 
     # Filtering
-    filtered = []
-    for c in companies.values():
-        cname = (c["companyName"] or "").lower()
-        court = (c["courtName"] or "").lower()
-        regcode = c["registrationCode"]
-        regyear = c["registrationYear"]
-
-        if cname == court == (regcode or "").lower() == (regyear or "").lower():
-            continue
-        if any(x in court for x in ["polizei", "stadtkämmerei", "juſtizminiſter"]):
-            continue
-        if not c["courtName"] and not c["registrationCode"]:
-            continue
-        if not any(x in court for x in ["amt", "regricht"]):
-            continue
-        if cname.strip() == "gesellschaft mit beschraenkter haftung":
-            continue
-
-        filtered.append(c)
+    filtered = [c for c in companies.values() if keep_company(c)]
 
     print(f"✅ Remaining after filtering: {len(filtered)} entities")
 
     # Deduplication (fewest nulls)
-    deduped = {}
-    for c in filtered:
-        name = c["companyName"]
-        if not name:
-            continue
-        nulls = sum(v in (None, "") for v in [c["courtName"], c["registrationCode"], c["registrationYear"]])
-        if name not in deduped or nulls < deduped[name]["_null_count"]:
-            c["_null_count"] = nulls
-            deduped[name] = c
+    deduped = dedup_companies(filtered)
 
     print(f" Deduplicated to {len(deduped)} unique company names")
 
@@ -149,33 +154,155 @@ def postprocess_ttl(ttl_path, output_path):
     g_new.bind("court", COURT)
 
     for c in deduped.values():
-        comp_uri = c["uri"]
-        g_new.add((comp_uri, RDF.type, EX.Company))
-        g_new.add((comp_uri, EX.companyName, Literal(c["companyName"])))
-
-        if c["registrationCode"]:
-            g_new.add((comp_uri, EX.registrationCode, Literal(c["registrationCode"])))
-        if c["registrationYear"]:
-            g_new.add((comp_uri, EX.registrationYear, Literal(c["registrationYear"])))
-        if c["fileName"]:
-            g_new.add((comp_uri, EX.fileName, Literal(c["fileName"])))
-
-        if c["courtName"]:
-            court_uri = c["courtURI"] or COURT[c["courtName"].replace(" ", "_")]
-            g_new.add((court_uri, RDF.type, EX.Court))
-            g_new.add((court_uri, EX.courtName, Literal(c["courtName"])))
-            g_new.add((comp_uri, EX.registeredAt, court_uri))
+        for triple in company_triples(c):
+            g_new.add(triple)
+        for triple in court_triples(c):
+            g_new.add(triple)
 
     g_new.serialize(destination=output_path, format="turtle")
     print(f"💾 Cleaned TTL saved to: {output_path}")
     print(f"📊 Final triple count: {len(g_new)}")
 
 
+def _nt_unescape(match):
+    code = match.group(1) or match.group(2)
+    if code:
+        return chr(int(code, 16))
+    return NT_UNESCAPES.get(match.group(3), match.group(0))
+
+
+def iter_nt_statements(nt_path):
+    """
+    (subject, predicate, object, is_literal) of each statement of an
+    N-Triples file, or of a Turtle file written one statement per line
+    (json2rdf --writer stream --format ttl); prefix lines are skipped.
+    """
+    skipped = 0
+    with open(nt_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith(("#", "@prefix")):
+                continue
+            match = NT_STATEMENT.match(line)
+            if match is None:
+                skipped += 1
+                continue
+            s, p, iri, literal = match.groups()
+            if iri is not None:
+                yield s, p, iri, False
+            else:
+                yield s, p, NT_ESCAPE.sub(_nt_unescape, literal) if "\\" in literal else literal, True
+    if skipped:
+        print(f"⚠️ Skipped {skipped} lines that are not N-Triples statements")
+
+
+def postprocess_nt(nt_path, output_path, fmt="nt"):
+    """
+    Streaming variant of postprocess_ttl for N-Triples input (json2rdf
+    --format nt), with the same filters and deduplication. The file is read
+    line by line into a court-name dict and the company fields, instead of
+    two rdflib graphs, and the cleaned triples are written as they are
+    produced. Returns the number of triples written.
+    """
+    company_type = str(EX.Company)
+    rdf_type = str(RDF.type)
+    court_name = str(EX.courtName)
+
+    # Several records can mint the same URI with different values; like
+    # postprocess_ttl on a serialized (sorted) graph, the largest value is
+    # kept, so the result does not depend on the order of the input lines
+    courts = {}
+    # Company subject -> {field: raw value}; "typed" marks subjects that are ex:Company
+    companies = {}
+    statements = 0
+    for s, p, o, is_literal in iter_nt_statements(nt_path):
+        statements += 1
+        if p == court_name:
+            courts[s] = max(o, courts.get(s, o))
+            continue
+        field = COMPANY_FIELDS.get(p)
+        if field is not None:
+            fields = companies.setdefault(s, {})
+            fields[field] = max(o, fields.get(field, o))
+        elif p == rdf_type and o == company_type and not is_literal:
+            companies.setdefault(s, {})["typed"] = True
+
+    print(f"📂 Read {statements} triples from {os.path.basename(nt_path)}")
+    print(f"🔍 Extracted {sum('typed' in c for c in companies.values())} company entities.")
+
+    def clean(value):
+        return normalize_text(value.strip()) if value is not None else None
+
+    def entities():
+        # In URI order, as postprocess_ttl sees the subjects of a serialized graph (for ties in the dedup)
+        for uri in sorted(companies):
+            fields = companies[uri]
+            if "typed" not in fields:
+                continue
+            court_uri = fields.get("courtURI")
+            yield {
+                "uri": URIRef(uri),
+                "companyName": clean(fields.get("companyName")),
+                "courtName": clean(courts.get(court_uri)) if court_uri else None,
+                "registrationCode": clean(fields.get("registrationCode")),
+                "registrationYear": clean(fields.get("registrationYear")),
+                "courtURI": URIRef(court_uri) if court_uri else None,
+                "fileName": clean(fields.get("fileName")),
+            }
+
+    kept = 0
+
+    def filtered():
+        nonlocal kept
+        for c in entities():
+            if keep_company(c):
+                kept += 1
+                yield c
+
+    deduped = dedup_companies(filtered())
+    companies.clear()
+    print(f"✅ Remaining after filtering: {kept} entities")
+    print(f" Deduplicated to {len(deduped)} unique company names")
+
+    # Company triples are distinct, so only the courts need tracking
+    written_courts = set()
+    with TripleWriter(output_path, fmt, dedup=False) as writer:
+        for c in deduped.values():
+            for triple in company_triples(c):
+                writer.add(triple)
+            court_uri = court_uri_of(c)
+            if court_uri is not None and court_uri not in written_courts:
+                written_courts.add(court_uri)
+                for triple in court_triples(c):
+                    writer.add(triple)
+
+    print(f"💾 Cleaned triples saved to: {output_path}")
+    print(f"📊 Final triple count: {writer.count}")
+    return writer.count
+
+
 if __name__ == "__main__":
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     folder_path = os.path.join(BASE_DIR, "data", "processed", "DE_newspapers_1920_45_processed", "Qlever")
 
-    input_ttl = os.path.join(folder_path, "DE_1920_45_comb_ontology.ttl")
-    output_ttl = os.path.join(folder_path, "DE_1920_45_comb_ontology_cleaned.ttl")
-
-    postprocess_ttl(input_ttl, output_ttl)
+    parser = argparse.ArgumentParser(description="Filter, clean and deduplicate the extracted company graph.")
+    parser.add_argument(
+        "--input", default=None, help="Input graph (default: DE_1920_45_comb_ontology.ttl, or .nt with --stream)."
+    )
+    parser.add_argument("--output", default=None, help="Output file (default: <input>_cleaned.<ttl|nt>).")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read N-Triples (json2rdf --format nt) line by line instead of into an rdflib graph.",
+    )
+    parser.add_argument("--format", choices=["ttl", "nt"], default="nt", help="Output format with --stream.")
+    args = parser.parse_args()
+
+    input_path = args.input or os.path.join(folder_path, f"DE_1920_45_comb_ontology.{'nt' if args.stream else 'ttl'}")
+    root, _ = os.path.splitext(input_path)
+    extension = args.format if args.stream else "ttl"
+    output = args.output or f"{root}_cleaned.{extension}"
+
+    if args.stream:
+        postprocess_nt(input_path, output, fmt=args.format)
+    else:
+        postprocess_ttl(input_path, output)
@@ -0,0 +1,163 @@
+import re
+from functools import lru_cache
+from rdflib import Literal, XSD
+
+# Court names, years and file names repeat across hundreds of thousands of
+# records, so most normalizers below are memoized; the LRU bound keeps the
+# caches from growing with the (mostly distinct) company names
+CACHE_SIZE = 1 << 16
+
+UMLAUTS = (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("Ä", "Ae"), ("Ö", "Oe"), ("Ü", "Ue"), ("ß", "ss"))
+LOWER_UMLAUTS = (("ä", "ae"), ("ü", "ue"), ("ö", "oe"), ("ß", "ss"))
+
+# Replacement tables, applied with str.replace: each call is a C scan that
+# returns at once when the character is absent, which is faster than
+# str.translate with a mapping for these few characters
+
+# json2rdf: newspaper company and court URIs
+URI_REPLACEMENTS = UMLAUTS + ((" ", "_"),)
+NON_WORD = re.compile(r"[^\w_]")
+
+# generate_rdf: XJustiz register courts, register types and states
+REGISTER_COURT_REPLACEMENTS = ((" ", "_"), ("(", ""), (")", "")) + LOWER_UMLAUTS
+REGISTER_TYPE_REPLACEMENTS = ((" ", "_"),) + LOWER_UMLAUTS + (("-", "_"), (".", ""), (",", ""))
+STATE_REPLACEMENTS = ((" ", ""),) + LOWER_UMLAUTS
+
+# rdf_postprocesing: UTF-8 read as latin-1/cp1252, replaced in this order of preference
+CORRUPTIONS = {
+    "Ã¼": "ü", "Ãœ": "Ü",
+    "Ã¶": "ö", "Ã–": "Ö",
+    "Ã¤": "ä", "Ã„": "Ä",
+    "ÃŸ": "ß", "Å¿": "ß",
+    "Ã©": "é",
+    "â€“": "-", "â€”": "-", "â€": '"',
+    "Ã ": "à", "Ã¡": "á", "Ã²": "ò", "Ã³": "ó",
+}
+CORRUPTION = re.compile("|".join(map(re.escape, CORRUPTIONS)))
+# Long s, umlauts to ASCII and stray accent characters
+TEXT_REPLACEMENTS = (("ſ", "s"),) + UMLAUTS + tuple((ch, "") for ch in "~`^¨´")
+WHITESPACE = re.compile(r"\s+")
+
+INVALID_VALUES = (None, "", "unbekannt", "unknown", "?", "-", "N/A")
+
+
+def replace_all(text, replacements):
+    """Apply a table of (old, new) replacements in order."""
+    for old, new in replacements:
+        text = text.replace(old, new)
+    return text
+
+
+def clean_uri(s):
+    """Clean a string to make it URI-safe (handles German umlauts)."""
+    if not s:
+        return "unknown"
+    return NON_WORD.sub("", replace_all(s.strip(), URI_REPLACEMENTS))
+
+
+# For court names, which repeat; company names are mostly distinct, where
+# the cache lookup costs more than it saves
+clean_uri_cached = lru_cache(maxsize=CACHE_SIZE)(clean_uri)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def register_court_uri(name):
+    """Local name of a register court URI (court:...) as generate_rdf mints it, e.g. Berlin_Charlottenburg."""
+    return replace_all(name, REGISTER_COURT_REPLACEMENTS)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def register_type_uri(register_type):
+    """Local name of a register type URI (rtype:...), e.g. "Genossenschafts-Register" -> Genossenschafts_Register."""
+    return replace_all(register_type, REGISTER_TYPE_REPLACEMENTS)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def state_uri(state):
+    """Local name of a state URI (state:...), e.g. "Baden-Württemberg" -> Baden-Wuerttemberg."""
+    return replace_all(state, STATE_REPLACEMENTS)
+
+
+def _year_literal(value):
+    try:
+        year_str = str(value).strip().replace(".", "")
+        if year_str.isdigit() and 0 < int(year_str) < 9999:
+            return Literal(year_str, datatype=XSD.gYear)
+        else:
+            return Literal(str(value))
+    except Exception:
+        return Literal(str(value))
+
+
+@lru_cache(maxsize=CACHE_SIZE, typed=True)
+def _safe_literal(value, datatype):
+    if datatype == XSD.gYear:
+        return _year_literal(value)
+    return Literal(value, datatype=datatype) if datatype else Literal(value)
+
+
+def safe_literal(value, datatype=None):
+    """Safely create RDF Literals, handling invalid gYear values and other formats."""
+    if value in INVALID_VALUES:
+        return None
+    try:
+        return _safe_literal(value, datatype)
+    except TypeError:
+        # Unhashable values (lists, dicts) are not memoized
+        return _safe_literal.__wrapped__(value, datatype)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalize_text(text):
+    # 1. Try to fix double-encoding (MÃ¼nchen → München → Muenchen); ASCII text is unchanged by it
+    if not text.isascii():
+        try:
+            text = text.encode("latin-1").decode("utf-8")
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    # 2. Replace known corruptions
+    if "Ã" in text or "Å" in text or "â" in text:
+        text = CORRUPTION.sub(lambda m: CORRUPTIONS[m.group(0)], text)
+    if "Â" in text:
+        # Dropping a stray Â can join "Å" and "¿" into another corrupted ß
+        text = text.replace("Â", "").replace("Å¿", "ß")
+    # 3. Long s, umlauts and stray characters
+    text = replace_all(text, TEXT_REPLACEMENTS)
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize and clean German text with encoding corruptions and OCR artifacts.
+    Converts umlauts and ß to ASCII equivalents (ue, oe, ae, ss).
+    Example: München -> Muenchen, GeÅ¿ellÅ¿chaft -> Gesellschaft
+    """
+    if not text:
+        return text
+    return _normalize_text(text)
+
+
+def map_unique(func, values):
+    """
+    Apply a normalizer to a list or pandas Series, computing each distinct
+    value once. A Series is returned as a Series with the same index.
+    """
+    if hasattr(values, "unique") and hasattr(values, "map"):
+        return values.map({value: func(value) for value in values.unique()})
+    results = {}
+    mapped = []
+    for value in values:
+        if value not in results:
+            results[value] = func(value)
+        mapped.append(results[value])
+    return mapped
+
+
+def cache_info():
+    """Hit/miss statistics of the memoized normalizers."""
+    return {
+        "clean_uri": clean_uri_cached.cache_info(),
+        "safe_literal": _safe_literal.cache_info(),
+        "normalize_text": _normalize_text.cache_info(),
+        "register_court_uri": register_court_uri.cache_info(),
+    }
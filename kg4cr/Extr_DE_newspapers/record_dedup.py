@@ -0,0 +1,110 @@
+import re
+
+from json_records import EXPECTED_FIELDS
+
+NON_ALNUM = re.compile(r"[\W_]+")
+# Characters of a normalized company name used to find a record in chunk text
+ANCHOR_LENGTH = 20
+# Shorter names are too generic to count as a partial match
+MIN_PREFIX_LENGTH = 8
+
+
+def compact(value):
+    """Lower-case alphanumerics only, with the long s fixed, for comparing OCR'd strings."""
+    if not value:
+        return ""
+    return NON_ALNUM.sub("", str(value).replace("Å¿", "s").replace("ſ", "s").lower())
+
+
+def _names_match(a, b):
+    """Equal, or one is the start of the other (a name cut off at a chunk border)."""
+    if not a or not b:
+        return False
+    if a == b:
+        return True
+    shorter, longer = sorted((a, b), key=len)
+    return len(shorter) >= MIN_PREFIX_LENGTH and longer.startswith(shorter)
+
+
+def _compatible(a, b):
+    """No field holds two different values (court names may be contained in one another)."""
+    for field in EXPECTED_FIELDS:
+        x, y = compact(a.get(field)), compact(b.get(field))
+        if not x or not y or x == y:
+            continue
+        if field == "Company_name" and _names_match(x, y):
+            continue
+        if field == "Court_name" and (x in y or y in x):
+            continue
+        return False
+    return True
+
+
+def same_notice(a, b):
+    """True if two records from adjacent chunks describe the same notice."""
+    if not _compatible(a, b):
+        return False
+    name_a, name_b = compact(a.get("Company_name")), compact(b.get("Company_name"))
+    if name_a and name_b:
+        return _names_match(name_a, name_b)
+    # A partial record without company name: needs the same register number
+    code_a, code_b = compact(a.get("Registration_Code")), compact(b.get("Registration_Code"))
+    return bool(code_a) and code_a == code_b
+
+
+def completeness(record):
+    filled = sum(1 for field in EXPECTED_FIELDS if record.get(field))
+    return filled, len(record.get("Company_name") or "")
+
+
+def merge_records(a, b):
+    """The more complete record, with its missing fields taken from the other one."""
+    best, other = (a, b) if completeness(a) >= completeness(b) else (b, a)
+    merged = dict(best)
+    for field in EXPECTED_FIELDS:
+        if not merged.get(field) and other.get(field):
+            merged[field] = other[field]
+    return merged
+
+
+def _appears_in(record, text_compact):
+    anchor = compact(record.get("Company_name"))[:ANCHOR_LENGTH] or compact(record.get("Registration_Code"))
+    return bool(anchor) and anchor in text_compact
+
+
+def merge_adjacent_duplicates(chunk_records, chunks):
+    """
+    Collapse records that were extracted twice because their notice lies in
+    the overlap of two neighbouring chunks, or was cut in two at the border.
+
+    `chunk_records[k]` are the records extracted from `chunks[k]`. A record
+    of chunk k+1 is only compared with the records of chunk k if one of the
+    two can be found in the text of the other chunk (by its company name or
+    register number), so notices that merely look alike in distant parts of
+    the issue are kept. Duplicates are merged into the more complete record.
+    Returns (records in chunk order, number of records merged away).
+    """
+    merged_away = 0
+    output = []
+    previous = []
+    previous_compact = ""
+    for k, records in enumerate(chunk_records):
+        current_compact = compact(chunks[k]) if k < len(chunks) else ""
+        kept = []
+        for record in records:
+            match = None
+            for i, candidate in enumerate(previous):
+                if not (_appears_in(record, previous_compact) or _appears_in(candidate, current_compact)):
+                    continue
+                if same_notice(candidate, record):
+                    match = i
+                    break
+            if match is None:
+                kept.append(record)
+            else:
+                previous[match] = merge_records(previous[match], record)
+                merged_away += 1
+        output.extend(previous)
+        previous, previous_compact = kept, current_compact
+    output.extend(previous)
+    return output, merged_away
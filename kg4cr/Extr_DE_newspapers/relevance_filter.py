@@ -0,0 +1,124 @@
+import re
+import json
+import logging
+import argparse
+
+# (pattern, weight) on normalized lower-case text; patterns tolerate common
+# OCR confusions (i/l/1, c/e, ch → d/k) and the long s (ſ, Å¿) is mapped to s.
+RELEVANCE_PATTERNS = [
+    (re.compile(r"hand[ec]ls\s?reg[il1]st[ec]r"), 3),
+    (re.compile(r"genossenschafts\s?reg[il1]st[ec]r"), 3),
+    (re.compile(r"f[il1]rmen\s?reg[il1]st[ec]r"), 3),
+    (re.compile(r"reg[il1]ster\s?ger[il1][cdk]?h?t"), 3),
+    (re.compile(r"\bh\s?\.?\s?[-⸗]?\s?r\s?\.\s?[ab]\b|\bhr\s?[abx]\b"), 3),
+    (re.compile(r"konkurs\s?verfahren|vergle[il1]chs\s?verfahren"), 3),
+    (re.compile(r"a[mn]ts\s?ger[il1][cdk]?h?t"), 2),
+    (re.compile(r",\s+den\s+\d{1,2}\.\s*[a-zäöü]+\.?\s*\d{3,4}"), 2),
+    (re.compile(r"g\.\s?m\.\s?b\.\s?h|akt[il1]engesellschaft|kommanditgesellschaft|genossenschaft"), 1),
+    (re.compile(r"\bf[il1]rma\b|\b[il1]nhaber|prokura|e[il1]ngetragen|gelöscht"), 1),
+]
+# Matches of one pattern beyond this count do not add to the score
+MAX_HITS_PER_PATTERN = 3
+DEFAULT_THRESHOLD = 3
+
+
+def normalize_for_scoring(text):
+    """Lower-case text with long s fixed and line-break hyphenation removed."""
+    text = text.replace("Å¿", "s").replace("ſ", "s")
+    text = re.sub(r"[⸗¬-]\s*\n\s*", "", text)
+    return text.lower()
+
+
+def relevance_score(chunk):
+    """Weighted count of register-notice keywords in a chunk."""
+    text = normalize_for_scoring(chunk)
+    score = 0
+    for pattern, weight in RELEVANCE_PATTERNS:
+        hits = len(pattern.findall(text))
+        score += min(hits, MAX_HITS_PER_PATTERN) * weight
+    return score
+
+
+def filter_chunks(chunks, threshold=DEFAULT_THRESHOLD):
+    """Keep only chunks scoring at least `threshold`. Returns (kept_chunks, number_skipped)."""
+    kept = [c for c in chunks if relevance_score(c) >= threshold]
+    return kept, len(chunks) - len(kept)
+
+
+def _compact(s):
+    return re.sub(r"[\W_]+", "", normalize_for_scoring(s or ""))
+
+
+def recall_against_gt(text, gt_records, chunker, threshold=DEFAULT_THRESHOLD):
+    """
+    Check that the prefilter keeps the chunks holding the ground-truth notices.
+
+    Each GT record is located by the start of its company name in the chunks
+    of `text`; recall is the share of located records whose chunk survives
+    the filter. Returns a dict with the counts and the records that were lost.
+    """
+    chunks = chunker(text)
+    compact_chunks = [_compact(c) for c in chunks]
+    kept = [relevance_score(c) >= threshold for c in chunks]
+
+    located, recalled, lost, not_found = 0, 0, [], []
+    for record in gt_records:
+        key = _compact(record.get("Company_name"))[:20]
+        if not key:
+            continue
+        hits = [i for i, c in enumerate(compact_chunks) if key in c]
+        if not hits:
+            not_found.append(record.get("Company_name"))
+            continue
+        located += 1
+        if any(kept[i] for i in hits):
+            recalled += 1
+        else:
+            lost.append(record.get("Company_name"))
+
+    return {
+        "chunks": len(chunks),
+        "skipped_chunks": kept.count(False),
+        "gt_records": len(gt_records),
+        "located": located,
+        "recalled": recalled,
+        "recall": round(recalled / located, 4) if located else None,
+        "lost": lost,
+        "not_found": not_found,
+    }
+
+
+if __name__ == "__main__":
+    from extract_info_newspapers_DE import smart_chunk_text
+
+    parser = argparse.ArgumentParser(
+        description="Measure recall of the pre-LLM relevance filter against a ground-truth JSON."
+    )
+    parser.add_argument("--text", required=True, help="OCR text file the ground truth was annotated on.")
+    parser.add_argument(
+        "--gt",
+        default="./data/processed/DE_newspapers_llm_tests/GT_Reichsanzeiger_06_09_1927.json",
+        help="Ground-truth JSON records.",
+    )
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--max_words", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    with open(args.text, "r", encoding="utf-8") as f:
+        text = f.read()
+    with open(args.gt, "r", encoding="utf-8") as f:
+        gt_records = json.load(f)
+
+    report = recall_against_gt(
+        text,
+        gt_records,
+        lambda t: smart_chunk_text(t, max_words=args.max_words, overlap_words=args.overlap),
+        threshold=args.threshold,
+    )
+    print(f"Chunks: {report['chunks']} | skipped by prefilter: {report['skipped_chunks']}")
+    print(f"GT records located in text: {report['located']}/{report['gt_records']}")
+    print(f"Recall of kept chunks: {report['recall']}")
+    for name in report["lost"]:
+        print(f"⚠️  Lost: {name}")
@@ -0,0 +1,307 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+import contextlib
+import contextvars
+from collections import Counter, defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import aiohttp
+
+PHASES = ("queue_wait", "connect", "ttfb", "total")
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+RECORDER = None
+
+# Attempt of the current chunk (set by call_with_retries) and the provider call in progress
+_attempt = contextvars.ContextVar("llm_attempt", default=None)
+_current = contextvars.ContextVar("llm_request", default=None)
+
+
+def set_recorder(recorder):
+    """Enable (or with None disable) request metrics for the run."""
+    global RECORDER
+    RECORDER = recorder
+
+
+def start_attempt(label, attempt, queue_wait, fields=None):
+    """Remember which chunk/attempt (and e.g. file) the following provider calls belong to."""
+    if RECORDER is not None:
+        _attempt.set({"label": label, "attempt": attempt, "queue_wait": queue_wait, "fields": fields or {}})
+
+
+def add_queue_wait(seconds):
+    """
+    Count time spent waiting for a further slot (a routed backend's limiter)
+    into the queue wait of the provider calls that follow in this task.
+    """
+    attempt = _attempt.get()
+    if attempt is not None:
+        _attempt.set({**attempt, "queue_wait": round((attempt["queue_wait"] or 0) + seconds, 4)})
+
+
+@contextlib.contextmanager
+def request_trace(provider, model=None):
+    """
+    Measure one provider call. Yields the trace dict (None when metrics are
+    off) that the HTTP hooks and providers fill in; it is recorded on exit.
+    """
+    if RECORDER is None:
+        yield None
+        return
+    attempt = _attempt.get() or {}
+    trace = {
+        "ts": round(time.time(), 3),
+        **attempt.get("fields", {}),
+        "label": attempt.get("label"),
+        "attempt": attempt.get("attempt", 1),
+        "provider": provider,
+        "model": model,
+        "queue_wait": attempt.get("queue_wait"),
+        "connect": None,
+        "ttfb": None,
+        "total": None,
+        "prompt_tokens": None,
+        "completion_tokens": None,
+        "cached": False,
+        "outcome": "ok",
+        "http_status": None,
+        "error": None,
+    }
+    start = time.monotonic()
+    trace["_start"] = start
+    token = _current.set(trace)
+    try:
+        yield trace
+    except asyncio.CancelledError:
+        # The other copy of a hedged request won
+        trace["outcome"] = "cancelled"
+        raise
+    except Exception as e:
+        trace["outcome"] = "error"
+        trace["error"] = str(e)[:300]
+        trace["http_status"] = trace["http_status"] or getattr(e, "status", None)
+        raise
+    finally:
+        _current.reset(token)
+        trace["total"] = round(time.monotonic() - start, 4)
+        del trace["_start"]
+        RECORDER.record(trace)
+
+
+def annotate(**fields):
+    """Add fields to the provider call in progress."""
+    trace = _current.get()
+    if trace is not None:
+        trace.update(fields)
+
+
+def note_usage(prompt_tokens=None, completion_tokens=None):
+    """Token counts reported by the provider for the call in progress."""
+    trace = _current.get()
+    if trace is not None:
+        if prompt_tokens is not None:
+            trace["prompt_tokens"] = prompt_tokens
+        if completion_tokens is not None:
+            trace["completion_tokens"] = completion_tokens
+
+
+def note_usage_from(res):
+    """Read token counts from an Ollama (prompt_eval_count/eval_count) or OpenAI-style (usage) answer."""
+    if _current.get() is None or not isinstance(res, dict):
+        return
+    usage = res.get("usage") or {}
+    note_usage(
+        res.get("prompt_eval_count", usage.get("prompt_tokens")),
+        res.get("eval_count", usage.get("completion_tokens")),
+    )
+
+
+def record_parse(label, stats, fields=None):
+    """Outcome of parsing a chunk's answer (objects, valid, salvaged, rejected)."""
+    if RECORDER is not None:
+        RECORDER.record({"ts": round(time.time(), 3), "event": "parse", **(fields or {}), "label": label, **stats})
+
+
+def trace_config():
+    """aiohttp hooks timing connection setup and time to first byte of the call in progress."""
+
+    def since_start(trace):
+        return round(time.monotonic() - trace["_start"], 4)
+
+    async def on_connection_create_start(session, ctx, params):
+        trace = _current.get()
+        if trace is not None:
+            ctx.connect_start = time.monotonic()
+
+    async def on_connection_create_end(session, ctx, params):
+        trace = _current.get()
+        if trace is not None and hasattr(ctx, "connect_start"):
+            trace["connect"] = round(time.monotonic() - ctx.connect_start, 4)
+
+    async def on_request_end(session, ctx, params):
+        # Fired when the response headers have arrived
+        trace = _current.get()
+        if trace is not None and "_start" in trace:
+            trace["ttfb"] = since_start(trace)
+            trace["http_status"] = params.response.status
+
+    config = aiohttp.TraceConfig()
+    config.on_connection_create_start.append(on_connection_create_start)
+    config.on_connection_create_end.append(on_connection_create_end)
+    config.on_request_end.append(on_request_end)
+    return config
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q / 100 * (len(ordered) - 1))]
+
+
+class MetricsRecorder:
+    """
+    Collect per-request metrics of a run: every provider call is appended to
+    a JSONL trace (if `trace_path` is given) and aggregated per provider for
+    summary() and a Prometheus text exposition (serve()), and per input file
+    (the "file" trace field) for file_totals().
+    """
+
+    def __init__(self, trace_path=None):
+        self.trace_path = trace_path
+        self._file = open(trace_path, "a", encoding="utf-8") if trace_path else None
+        self._lock = threading.Lock()
+        self._server = None
+        self.phases = defaultdict(lambda: defaultdict(list))
+        self.counts = defaultdict(lambda: defaultdict(int))
+        self.buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self.parse = defaultdict(int)
+        self.files = defaultdict(lambda: defaultdict(int))
+
+    def record(self, event):
+        with self._lock:
+            if self._file is not None:
+                self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+                self._file.flush()
+            if event.get("event") == "parse":
+                for key in ("objects", "valid", "salvaged", "rejected"):
+                    self.parse[key] += event.get(key, 0)
+                return
+
+            provider = event.get("provider") or "unknown"
+            counts = self.counts[provider]
+            counts["requests"] += 1
+            counts[event["outcome"]] += 1
+            counts["cached"] += int(event["cached"])
+            counts["retries"] += int((event.get("attempt") or 1) > 1)
+            counts["prompt_tokens"] += event.get("prompt_tokens") or 0
+            counts["completion_tokens"] += event.get("completion_tokens") or 0
+            # A batched request ("files": the file of each chunk) counts for every file in it,
+            # its tokens are shared by the number of chunks per file
+            files = event.get("files") or [event.get("file")]
+            for file_key, num_chunks in Counter(files).items():
+                share = num_chunks / len(files)
+                file_counts = self.files[file_key]
+                file_counts["requests"] += 1
+                file_counts[event["outcome"]] += 1
+                file_counts["prompt_tokens"] += round((event.get("prompt_tokens") or 0) * share)
+                file_counts["completion_tokens"] += round((event.get("completion_tokens") or 0) * share)
+            if event["cached"]:
+                return
+            for phase in PHASES:
+                if event.get(phase) is not None:
+                    self.phases[provider][phase].append(event[phase])
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if event["total"] <= bound:
+                    self.buckets[provider][i] += 1
+
+    def summary(self):
+        """One row per provider with counts, token totals and p50/p95 per latency phase."""
+        rows = []
+        with self._lock:
+            for provider, counts in self.counts.items():
+                row = {
+                    "provider": provider,
+                    "requests": counts["requests"],
+                    "errors": counts["error"],
+                    "retries": counts["retries"],
+                    "cached": counts["cached"],
+                    "prompt_tokens": counts["prompt_tokens"],
+                    "completion_tokens": counts["completion_tokens"],
+                }
+                for phase in PHASES:
+                    values = self.phases[provider][phase]
+                    row[f"{phase}_p50"] = round(_percentile(values, 50), 2) if values else None
+                    row[f"{phase}_p95"] = round(_percentile(values, 95), 2) if values else None
+                rows.append(row)
+        return rows
+
+    def file_totals(self, file_key):
+        """Requests and token totals of the provider calls made for one input file."""
+        with self._lock:
+            counts = self.files.get(file_key, {})
+            return {
+                "requests": counts.get("requests", 0),
+                "errors": counts.get("error", 0),
+                "prompt_tokens": counts.get("prompt_tokens", 0),
+                "completion_tokens": counts.get("completion_tokens", 0),
+            }
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            lines.append("# TYPE kg4cr_llm_requests_total counter")
+            for provider, counts in self.counts.items():
+                for outcome in ("ok", "error"):
+                    lines.append(f'kg4cr_llm_requests_total{{provider="{provider}",outcome="{outcome}"}} {counts[outcome]}')
+            for key in ("cached", "retries"):
+                lines.append(f"# TYPE kg4cr_llm_{key}_total counter")
+                for provider, counts in self.counts.items():
+                    lines.append(f'kg4cr_llm_{key}_total{{provider="{provider}"}} {counts[key]}')
+            lines.append("# TYPE kg4cr_llm_tokens_total counter")
+            for provider, counts in self.counts.items():
+                for kind in ("prompt", "completion"):
+                    lines.append(f'kg4cr_llm_tokens_total{{provider="{provider}",type="{kind}"}} {counts[f"{kind}_tokens"]}')
+            lines.append("# TYPE kg4cr_llm_request_duration_seconds histogram")
+            for provider, buckets in self.buckets.items():
+                totals = self.phases[provider]["total"]
+                for bound, count in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f'kg4cr_llm_request_duration_seconds_bucket{{provider="{provider}",le="{bound}"}} {count}')
+                lines.append(f'kg4cr_llm_request_duration_seconds_bucket{{provider="{provider}",le="+Inf"}} {len(totals)}')
+                lines.append(f'kg4cr_llm_request_duration_seconds_sum{{provider="{provider}"}} {sum(totals):.4f}')
+                lines.append(f'kg4cr_llm_request_duration_seconds_count{{provider="{provider}"}} {len(totals)}')
+            lines.append("# TYPE kg4cr_llm_phase_seconds_total counter")
+            for provider, phases in self.phases.items():
+                for phase in PHASES:
+                    lines.append(f'kg4cr_llm_phase_seconds_total{{provider="{provider}",phase="{phase}"}} {sum(phases[phase]):.4f}')
+            lines.append("# TYPE kg4cr_llm_parsed_records_total counter")
+            for key in ("valid", "salvaged", "rejected"):
+                lines.append(f'kg4cr_llm_parsed_records_total{{result="{key}"}} {self.parse[key]}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Expose prometheus_text() on http://host:port/metrics from a background thread."""
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = recorder.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        logging.info(f"📈 Prometheus metrics on http://{host}:{port}/metrics")
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+        if self._file is not None:
+            self._file.close()
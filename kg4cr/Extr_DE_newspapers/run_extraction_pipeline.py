@@ -15,7 +15,19 @@ load_dotenv()
 UNIHPC_URL = os.getenv("UNIHPC_URL")
 print(f"Using UNIHPC_URL: {UNIHPC_URL}")
 
-from extract_info_newspapers_DE import process_single_file
+import extract_info_newspapers_DE as extractor
+from extract_info_newspapers_DE import process_single_file, process_files_pooled
+from llm_cache import ResponseCache
+from chunk_journal import ChunkJournal
+from adaptive_limiter import get_limiter
+from chunking import TokenChunker
+from provider_clients import make_session, close_provider_clients
+from provider_router import ProviderRouter
+from work_manifest import WorkManifest, default_worker_id
+from prompts import PROMPTS
+from run_schedule import TimeBudget, order_files, load_priority_list, parse_duration
+from ocr_normalize import prenormalize_files
+from request_metrics import MetricsRecorder, set_recorder
 
 # === Argument Parser ===
 def parse_args():
@@ -48,6 +60,38 @@ def parse_args():
         choices=["unihpc", "ollama", "openrouter", "groq", "maia"],
         help="Which LLM provider to use."
     )
+    parser.add_argument(
+        "--providers",
+        nargs="+",
+        choices=["unihpc", "ollama", "openrouter", "groq", "maia"],
+        default=None,
+        help="Spread chunks over several providers, weighted by their observed throughput "
+             "(replaces --provider; each provider gets its own adaptive concurrency limit)."
+    )
+    parser.add_argument(
+        "--prompt",
+        choices=sorted(PROMPTS),
+        default=None,
+        help="Extraction prompt variant (default: EXTRACTION_PROMPT_VARIANT in .env, else 'de'). "
+             "Compare their token cost and accuracy with prompt_variants.py."
+    )
+    parser.add_argument(
+        "--prompt_for",
+        nargs="+",
+        default=[],
+        metavar="PROVIDER=VARIANT",
+        help="Prompt variant per provider, e.g. --prompt_for groq=de_compact unihpc=de "
+             "(overrides --prompt and <PROVIDER>_PROMPT in .env)."
+    )
+    parser.add_argument(
+        "--hedge",
+        type=float,
+        nargs="?",
+        const=95,
+        default=None,
+        help="With --providers: also send a request to a second provider once it runs longer than "
+             "this latency percentile of the first (default 95)."
+    )
     parser.add_argument(
         "--max_words", "-mw",
         type=int,
@@ -58,7 +102,48 @@ def parse_args():
         "--overlap", "-ov",
         type=int,
         default=50,
-        help="Word overlap between chunks."
+        help="Overlap between chunks (words; tokens at hard cuts with --chunking tokens)."
+    )
+    parser.add_argument(
+        "--chunking",
+        type=str,
+        default="words",
+        choices=["words", "tokens"],
+        help="'words' splits into --max_words windows; 'tokens' packs whole notices up to the "
+             "model's token budget (context minus prompt minus answer reserve)."
+    )
+    parser.add_argument(
+        "--context_tokens",
+        type=int,
+        default=8192,
+        help="Context length of the model (token chunking)."
+    )
+    parser.add_argument(
+        "--reserve_tokens",
+        type=int,
+        default=2048,
+        help="Tokens kept free for the model's answer (token chunking)."
+    )
+    parser.add_argument(
+        "--max_chunk_tokens",
+        type=int,
+        default=None,
+        help="Optional upper limit of text tokens per chunk (token chunking)."
+    )
+    parser.add_argument(
+        "--tokenizer",
+        type=str,
+        default=None,
+        help="Tokenizer for token chunking: 'approx' (default), 'tiktoken:<encoding>' or 'hf:<model>'."
+    )
+    parser.add_argument(
+        "--prefilter",
+        type=int,
+        nargs="?",
+        const=3,
+        default=None,
+        help="Skip chunks whose register-keyword score (Amtsgericht, Handelsregister, HRA/HRB, ...) "
+             "is below this threshold (default threshold when given without value: 3)."
     )
     parser.add_argument(
         "--delay", "-d",
@@ -73,6 +158,166 @@ def parse_args():
         choices=["parallel", "sequential"],
         help="Whether to process chunks in parallel or sequentially."
     )
+    parser.add_argument(
+        "--pipeline",
+        type=str,
+        default="file",
+        choices=["file", "pooled"],
+        help="'file' processes one file at a time; 'pooled' feeds the chunks of all files "
+             "into one shared queue and event loop (--mode and --delay are ignored)."
+    )
+    parser.add_argument(
+        "--max_concurrent", "-c",
+        type=int,
+        default=5,
+        help="Maximum number of in-flight LLM requests (per file, or across all files in pooled mode)."
+    )
+    parser.add_argument(
+        "--batch_tokens",
+        type=int,
+        default=None,
+        help="Pooled mode only: pack several short chunks (from any file) into one request "
+             "up to this many estimated text tokens."
+    )
+    parser.add_argument(
+        "--batch_max_chunks",
+        type=int,
+        default=8,
+        help="Maximum number of chunks per batched request."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream answers (ollama/openrouter/maia/unihpc) and cancel a request once the JSON array "
+             "is closed or the model loops (default: LLM_STREAM from .env)."
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Adapt concurrency to the provider (AIMD): start at --max_concurrent, grow while "
+             "latency stays flat, back off on 429/5xx, timeouts and Retry-After."
+    )
+    parser.add_argument(
+        "--adaptive_max",
+        type=int,
+        default=None,
+        help="Upper concurrency limit in adaptive mode and per provider with --providers (default: per-provider setting)."
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=None,
+        help="SQLite file for caching LLM responses across runs (default: LLM_CACHE_PATH from .env, else off)."
+    )
+    parser.add_argument(
+        "--cache_max_mb",
+        type=float,
+        default=1024,
+        help="Size limit of the response cache; least recently used entries are evicted beyond it."
+    )
+    parser.add_argument(
+        "--journal",
+        type=str,
+        default=None,
+        help="JSONL journal of finished chunks used to resume interrupted runs "
+             "(default: chunk_journal.jsonl in the output folder). With --manifest, a folder with one "
+             "journal per input file (default: chunk_journal in the output folder)."
+    )
+    parser.add_argument(
+        "--no_journal",
+        action="store_true",
+        help="Disable the chunk journal (failed files are re-processed from scratch)."
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        help="Shared SQLite work manifest: several workers (also on different nodes) started with the "
+             "same input folder and manifest each lease files from it, so no file is processed twice."
+    )
+    parser.add_argument(
+        "--worker_id",
+        type=str,
+        default=None,
+        help="Name of this worker in the manifest and its run summary (default: hostname plus the SLURM "
+             "task rank, or the process id outside SLURM). The run refuses to start while the manifest "
+             "still holds unexpired leases under this id."
+    )
+    parser.add_argument(
+        "--lease_seconds",
+        type=int,
+        default=600,
+        help="A file leased by a worker that stops renewing it for this long is given to another worker."
+    )
+    parser.add_argument(
+        "--max_attempts",
+        type=int,
+        default=3,
+        help="How often a file is tried (over all workers) before it is marked failed in the manifest."
+    )
+    parser.add_argument(
+        "--metrics",
+        nargs="?",
+        const="",
+        default=None,
+        help="Record every LLM request (queue wait, connect, time to first byte, total, tokens, outcome) "
+             "to a JSONL trace; optionally give its path (default: request_trace_<timestamp>.jsonl in the log folder)."
+    )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=None,
+        help="Serve the request metrics in Prometheus text format on this port (/metrics) during the run."
+    )
+    parser.add_argument(
+        "--metrics_host",
+        default="127.0.0.1",
+        help="Address the metrics endpoint listens on (default: 127.0.0.1; 0.0.0.0 for all interfaces)."
+    )
+    parser.add_argument(
+        "--normalize",
+        action="store_true",
+        help="Repair mojibake (e.g. 'GeÅ¿ellÅ¿chaft') and the long s in the input before chunking. Normalized "
+             "texts are cached in a .normalized folder next to the inputs, keyed by their content hash."
+    )
+    parser.add_argument(
+        "--normalize_workers",
+        type=int,
+        default=None,
+        help="Processes normalizing the input files before the run starts (default: one per CPU)."
+    )
+    parser.add_argument(
+        "--order",
+        choices=["path", "size", "size_desc"],
+        default="path",
+        help="Order in which files are processed: by path, smallest first, or largest first."
+    )
+    parser.add_argument(
+        "--priority_years",
+        nargs="+",
+        type=int,
+        default=[],
+        help="Process the files of these year folders first, in the given order (e.g. --priority_years 1936 1937)."
+    )
+    parser.add_argument(
+        "--priority_list",
+        type=str,
+        default=None,
+        help="Text file with input files (relative paths or file names, one per line) to process before all others."
+    )
+    parser.add_argument(
+        "--time_budget",
+        type=str,
+        default=None,
+        help="Wall-clock budget of the run, e.g. 3600, 90m, 12h or 1-12:00:00 (SLURM style). When it is "
+             "about to run out, no new files or chunks are started; unfinished files are resumed next run."
+    )
+    parser.add_argument(
+        "--budget_reserve",
+        type=str,
+        default="5m",
+        help="Time kept at the end of --time_budget to let the requests in flight finish (default 5m)."
+    )
     parser.add_argument(
         "--strict",
         action="store_true",
@@ -95,6 +340,12 @@ if __name__ == "__main__":
     delay_seconds = args.delay
     strict_mode = args.strict
     mode = args.mode
+    pipeline = args.pipeline
+    max_concurrent = args.max_concurrent
+    worker_id = args.worker_id or default_worker_id()
+    budget = None
+    if args.time_budget:
+        budget = TimeBudget(parse_duration(args.time_budget), parse_duration(args.budget_reserve))
 
     # === Logging setup ===
     logging.basicConfig(
@@ -102,10 +353,94 @@ if __name__ == "__main__":
         format="%(levelname)s: %(message)s",
     )
 
+    if args.stream:
+        extractor.set_streaming(True)
+
+    # === Prompt variants ===
+    if args.prompt:
+        extractor.set_prompt_variant(args.prompt)
+    for spec in args.prompt_for:
+        name, _, variant = spec.partition("=")
+        extractor.set_prompt_variant(variant, provider=name)
+    providers_used = args.providers or [provider]
+    prompt_variants = {p: extractor.get_prompt_variant(p) for p in providers_used}
+    logging.info("📝 Prompt: " + ", ".join(f"{p}={v}" for p, v in prompt_variants.items()))
+
+    # === Response cache ===
+    if args.cache:
+        extractor.set_response_cache(ResponseCache(args.cache, args.cache_max_mb))
+    if extractor.RESPONSE_CACHE is not None:
+        logging.info(f"🗄️  Using LLM response cache: {extractor.RESPONSE_CACHE.path}")
+
+    if args.batch_tokens and pipeline != "pooled":
+        logging.warning("--batch_tokens only applies to --pipeline pooled and is ignored")
+
     # === Prepare folders ===
     output_folder.mkdir(parents=True, exist_ok=True)
     log_folder.mkdir(parents=True, exist_ok=True)
 
+    # === Request metrics ===
+    metrics = None
+    if args.metrics is not None or args.metrics_port:
+        trace_path = None
+        if args.metrics is not None:
+            trace_path = args.metrics or log_folder / f"request_trace_{time.strftime('%Y%m%d_%H%M%S')}.jsonl"
+        metrics = MetricsRecorder(trace_path)
+        set_recorder(metrics)
+        if trace_path:
+            logging.info(f"📈 Request trace: {trace_path}")
+        if args.metrics_port:
+            metrics.serve(args.metrics_port, host=args.metrics_host)
+
+    # === Adaptive concurrency ===
+    limiter = None
+    if args.adaptive:
+        limiter = get_limiter(provider, initial=max_concurrent, max_limit=args.adaptive_max)
+        logging.info(
+            f"🎚️  Adaptive concurrency for {provider}: start {limiter.limit}, "
+            f"range {limiter.min_limit}-{limiter.max_limit}"
+        )
+
+    # === Multi-provider routing ===
+    router = None
+    if args.providers:
+        if args.adaptive:
+            logging.info("--adaptive is implied by --providers (one limiter per provider)")
+        router = ProviderRouter(
+            args.providers, extractor.extract_info_from_text, hedge_percentile=args.hedge, max_limit=args.adaptive_max
+        )
+        provider, limiter = router, None
+        max_concurrent = max(max_concurrent, router.max_capacity)
+        logging.info(
+            f"🔀 Routing over {router.name} (up to {max_concurrent} requests in flight"
+            f"{f', hedging after p{args.hedge:g}' if args.hedge else ''})"
+        )
+    elif args.hedge:
+        logging.warning("--hedge only applies together with --providers and is ignored")
+
+    # === Chunker ===
+    chunker = None
+    if args.chunking == "tokens":
+        chunker = TokenChunker(
+            context_tokens=args.context_tokens,
+            # Budget for the longest prompt in use
+            prompt=max((PROMPTS[v] for v in prompt_variants.values()), key=len),
+            reserve_tokens=args.reserve_tokens,
+            max_chunk_tokens=args.max_chunk_tokens,
+            overlap_tokens=overlap_words,
+            tokenizer=args.tokenizer,
+        )
+        logging.info(f"✂️  Token chunking: {chunker.budget} tokens per chunk (prompt {chunker.prompt_tokens})")
+
+    # === Chunk journal (resume at chunk level) ===
+    journal = None
+    if not args.no_journal:
+        if args.manifest:
+            # One journal per input file, so whichever worker leases a file next resumes it
+            journal = ChunkJournal(args.journal or output_folder / "chunk_journal", per_file=True)
+        else:
+            journal = ChunkJournal(args.journal or output_folder / "chunk_journal.jsonl")
+
     # === Find all input text files ===
     txt_files = sorted(input_folder.rglob("*.txt"))
     if not txt_files:
@@ -114,46 +449,159 @@ if __name__ == "__main__":
 
     logging.info(f"📂 Found {len(txt_files)} text files across all subfolders")
 
-    summary = []
-    run_start = time.time()
+    # === Processing order ===
+    if args.order != "path" or args.priority_years or args.priority_list:
+        priority_list = load_priority_list(args.priority_list) if args.priority_list else None
+        txt_files = order_files(txt_files, input_folder, args.order, args.priority_years, priority_list)
+        logging.info(
+            "🔢 Processing order: "
+            + ", ".join(str(f.relative_to(input_folder)) for f in txt_files[:3])
+            + (", ..." if len(txt_files) > 3 else "")
+        )
+    if budget is not None:
+        logging.info(
+            f"⏰ Time budget {budget.seconds:.0f}s: no new work after {budget.seconds - budget.reserve_seconds:.0f}s"
+        )
 
-    for idx, txt_file in enumerate(txt_files):
+    def output_path(txt_file):
         relative_path = txt_file.relative_to(input_folder)
-        out_file = output_folder / relative_path.parent / (txt_file.stem + ".json")
-        out_file.parent.mkdir(parents=True, exist_ok=True)
-
-        if out_file.exists():
-            logging.info(f"⏭️  Skipping {relative_path}, JSON already exists")
-            continue
+        return output_folder / relative_path.parent / (txt_file.stem + ".json")
 
-        logging.info(f"[{idx+1}/{len(txt_files)}] Processing: {relative_path}")
+    # === OCR pre-normalization (CPU-bound, done up front in a process pool) ===
+    if args.normalize:
+        extractor.set_input_normalization(True)
+    if extractor.OCR_NORMALIZE:
+        if args.manifest:
+            # Every worker would normalize the whole folder; files are normalized when claimed instead
+            logging.info("🧹 Input normalization on read (cached in .normalized folders)")
+        else:
+            todo = [f for f in txt_files if not output_path(f).exists()]
+            norm_stats = prenormalize_files(todo, args.normalize_workers)
+            logging.info(
+                f"🧹 Normalized {norm_stats['normalized']} input files ({norm_stats['fixes']} fixes), "
+                f"{norm_stats['cached']} from cache, {norm_stats['failed']} failed, in {norm_stats['time_sec']}s"
+            )
 
+    # === Shared work manifest (several workers/nodes on one input folder) ===
+    manifest = None
+    if args.manifest:
         try:
-            result = asyncio.run(
-                process_single_file(
-                    txt_file,
-                    out_file,
-                    max_words=max_words,
-                    overlap_words=overlap_words,
-                    strict=strict_mode,
-                    mode=mode,
-                    provider=provider,
-                )
+            manifest = WorkManifest(
+                args.manifest,
+                worker_id=worker_id,
+                lease_seconds=args.lease_seconds,
+                max_attempts=args.max_attempts,
             )
-            summary.append(result)
-        except Exception as e:
-            logging.error(f"❌ Unexpected error processing {relative_path}: {e}")
-            summary.append({
-                "file": str(relative_path),
-                "mode": mode,
-                "chunks": "-",
-                "time_sec": 0,
-                "status": f"💥 exception: {e}",
-            })
-
-        if idx < len(txt_files) - 1:
-            logging.info(f"⏳ Waiting {delay_seconds} seconds before next file...")
-            time.sleep(delay_seconds)
+        except RuntimeError as e:
+            logging.error(f"❌ {e}")
+            exit(1)
+        manifest.register(
+            [f.relative_to(input_folder).as_posix() for f in txt_files],
+            done=[f.relative_to(input_folder).as_posix() for f in txt_files if output_path(f).exists()],
+        )
+        logging.info(f"🗂️  Worker {manifest.worker_id} on manifest {args.manifest}: {manifest.counts()}")
+
+    def file_jobs():
+        """
+        (input, output) pairs: leased one at a time from the manifest, or all files without output.
+        Stops when the time budget is used up.
+        """
+        if manifest is not None:
+            while (budget is None or not budget.exhausted()) and (relative := manifest.claim()) is not None:
+                txt_file = input_folder / relative
+                yield txt_file, output_path(txt_file)
+            return
+        for txt_file in txt_files:
+            if budget is not None and budget.exhausted():
+                return
+            out_file = output_path(txt_file)
+            if out_file.exists():
+                logging.info(f"⏭️  Skipping {txt_file.relative_to(input_folder)}, JSON already exists")
+                continue
+            yield txt_file, out_file
+
+    def file_done(txt_file, stats):
+        if metrics is not None:
+            stats.update(metrics.file_totals(txt_file.as_posix()))
+        # Deferred files keep their lease until the manifest is closed, which returns it unused
+        if manifest is not None and not stats["status"].startswith("⏸️"):
+            ok = not stats["status"].startswith(("❌", "💥"))
+            manifest.complete(txt_file.relative_to(input_folder).as_posix(), ok, stats["status"])
+
+    summary = []
+    run_start = time.time()
+
+    if pipeline == "pooled":
+        logging.info(f"🚀 Pooled run (max_concurrent={max_concurrent})")
+        summary = asyncio.run(
+            process_files_pooled(
+                file_jobs(),
+                max_words=max_words,
+                overlap_words=overlap_words,
+                strict=strict_mode,
+                provider=provider,
+                max_concurrent=max_concurrent,
+                journal=journal,
+                limiter=limiter,
+                chunker=chunker,
+                prefilter_threshold=args.prefilter,
+                batch_tokens=args.batch_tokens,
+                batch_max_chunks=args.batch_max_chunks,
+                on_file_done=file_done,
+                budget=budget,
+            )
+        )
+    else:
+        async def run_file_by_file():
+            # One event loop and one keep-alive HTTP session for all files
+            limit = max(max_concurrent, limiter.max_limit) if limiter is not None else max_concurrent
+            async with make_session(limit=limit) as session:
+                for idx, (txt_file, out_file) in enumerate(file_jobs()):
+                    relative_path = txt_file.relative_to(input_folder)
+                    out_file.parent.mkdir(parents=True, exist_ok=True)
+
+                    if idx > 0:
+                        logging.info(f"⏳ Waiting {delay_seconds} seconds before next file...")
+                        await asyncio.sleep(delay_seconds)
+
+                    progress = f"{idx+1}" if manifest is not None else f"{idx+1}/{len(txt_files)}"
+                    logging.info(f"[{progress}] Processing: {relative_path}")
+
+                    try:
+                        result = await process_single_file(
+                            txt_file,
+                            out_file,
+                            max_words=max_words,
+                            overlap_words=overlap_words,
+                            strict=strict_mode,
+                            mode=mode,
+                            provider=provider,
+                            max_concurrent=max_concurrent,
+                            journal=journal,
+                            limiter=limiter,
+                            chunker=chunker,
+                            prefilter_threshold=args.prefilter,
+                            session=session,
+                            budget=budget,
+                        )
+                    except Exception as e:
+                        logging.error(f"❌ Unexpected error processing {relative_path}: {e}")
+                        result = {
+                            "file": str(relative_path),
+                            "mode": mode,
+                            "chunks": "-",
+                            "time_sec": 0,
+                            "status": f"💥 exception: {e}",
+                        }
+                    summary.append(result)
+                    file_done(txt_file, result)
+            await close_provider_clients()
+
+        asyncio.run(run_file_by_file())
+
+    if manifest is not None:
+        logging.info(f"🗂️  Worker {manifest.worker_id} finished {manifest.claimed} files; manifest: {manifest.counts()}")
+        manifest.close()
 
     # === Summary output ===
     total_runtime = time.time() - run_start
@@ -161,6 +609,10 @@ if __name__ == "__main__":
         [s["file"], s["mode"], s["chunks"], s["time_sec"], s["status"]] for s in summary
     ]
     headers = ["File", "Mode", "Chunks", "Time (s)", "Outcome"]
+    if metrics is not None:
+        for row, s in zip(summary_table, summary):
+            row[4:4] = [s.get("requests", 0), s.get("errors", 0), s.get("prompt_tokens", 0), s.get("completion_tokens", 0)]
+        headers[4:4] = ["Requests", "Request errors", "Prompt tokens", "Completion tokens"]
 
     table_str = tabulate(summary_table, headers=headers, tablefmt="grid")
     print("\n\n=== 📊 Extraction Summary ===")
@@ -168,9 +620,58 @@ if __name__ == "__main__":
     logging.info(table_str)
     logging.info(f"Total runtime: {total_runtime:.2f} seconds")
 
+    if chunker is not None:
+        logging.info(chunker.histogram())
+
+    deferred_files = sum(1 for s in summary if s["status"].startswith("⏸️"))
+    if budget is not None and budget.hit:
+        logging.warning(
+            f"⏰ Stopped by the time budget: {deferred_files} files deferred, files not started were left as they are. "
+            "Run the same command again to continue (finished chunks are taken from the journal)."
+        )
+
+    skipped_chunks = sum(s.get("skipped_chunks", 0) for s in summary)
+    if args.prefilter is not None:
+        processed_chunks = sum(s["chunks"] for s in summary if isinstance(s["chunks"], int))
+        logging.info(
+            f"🔎 Prefilter skipped {skipped_chunks} chunks "
+            f"({processed_chunks} sent to the LLM, threshold {args.prefilter})"
+        )
+
+    if limiter is not None:
+        limiter_stats = limiter.stats()
+        logging.info(
+            f"🎚️  {provider} concurrency: final {limiter_stats['limit']}, peak {limiter_stats['peak_limit']}, "
+            f"backpressure events {limiter_stats['throttled']}, p95 {limiter_stats['p95_sec']}s"
+        )
+
+    if router is not None:
+        logging.info("🔀 Provider routing:\n" + tabulate(router.stats(), headers="keys", tablefmt="grid"))
+
+    metrics_rows = metrics.summary() if metrics is not None else []
+    if metrics_rows:
+        logging.info("📈 Request latency (s):\n" + tabulate(metrics_rows, headers="keys", tablefmt="grid"))
+        logging.info(
+            f"📈 Parsed objects: {metrics.parse['objects']} | valid: {metrics.parse['valid']} | "
+            f"salvaged: {metrics.parse['salvaged']} | rejected: {metrics.parse['rejected']}"
+        )
+
+    if journal is not None:
+        logging.info(f"📓 Chunks restored from journal: {journal.restored}")
+        journal.close()
+
+    cache_stats = extractor.RESPONSE_CACHE.stats() if extractor.RESPONSE_CACHE is not None else None
+    if cache_stats:
+        logging.info(
+            f"🗄️  Cache hits: {cache_stats['hits']} | misses: {cache_stats['misses']} | "
+            f"hit rate: {cache_stats['hit_rate']:.1%} | evictions: {cache_stats['evictions']} | "
+            f"size: {cache_stats['size_mb']} MB"
+        )
+
     # === Save CSV summary ===
     timestamp = time.strftime("%Y%m%d_%H%M%S")
-    csv_path = log_folder / f"run_log_summary_{timestamp}.csv"
+    csv_suffix = f"_{worker_id}" if manifest is not None else ""
+    csv_path = log_folder / f"run_log_summary_{timestamp}{csv_suffix}.csv"
 
     with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
         writer = csv.writer(csvfile)
@@ -178,6 +679,36 @@ if __name__ == "__main__":
         writer.writerows(summary_table)
         writer.writerow([])
         writer.writerow(["Total runtime (s):", round(total_runtime, 2)])
+        if budget is not None:
+            writer.writerow(["Stopped by time budget:", f"yes ({deferred_files} files deferred)" if budget.hit else "no"])
+        writer.writerow(["Prompt:", ", ".join(f"{p}={v}" for p, v in prompt_variants.items())])
+        if cache_stats:
+            writer.writerow(["Cache hits:", cache_stats["hits"]])
+            writer.writerow(["Cache misses:", cache_stats["misses"]])
+            writer.writerow(["Cache evictions:", cache_stats["evictions"]])
+        if args.prefilter is not None:
+            writer.writerow(["Chunks skipped by prefilter:", skipped_chunks])
+        if journal is not None:
+            writer.writerow(["Chunks restored from journal:", journal.restored])
+        if limiter is not None:
+            writer.writerow(["Final concurrency:", limiter.limit])
+            writer.writerow(["Backpressure events:", limiter.throttled])
+        if router is not None:
+            for row in router.stats():
+                writer.writerow([
+                    f"Provider {row['provider']}:",
+                    f"{row['ok']} ok / {row['failed']} failed / {row['hedges']} hedges ({row['hedges_won']} won)",
+                ])
+        for row in metrics_rows:
+            writer.writerow([
+                f"Requests {row['provider']}:",
+                f"{row['requests']} ({row['errors']} errors, {row['retries']} retries, {row['cached']} cached), "
+                f"total p50/p95 {row['total_p50']}/{row['total_p95']}s, ttfb p50/p95 {row['ttfb_p50']}/{row['ttfb_p95']}s, "
+                f"tokens {row['prompt_tokens']}+{row['completion_tokens']}",
+            ])
+
+    if metrics is not None:
+        metrics.close()
 
     logging.info(f"📁 Run summary saved to: {csv_path}")
     logging.info("✅ Run complete.")
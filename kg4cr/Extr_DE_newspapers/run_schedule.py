@@ -0,0 +1,118 @@
+import re
+import time
+import logging
+from pathlib import Path
+
+# Folder (or file name part) holding the year of an issue, e.g. .../1936/...
+YEAR = re.compile(r"(?<!\d)(1[89]\d\d|20\d\d)(?!\d)")
+DURATION = re.compile(r"^(?:(\d+)-)?(\d+)(?::(\d+))?(?::(\d+))?$")
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class BudgetExhausted(Exception):
+    """Raised instead of sending a request once the run's time budget is used up."""
+
+
+def file_year(relative_path):
+    """Year of an input file: the first year-like folder name, else a year in the file name, else None."""
+    path = Path(relative_path)
+    for part in path.parent.parts:
+        if YEAR.fullmatch(part):
+            return int(part)
+    match = YEAR.search(path.stem)
+    return int(match.group(1)) if match else None
+
+
+def load_priority_list(path):
+    """Relative paths or file names, one per line (blank lines and # comments ignored)."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line.replace("\\", "/") for line in lines if line]
+
+
+def order_files(files, root, order="path", years=None, first=None):
+    """
+    Processing order of the input files.
+
+    Files named in `first` (relative paths or bare file names) come first,
+    in the listed order; then the files of the `years` (by year folder, in
+    the given order); then all others. Within these groups files are sorted
+    by `order`: "path", "size" (smallest first) or "size_desc".
+    """
+    root = Path(root)
+    first_rank = {name: i for i, name in enumerate(first or [])}
+    year_rank = {int(year): i for i, year in enumerate(years or [])}
+
+    def key(path):
+        relative = path.relative_to(root).as_posix()
+        listed = first_rank.get(relative, first_rank.get(path.name))
+        year = year_rank.get(file_year(relative))
+        group = (0, listed) if listed is not None else (1, year) if year is not None else (2, 0)
+        if order == "size":
+            within = path.stat().st_size
+        elif order == "size_desc":
+            within = -path.stat().st_size
+        else:
+            within = 0
+        return group, within, relative
+
+    ordered = sorted(files, key=key)
+    missing = set(first_rank) - {f.relative_to(root).as_posix() for f in ordered} - {f.name for f in ordered}
+    if missing:
+        logging.warning(f"⚠️ {len(missing)} files of the priority list are not in the input folder: {sorted(missing)[:5]}")
+    return ordered
+
+
+def parse_duration(value):
+    """Seconds from "3600", "90m", "12h", or SLURM-style "MM:SS", "HH:MM:SS", "D-HH[:MM[:SS]]"."""
+    value = str(value).strip()
+    if value[-1:].lower() in DURATION_UNITS:
+        return float(value[:-1]) * DURATION_UNITS[value[-1].lower()]
+    match = DURATION.match(value)
+    if not match:
+        raise ValueError(f"Cannot read duration '{value}'")
+    days, *parts = match.groups()
+    parts = [int(p) for p in parts if p is not None]
+    if days is None:
+        # Plain seconds, MM:SS or HH:MM:SS
+        parts = [0] * (3 - len(parts)) + parts
+    else:
+        parts += [0] * (3 - len(parts))
+    hours, minutes, seconds = parts
+    return float(int(days or 0) * 86400 + hours * 3600 + minutes * 60 + seconds)
+
+
+class TimeBudget:
+    """
+    Wall-clock budget of a run (e.g. an HPC allocation). Once less than
+    `reserve_seconds` are left, the budget counts as exhausted: no further
+    files are started and no further requests are sent, so the requests in
+    flight can finish and the run can write its journal, outputs and summary
+    before the allocation ends.
+    """
+
+    def __init__(self, seconds, reserve_seconds=300, start=None):
+        self.seconds = seconds
+        self.reserve_seconds = reserve_seconds
+        self.start = time.monotonic() if start is None else start
+        self.deadline = self.start + seconds
+        self.hit = False
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def exhausted(self):
+        if self.remaining() > self.reserve_seconds:
+            return False
+        if not self.hit:
+            self.hit = True
+            logging.warning(
+                f"⏰ Time budget nearly used up ({self.remaining():.0f}s left): "
+                "no new chunks or files are started, finishing the requests in flight"
+            )
+        return True
+
+    def check(self, label=""):
+        """Raise BudgetExhausted if no more requests should be sent."""
+        if self.exhausted():
+            raise BudgetExhausted(label)
@@ -0,0 +1,250 @@
+import os
+import time
+import socket
+import sqlite3
+import logging
+import argparse
+import threading
+
+PENDING, LEASED, DONE, FAILED = "pending", "leased", "done", "failed"
+
+
+def default_worker_id():
+    """
+    Host name plus the SLURM task rank (SLURM_PROCID, else SLURM_LOCALID)
+    or, outside SLURM, the process id, so every process on a node gets its
+    own id.
+    """
+    task = os.environ.get("SLURM_PROCID") or os.environ.get("SLURM_LOCALID") or os.getpid()
+    return f"{socket.gethostname()}-{task}"
+
+
+class WorkManifest:
+    """
+    Shared SQLite list of input files that several pipeline processes (also
+    on different nodes, via a shared file system) work through together.
+
+    A worker claims a file by taking a lease on it; a background thread
+    renews the worker's leases every `lease_seconds / 3`. Files whose lease
+    ran out (crashed or killed worker) are handed to the next worker that
+    asks; a worker that has run out of free files keeps waiting while other
+    workers still hold leases, so it can take over when one of them dies. A
+    file that failed is offered again until it has been tried `max_attempts`
+    times. Each claim is one IMMEDIATE transaction, so two workers never get
+    the same file. Files are handed out in the order they were registered.
+    Leases belong to the worker id, so every process needs its own: opening
+    the manifest under an id that still holds unexpired leases fails.
+    """
+
+    def __init__(self, path, worker_id=None, lease_seconds=600, max_attempts=3):
+        self.path = str(path)
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.claimed = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+        # Autocommit mode; transactions are opened explicitly where needed
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated REAL,
+                outcome TEXT,
+                priority INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_status ON files(status)")
+        held = self.conn.execute(
+            "SELECT COUNT(*) FROM files WHERE status = ? AND worker = ? AND lease_until >= ?",
+            (LEASED, self.worker_id, time.time()),
+        ).fetchone()[0]
+        if held:
+            self.conn.close()
+            raise RuntimeError(
+                f"Worker id {self.worker_id!r} still holds {held} unexpired leases in {self.path}: "
+                "another process runs under this id (or one under it died less than lease_seconds ago)"
+            )
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params)
+
+    def register(self, paths, done=()):
+        """
+        Add work units in processing order (already known ones keep their state,
+        but pending ones are re-prioritized); `done` ones are marked finished.
+        """
+        now = time.time()
+        paths = list(paths)
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO files (path, status, updated, priority) VALUES (?, ?, ?, ?)",
+                    [(p, PENDING, now, rank) for rank, p in enumerate(paths)],
+                )
+                self.conn.executemany(
+                    "UPDATE files SET priority = ? WHERE path = ? AND status = ?",
+                    [(rank, p, PENDING) for rank, p in enumerate(paths)],
+                )
+                self.conn.executemany(
+                    "UPDATE files SET status = ?, outcome = 'output exists', updated = ? "
+                    "WHERE path = ? AND status = ?",
+                    [(DONE, now, p, PENDING) for p in done],
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def claim(self):
+        """
+        Lease the next free (or expired) work unit for this worker. Blocks
+        while only other workers' leases are left; None when all is finished.
+        """
+        while True:
+            path, wait_until = self._try_claim()
+            if path is not None:
+                self.claimed += 1
+                self._start_heartbeat()
+                return path
+            if wait_until is None:
+                return None
+            # Poll until the earliest foreign lease could have expired
+            time.sleep(min(max(wait_until - time.time(), 0) + 1, self.lease_seconds / 3))
+
+    def _try_claim(self):
+        """One claim transaction. Returns (path, None), or (None, earliest foreign lease end or None)."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self.conn.execute(
+                        "SELECT path, attempts FROM files "
+                        "WHERE status = ? OR (status = ? AND lease_until < ?) "
+                        "ORDER BY (status = ?) DESC, priority, path LIMIT 1",
+                        (PENDING, LEASED, now, PENDING),
+                    ).fetchone()
+                    if row is None:
+                        wait_until = self.conn.execute(
+                            "SELECT MIN(lease_until) FROM files WHERE status = ? AND worker != ?",
+                            (LEASED, self.worker_id),
+                        ).fetchone()[0]
+                        self.conn.execute("COMMIT")
+                        return None, wait_until
+
+                    path, attempts = row
+                    if attempts < self.max_attempts:
+                        break
+                    # Its last lease expired: workers died on it too often
+                    self.conn.execute(
+                        "UPDATE files SET status = ?, worker = NULL, outcome = ?, updated = ? WHERE path = ?",
+                        (FAILED, f"lease expired after {attempts} attempts", now, path),
+                    )
+
+                self.conn.execute(
+                    "UPDATE files SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, "
+                    "updated = ? WHERE path = ?",
+                    (LEASED, self.worker_id, now + self.lease_seconds, now, path),
+                )
+                self.conn.execute("COMMIT")
+                return path, None
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def complete(self, path, ok, outcome=None):
+        """
+        Finish a leased unit. Failed units go back to the pool until they
+        have used up max_attempts. Returns False if the lease had been lost
+        to another worker in the meantime.
+        """
+        now = time.time()
+        if ok:
+            status_sql, params = "?", (DONE,)
+        else:
+            status_sql, params = "CASE WHEN attempts >= ? THEN ? ELSE ? END", (self.max_attempts, FAILED, PENDING)
+        cur = self._execute(
+            f"UPDATE files SET status = {status_sql}, worker = NULL, lease_until = NULL, outcome = ?, updated = ? "
+            "WHERE path = ? AND status = ? AND worker = ?",
+            params + (outcome, now, path, LEASED, self.worker_id),
+        )
+        if cur.rowcount == 0:
+            logging.warning(f"⚠️ Lease on {path} was lost (expired and taken over by another worker)")
+            return False
+        return True
+
+    def renew(self):
+        """Extend all leases held by this worker."""
+        now = time.time()
+        self._execute(
+            "UPDATE files SET lease_until = ?, updated = ? WHERE status = ? AND worker = ?",
+            (now + self.lease_seconds, now, LEASED, self.worker_id),
+        )
+
+    def _start_heartbeat(self):
+        if self._heartbeat is not None:
+            return
+
+        def beat():
+            while not self._stop.wait(self.lease_seconds / 3):
+                try:
+                    self.renew()
+                except sqlite3.Error as e:
+                    logging.warning(f"⚠️ Lease heartbeat failed: {e}")
+
+        self._heartbeat = threading.Thread(target=beat, name="manifest-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def counts(self):
+        rows = self._execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def reset_failed(self):
+        """Put failed units back into the pool with a fresh attempt count."""
+        cur = self._execute(
+            "UPDATE files SET status = ?, attempts = 0, outcome = NULL, updated = ? WHERE status = ?",
+            (PENDING, time.time(), FAILED),
+        )
+        return cur.rowcount
+
+    def close(self):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        # Leases still held (interrupted run) are returned right away instead of waiting for expiry
+        self._execute(
+            "UPDATE files SET status = ?, worker = NULL, lease_until = NULL, attempts = MAX(0, attempts - 1) "
+            "WHERE status = ? AND worker = ?",
+            (PENDING, LEASED, self.worker_id),
+        )
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or reset the state of a shared work manifest.")
+    parser.add_argument("manifest", help="SQLite manifest used with run_extraction_pipeline.py --manifest.")
+    parser.add_argument("--reset_failed", action="store_true", help="Offer failed files to the workers again.")
+    parser.add_argument("--list_failed", action="store_true", help="Print the failed files and why.")
+    args = parser.parse_args()
+
+    manifest = WorkManifest(args.manifest, worker_id="status")
+    if args.reset_failed:
+        print(f"Reset {manifest.reset_failed()} failed files to pending")
+    for status, count in manifest.counts().items():
+        print(f"{status:>8}: {count}")
+    if args.list_failed:
+        for path, attempts, outcome in manifest._execute(
+            "SELECT path, attempts, outcome FROM files WHERE status = ? ORDER BY path", (FAILED,)
+        ):
+            print(f"{path} ({attempts} attempts): {outcome}")
+    manifest.close()
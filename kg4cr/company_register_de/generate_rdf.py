@@ -1,7 +1,12 @@
 import pandas as pd
 import os
+import sys
 from combine_excels2df import combine_excel_into_df, preprocess_combined_df
 
+# URI normalizers shared with the newspaper RDF scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Extr_DE_newspapers"))
+from rdf_text import map_unique, register_court_uri, register_type_uri, state_uri
+
 def df_to_ttl(df, filename="output.ttl"):
     ttl_lines = [
         '@prefix ex: <http://example.org/schema#> .',
@@ -61,18 +66,18 @@ def df_to_ttl(df, filename="output.ttl"):
         ''
     ]
 
+    # Court URIs, computed once per distinct court name
+    court_uris = map_unique(register_court_uri, df['RegisterCourt'])
+
     # Create unique court nodes
     unique_courts = df[['RegisterCourt']].drop_duplicates()
     for _, row in unique_courts.iterrows():
-        court_uri = row['RegisterCourt'].replace(' ', '_').replace('(', '').replace(')', '') \
-            .replace('ä', 'ae').replace('ü','ue').replace('ö','oe').replace('ß','ss')
+        court_uri = register_court_uri(row['RegisterCourt'])
         ttl_lines.append(f'court:{court_uri} a ex:RegisterCourt ;')
         ttl_lines.append(f'    rdfs:label "{row["RegisterCourt"]}"@de .\n')
 
     # Link courts to their XJustizIDs and create XJustizID nodes with properties
-    for _, row in df.iterrows():
-        court_uri = row['RegisterCourt'].replace(' ', '_').replace('(', '').replace(')', '') \
-            .replace('ä', 'ae').replace('ü','ue').replace('ö','oe').replace('ß','ss')
+    for court_uri, (_, row) in zip(court_uris, df.iterrows()):
         xjid = row['XJustizID']
         xjid_uri = f'xjid:{xjid}'
 
@@ -92,13 +97,12 @@ def df_to_ttl(df, filename="output.ttl"):
         rtypes_clean = []
         for rt in rtypes:
             rt = rt.strip()
-            rt_uri = rt.replace(' ', '_').replace('ü','ue').replace('ä','ae').replace('ö','oe').replace('ß','ss') \
-                .replace('-', '_').replace('.', '').replace(',', '')
+            rt_uri = register_type_uri(rt)
             rtypes_clean.append(f'rtype:{rt_uri}')
         ttl_lines.append(f'    ex:hasRegisterType {", ".join(rtypes_clean)} ;')
 
         # State
-        state = row['State'].replace(' ', '').replace('ü','ue').replace('ä','ae').replace('ö','oe').replace('ß','ss')
+        state = state_uri(row['State'])
         ttl_lines.append(f'    ex:locatedIn state:{state} ;')
 
         # ValidUntil date formatting
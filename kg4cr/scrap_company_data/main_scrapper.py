@@ -10,13 +10,14 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY environment variable is not set. Please set it to use the Groq API.")
 
+# One client for all companies; it keeps its HTTP connections open between requests
+client = Groq(api_key=GROQ_API_KEY)
+
 def extract_register_info(full_text, company_name):
     """
     Use the Groq API to extract the structured information from the provided full text.
     This function assumes that the Groq API is capable of identifying the relevant company registration info.
     """
-    client = Groq(api_key=GROQ_API_KEY)
-
     # Make the API request to extract company registration details
     completion = client.chat.completions.create(
         model="meta-llama/llama-4-scout-17b-16e-instruct",